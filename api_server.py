@@ -5,28 +5,283 @@ Bu API, YouTube videolarını indirmek için HTTP endpoint'leri sağlar.
 MP3 ve MP4 indirme işlemleri ayrı endpoint'lerde yönetilir.
 """
 
-from flask import Flask, request, jsonify, send_file, render_template_string
+from flask import Flask, request, jsonify, send_file, render_template_string, Response
 from flask_cors import CORS
 import yt_dlp
 import os
 import threading
 import time
 import json
+import copy
 import tempfile
 from werkzeug.utils import secure_filename
+from werkzeug.http import http_date, parse_if_range_header, quote_etag
+from urllib.parse import quote, urlparse, parse_qs
+from datetime import datetime, timezone
+import mimetypes
 import uuid
-import random
+import math
+from concurrent.futures import wait
+from download_scheduler import DownloadScheduler
+from video_cache import TTLCache, SQLiteCache, TieredCache
+from ydl_pool import YDLPool
+from capabilities import CapabilityRegistry
+from job_registry import JobRegistry, DownloadJob, ACTIVE_STATUSES
+from job_store import JobStore
+from janitor import Janitor
+from single_flight import DownloadCoalescer
+from media_stream import MediaStream
+from output_manifest import OutputManifest, sharded_output_dir
+from progress_events import ProgressBroker, EventStream
+from progress_tracker import ProgressThrottle
+from batch_manager import BatchManager, DownloadBatch, FailedEntry
+from playlist_stream import PlaylistCursors, PlaylistPage
+from shared_state import WorkerCoordinator, default_worker_id, worker_download_limit
+from cancellation import CancellationTracker, DownloadCancelled
+from retry_policy import RetryPolicy, RetryMetrics, classify_error
+from bandwidth import BandwidthShaper, parse_rate
+from fragment_tuner import FragmentTuner
+from range_download import RangeYoutubeDL
 
 app = Flask(__name__)
 CORS(app)  # Cross-origin requests için
 
-# Global variables
-downloads = {}  # Download status tracking
 # Cloud deployment için geçici klasör kullan
 download_path = os.environ.get('DOWNLOAD_PATH', os.path.expanduser("~/Downloads"))
 if not os.path.exists(download_path):
     download_path = "/tmp"  # Cloud'da geçici klasör
 
+
+def load_config(path='config.json'):
+    """Load settings from config.json next to this file"""
+    config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Config dosyası okunamadı: {str(e)}")
+        return {}
+
+
+config = load_config()
+default_settings = config.get('default_settings', {})
+
+# Eşzamanlı indirme sayısı sınırlı - fazlası kuyrukta bekler
+max_downloads = int(os.environ.get('MAX_DOWNLOADS', default_settings.get('max_downloads', 5)))
+
+# İndirme durumları - yeniden başlatmada kaybolmaması için SQLite'a yazılır
+job_settings = config.get('job_settings', {})
+job_store_path = os.environ.get('JOB_STORE_DB', job_settings.get('store_path', 'jobs.db'))
+if job_store_path and not os.path.isabs(os.path.expanduser(job_store_path)):
+    job_store_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), job_store_path)
+job_store = JobStore(
+    os.path.expanduser(job_store_path),
+    flush_interval=float(job_settings.get('flush_interval', 1.0))
+) if job_store_path else None
+
+# Çoklu worker (gunicorn) modu: iş kayıtları worker'lar arasında ortak SQLite ile paylaşılır
+shared_state = os.environ.get('SHARED_STATE', '').lower() in ('1', 'true', 'yes')
+if shared_state and job_store is None:
+    print("SHARED_STATE için JOB_STORE_DB gerekli - tek worker modunda devam ediliyor")
+    shared_state = False
+web_workers = max(1, int(os.environ.get('WEB_CONCURRENCY', 1))) if shared_state else 1
+worker_id = default_worker_id() if shared_state else None
+
+# Toplam eşzamanlı indirme sınırı worker'lar arasında paylaştırılır. Tekil indirmeler ortak
+# kuyrukta (SQLite) bekler ve boş slotu olan worker tarafından alınır; toplu indirmelerin
+# alt işleri toplu indirmeyi yürüten worker'da kalır.
+worker_slot = os.environ.get('WORKER_SLOT')
+worker_max_downloads = worker_download_limit(
+    max_downloads, web_workers, int(worker_slot) if shared_state and worker_slot else None
+)
+# İlerleme güncellemelerini SSE abonelerine iletir
+events_settings = config.get('events_settings', {})
+progress_broker = ProgressBroker(
+    max_subscribers=int(os.environ.get('MAX_EVENT_SUBSCRIBERS', events_settings.get('max_subscribers', 100)))
+)
+# Flask yolunda her SSE bağlantısı bekleme süresince bir istek thread'i tutar. Bu yol yalnızca
+# geliştirme sunucusu (python api_server.py) içindir; üretimde /api/events asgi_server'dan
+# thread tutmadan sunulur. Bağlantılar thread havuzunu doldurmasın diye ayrı bir sınır uygulanır.
+MAX_THREAD_EVENT_STREAMS = max(1, int(os.environ.get(
+    'MAX_THREAD_EVENT_STREAMS', events_settings.get('max_thread_streams', 8))))
+thread_event_streams = threading.BoundedSemaphore(MAX_THREAD_EVENT_STREAMS)
+
+def publish_job_change(download_id):
+    """Registry callback: live subscribers, batch bookkeeping and artifact cleanup"""
+    progress_broker.publish(download_id)
+    batch_manager.job_changed(download_id)
+    if download_id not in job_registry:
+        # Silme, /api/clear veya janitor ile kayıttan çıkan iş hazır dosya olarak kullanılmasın
+        download_coalescer.forget_artifact(download_id)
+
+job_registry = JobRegistry(store=job_store, on_change=publish_job_change, owner=worker_id)  # Download status tracking
+
+# İlerleme iş kaydına saniyede en fazla bu kadar yazılır
+progress_rate = float(os.environ.get('PROGRESS_RATE_HZ', job_settings.get('progress_rate_hz', 4)))
+
+# Her iş kendi klasörüne yazar: <output_path>/<id önek>/<download_id>/
+shard_output_dirs = bool(job_settings.get('shard_output_dirs', True))
+
+# Aynı indirme için gelen istekler tek işte birleştirilir
+download_coalescer = DownloadCoalescer()
+
+# Çalışan indirmelerin iptal token'ları ve ölçülen iptal gecikmesi
+cancellations = CancellationTracker()
+
+# Geçici hatalar iş kuyruğu üzerinden üstel bekleme ile tekrar denenir
+retry_settings = config.get('retry_settings', {})
+retry_policy = RetryPolicy(
+    max_attempts=int(os.environ.get('RETRY_MAX_ATTEMPTS', retry_settings.get('max_attempts', default_settings.get('retries', 3)))),
+    base_delay=float(retry_settings.get('base_delay_seconds', 2)),
+    max_delay=float(retry_settings.get('max_delay_seconds', 120)),
+    jitter=float(retry_settings.get('jitter', 0.5))
+)
+retry_metrics = RetryMetrics()
+# Tekrar kuyruğa alma ile iptal/silme aynı anda yapılmaz
+requeue_lock = threading.Lock()
+
+# İndirmelerin ortak bant genişliği sınırı (byte/s; "50M" gibi değerler de kabul edilir)
+bandwidth_settings = config.get('bandwidth_settings', {})
+global_bandwidth = parse_rate(os.environ.get('BANDWIDTH_LIMIT') or bandwidth_settings.get('global_limit'))
+bandwidth_shaper = BandwidthShaper(
+    # Genel sınır worker süreçleri arasında paylaştırılır
+    global_limit=global_bandwidth // web_workers if global_bandwidth else None,
+    per_job_limit=parse_rate(os.environ.get('JOB_BANDWIDTH_LIMIT') or bandwidth_settings.get('per_job_limit')),
+    burst_seconds=float(bandwidth_settings.get('burst_seconds', 1.0)),
+    rebalance_interval=float(bandwidth_settings.get('rebalance_seconds', 1.0))
+)
+
+# Parçalı (HLS/DASH) indirmelerin eşzamanlı bağlantıları ortak bir bütçeden ayrılır
+fragment_settings = config.get('fragment_settings', {})
+fragment_tuner = FragmentTuner(
+    # Bütçe worker süreçleri arasında paylaştırılır
+    connection_budget=max(1, int(os.environ.get('FRAGMENT_CONNECTION_BUDGET',
+                                                fragment_settings.get('connection_budget', 32))) // web_workers),
+    max_per_job=int(fragment_settings.get('max_per_job', 8)),
+    initial=int(fragment_settings.get('initial', 2)),
+    gain_threshold=float(fragment_settings.get('gain_threshold', 0.15)),
+    probe_every=int(fragment_settings.get('probe_every', 5))
+)
+
+# Tek dosyalı HTTP formatları byte aralıklarına bölünüp paralel bağlantılarla indirilir (isteğe bağlı)
+range_settings = config.get('range_download_settings', {})
+range_downloads = os.environ.get('RANGE_DOWNLOADS', str(range_settings.get('enabled', False))).lower() in ('1', 'true', 'yes')
+range_download_opts = {
+    'min_size': int(float(range_settings.get('min_size_mb', 8)) * 1024 * 1024),
+    'chunk_size': int(float(range_settings.get('chunk_size_mb', 4)) * 1024 * 1024),
+    'retries': int(range_settings.get('range_retries', 5)),
+    'timeout': float(range_settings.get('timeout_seconds', 20))
+}
+
+# ffmpeg/ffprobe/moviepy/mutagen durumu başlangıçta kontrol edilir, arka planda yenilenir
+capabilities = CapabilityRegistry(
+    refresh_interval=float(os.environ.get('CAPABILITY_REFRESH', default_settings.get('capability_refresh_seconds', 300)))
+)
+capabilities.start()
+
+# Video bilgileri cache'i (video ID ile anahtarlanır)
+cache_settings = config.get('cache_settings', {})
+video_info_ttl = float(os.environ.get('VIDEO_CACHE_TTL', cache_settings.get('video_info_ttl', 3600)))
+video_info_cache_db = os.environ.get('VIDEO_CACHE_DB', cache_settings.get('video_info_db', ''))
+video_info_cache = TieredCache(
+    TTLCache(
+        max_entries=int(os.environ.get('VIDEO_CACHE_SIZE', cache_settings.get('video_info_max_entries', 1024))),
+        ttl=video_info_ttl
+    ),
+    SQLiteCache(os.path.expanduser(video_info_cache_db), ttl=video_info_ttl) if video_info_cache_db else None
+)
+
+# Arama sonuçlarının detayları paralel alınır, süre sınırı aşılırsa hafif sonuç döner
+search_settings = config.get('search_settings', {})
+search_concurrency = int(os.environ.get('SEARCH_CONCURRENCY', search_settings.get('max_concurrency', 4)))
+search_deadline = float(os.environ.get('SEARCH_DEADLINE', search_settings.get('deadline_seconds', 15)))
+
+
+def warm_search_worker():
+    """Build a pooled YoutubeDL instance when a scheduler worker thread starts"""
+    try:
+        ydl_pool.warm('info')
+    except Exception as e:
+        print(f"YoutubeDL havuzu hazırlanamadı: {str(e)}")
+
+
+# Zamanlama sınıfları (öncelik sırasıyla): arama detayları, tekil indirmeler, toplu indirmeler.
+# Arama kendi slotlarına sahiptir; tekil indirmeler için ayrılan slotları toplu işler kullanamaz.
+scheduler_settings = config.get('scheduler_settings', {})
+single_reserved = min(int(scheduler_settings.get('single_reserved', 1)), worker_max_downloads - 1)
+bulk_limit = int(scheduler_settings.get('bulk_limit') or worker_max_downloads - single_reserved)
+download_scheduler = DownloadScheduler(
+    max_workers=worker_max_downloads + search_concurrency,
+    lanes={
+        'interactive': {
+            'reserved': search_concurrency,
+            # Boştaki indirme slotları kısa arama işlerine ödünç verilir
+            'limit': search_concurrency + int(scheduler_settings.get('interactive_borrow', 2))
+        },
+        'single': {'reserved': single_reserved, 'limit': worker_max_downloads},
+        'bulk': {'reserved': 0, 'limit': max(1, min(bulk_limit, worker_max_downloads))}
+    },
+    initializer=warm_search_worker
+)
+search_executor = download_scheduler.executor('interactive')
+
+# Arama sonuç listeleri (query, pencere) anahtarı ile cache'lenir
+SEARCH_WINDOW_BASE = int(search_settings.get('window_base', 20))
+SEARCH_WINDOW_MAX = int(search_settings.get('window_max', 320))
+search_results_ttl = float(os.environ.get('SEARCH_CACHE_TTL', search_settings.get('results_ttl', 600)))
+search_results_cache = TieredCache(
+    TTLCache(
+        max_entries=int(search_settings.get('results_max_entries', 256)),
+        ttl=search_results_ttl
+    ),
+    # Disk katmanı aynı veritabanını kullanan worker'lar arasında ortaktır
+    SQLiteCache(os.path.expanduser(video_info_cache_db), ttl=search_results_ttl, table='search_results')
+    if video_info_cache_db else None
+)
+
+# Tüm yt-dlp çağrıları için ortak ayarlar
+BASE_YDL_OPTS = {
+    # Bot korumasını aşmak için
+    'cookiefile': 'cookies.txt',  # YouTube cookies dosyası
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    # Ek bypass ayarları
+    'extractor_args': {
+        'youtube': {
+            'skip': ['dash', 'live'],
+            'player_client': ['android'],
+            'player_skip': ['webpage', 'configs'],
+        }
+    },
+    'http_headers': {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    }
+}
+
+
+def build_ydl_opts(**overrides):
+    """Copy of BASE_YDL_OPTS with call-specific options applied"""
+    opts = copy.deepcopy(BASE_YDL_OPTS)
+    opts.update(overrides)
+    return opts
+
+
+# Diske yazmadan doğrudan istemciye aktarılan indirmeler (?stream=1)
+stream_settings = config.get('stream_settings', {})
+max_streams = int(os.environ.get('MAX_STREAMS', stream_settings.get('max_streams', max_downloads)))
+stream_slots = threading.BoundedSemaphore(max_streams)
+
+# Bilgi çıkarma için ödünç alınıp geri verilen YoutubeDL nesneleri (profil başına sınırlı)
+ydl_pool = YDLPool({
+    'search': build_ydl_opts(quiet=True, no_warnings=True, extract_flat=True),
+    'info': build_ydl_opts(quiet=True, no_warnings=True, listformats=True),
+}, max_idle=int(search_settings.get('ydl_pool_size', max(4, search_concurrency))))
+
+
 # Simple HTML template for web interface
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -137,6 +392,12 @@ HTML_TEMPLATE = """
                 <div class="description" style="color: #6c757d;">İndirme durumu kontrolü</div>
                 <div class="example" style="background: #fff; color: #333;">curl http://localhost:5000/api/status/DOWNLOAD_ID</div>
             </div>
+            <div class="endpoint" style="background: #e9ecef; color: #333;">
+                <div class="method" style="color: #007bff;">GET</div>
+                <div class="url" style="background: #fff; color: #333;">/api/file/&lt;download_id&gt;</div>
+                <div class="description" style="color: #6c757d;">Tamamlanan indirmenin dosyasını al (Range / kaldığı yerden devam destekli)</div>
+                <div class="example" style="background: #fff; color: #333;">curl -O -J http://localhost:5000/api/file/DOWNLOAD_ID</div>
+            </div>
 
             <div class="endpoint" style="background: #e9ecef; color: #333;">
                 <div class="method" style="color: #007bff;">GET</div>
@@ -182,20 +443,22 @@ HTML_TEMPLATE = """
 """
 
 
-def download_with_retry(video_url, ydl_opts, max_retries=3):
-    """Download with retry mechanism"""
-    for attempt in range(max_retries):
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
-            return True
-        except Exception as e:
-            print(f"Attempt {attempt + 1} failed: {str(e)}")
-            if attempt < max_retries - 1:
-                time.sleep(random.uniform(2, 5))  # Random delay
-                continue
-            else:
-                raise e
+def run_download(video_url, ydl_opts, token=None):
+    """One download attempt; failed attempts are rescheduled by download_video_api"""
+    if token is not None:
+        token.check()
+    try:
+        downloader = RangeYoutubeDL if ydl_opts.get('range_download') else yt_dlp.YoutubeDL
+        with downloader(ydl_opts) as ydl:
+            ydl.download([video_url])
+        return True
+    except DownloadCancelled:
+        raise
+    except Exception:
+        if token is not None:
+            # ffmpeg iptal sırasında öldürüldüyse hata iptalin sonucudur
+            token.check()
+        raise
 
 
 def is_youtube_url(text):
@@ -208,74 +471,75 @@ def is_youtube_url(text):
     ]
     return any(re.match(pattern, text) for pattern in youtube_patterns)
 
+def extract_video_id(text):
+    """Extract the canonical 11-character video ID from a YouTube URL or bare ID"""
+    import re
+    if not text:
+        return None
+    text = text.strip()
+    if re.fullmatch(r'[\w-]{11}', text):
+        return text
+    match = re.search(
+        r'(?:youtube\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|live/|v/)|youtu\.be/)([\w-]{11})',
+        text
+    )
+    return match.group(1) if match else None
+
 def search_youtube(query, max_results=10):
     """Search YouTube for videos"""
     try:
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': True,
-            'default_search': f'ytsearch{max_results}',
-            # Bot korumasını aşmak için
-            'cookiefile': 'cookies.txt',  # YouTube cookies dosyası
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            # Ek bypass ayarları
-            'extractor_args': {
-                'youtube': {
-                    'skip': ['dash', 'live'],
-                    'player_client': ['android'],
-                    'player_skip': ['webpage', 'configs'],
-                }
-            },
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_pool.acquire('search') as ydl:
             results = ydl.extract_info(f"ytsearch{max_results}:{query}", download=False)
             if results and 'entries' in results and results['entries']:
-                return results['entries']
+                return list(results['entries'])
                 
     except Exception as e:
         print(f"Arama hatası: {str(e)}")
         
     return []
 
-def get_video_info(video_url):
-    """Get video information"""
+def search_windows(count):
+    """Window sizes (doubling from SEARCH_WINDOW_BASE) that can hold `count` results"""
+    window = SEARCH_WINDOW_BASE
+    while window < count and window < SEARCH_WINDOW_MAX:
+        window *= 2
+    windows = []
+    while True:
+        windows.append(min(window, SEARCH_WINDOW_MAX))
+        if window >= SEARCH_WINDOW_MAX:
+            return windows
+        window *= 2
+
+def search_youtube_page(query, page=1, limit=10):
+    """Return (entries, has_more, from_cache) for one page of a search"""
+    normalized = ' '.join(query.lower().split())
+    start = (page - 1) * limit
+    end = start + limit
+    windows = search_windows(end)
+    
+    # Daha büyük bir pencere de bu sayfayı içerir
+    entries = None
+    for window in windows:
+        entries = search_results_cache.get(f'{window}:{normalized}')
+        if entries is not None:
+            from_cache = True
+            break
+    
+    if entries is None:
+        from_cache = False
+        window = windows[0]
+        entries = search_youtube(query, max_results=window)
+        if entries:
+            search_results_cache.set(f'{window}:{normalized}', entries)
+    
+    page_entries = entries[start:end]
+    has_more = len(entries) > end or (len(entries) >= window and window < SEARCH_WINDOW_MAX)
+    return page_entries, has_more, from_cache
+
+def fetch_video_info(video_url):
+    """Extract video information from YouTube (network call)"""
     try:
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'listformats': True,
-            # Bot korumasını aşmak için
-            'cookiefile': 'cookies.txt',  # YouTube cookies dosyası
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            # Ek bypass ayarları
-            'extractor_args': {
-                'youtube': {
-                    'skip': ['dash', 'live'],
-                    'player_client': ['android'],
-                    'player_skip': ['webpage', 'configs'],
-                }
-            },
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_pool.acquire('info') as ydl:
             info = ydl.extract_info(video_url, download=False)
             return info
             
@@ -283,6 +547,39 @@ def get_video_info(video_url):
         print(f"Video bilgileri alınamadı: {str(e)}")
         return None
 
+# Cache'te tutulan alanlar - yanıt oluşturmak için gerekenler yeterli
+VIDEO_INFO_FIELDS = ('id', 'title', 'duration', 'uploader', 'channel', 'view_count',
+                     'thumbnail', 'webpage_url', 'upload_date')
+FORMAT_FIELDS = ('format_id', 'ext', 'vcodec', 'acodec', 'height', 'width', 'fps',
+                 'filesize', 'filesize_approx', 'tbr', 'abr', 'protocol')
+
+def slim_video_info(info):
+    """Reduce a yt-dlp info dict to the JSON-serializable fields the API uses"""
+    # Olmayan alanlar eklenmez; çağıranlar info.get(alan, varsayılan) kullanır
+    slim = {key: info[key] for key in VIDEO_INFO_FIELDS if key in info}
+    slim['formats'] = [
+        {key: fmt.get(key) for key in FORMAT_FIELDS if fmt.get(key) is not None}
+        for fmt in info.get('formats') or []
+    ]
+    return slim
+
+def get_video_info(video_url):
+    """Get video information (cached by video ID)"""
+    video_id = extract_video_id(video_url)
+    if video_id:
+        cached = video_info_cache.get(video_id)
+        if cached is not None:
+            return cached
+
+    info = fetch_video_info(video_url)
+    if not info:
+        return None
+
+    info = slim_video_info(info)
+    if video_id:
+        video_info_cache.set(video_id, info)
+    return info
+
 def get_available_qualities(info):
     """Get available quality options from video info"""
     try:
@@ -341,55 +638,61 @@ def get_format_string_for_quality(quality, formats=None):
         print(f"Format string oluşturma hatası: {str(e)}")
         return 'best[ext=mp4]/best'
 
-def progress_hook(d, download_id):
-    """Progress hook for download updates"""
-    if download_id in downloads:
-        if d['status'] == 'downloading':
-            try:
-                downloaded = d.get('downloaded_bytes', 0)
-                total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
+def progress_hook(d, job, throttle=None):
+    """Progress hook for download updates (rate-limited by the job's throttle)"""
+    if d['status'] == 'downloading':
+        try:
+            downloaded = d.get('downloaded_bytes') or 0
+            total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+            speed = d.get('speed')
+            
+            # Ara örnekler sadece sayısal yapıya yazılır; durum değişikliği hemen yayınlanır
+            if throttle is not None and not throttle.record(downloaded, total, speed) and job.status == 'downloading':
+                return
+            
+            fields = {
+                'status': 'downloading',
+                'downloaded_bytes': downloaded,
+                'total_bytes': total
+            }
+            
+            if total > 0:
+                fields['progress'] = (downloaded / total) * 100
+                
+            if speed:
+                fields['speed'] = speed
+                
+            job_registry.update_job(job, **fields)
                 
-                if total > 0:
-                    progress = (downloaded / total) * 100
-                    downloads[download_id]['progress'] = progress
-                    
-                speed = d.get('speed', 0)
-                if speed:
-                    speed_mb = speed / 1024 / 1024
-                    downloads[download_id]['speed'] = f"{speed_mb:.1f} MB/s"
-                    
-                downloads[download_id]['status'] = 'downloading'
-                downloads[download_id]['downloaded_bytes'] = downloaded
-                downloads[download_id]['total_bytes'] = total
-                    
-            except Exception:
-                pass
-        elif d['status'] == 'finished':
-            downloads[download_id]['progress'] = 100
-            downloads[download_id]['status'] = 'finished'
+        except Exception:
+            pass
+    elif d['status'] == 'finished':
+        fields = {'progress': 100, 'status': 'finished'}
+        # Yayınlanmamış son örneğin byte sayıları
+        downloaded = d.get('downloaded_bytes') or (throttle.downloaded if throttle is not None else 0)
+        if downloaded:
+            fields['downloaded_bytes'] = downloaded
+            fields['total_bytes'] = d.get('total_bytes') or downloaded
+        job_registry.update_job(job, **fields)
 
 def check_ffmpeg_available():
-    """Check if FFmpeg is available"""
-    try:
-        import subprocess
-        result = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True)
-        return result.returncode == 0
-    except:
-        return False
+    """Check if FFmpeg is available (cached capability probe)"""
+    return capabilities.available('ffmpeg')
 
 def get_audio_format_info(file_path):
     """Get audio format information"""
-    try:
-        import mutagen
-        audio = mutagen.File(file_path)
-        if audio:
-            return {
-                'format': audio.mime[0].split('/')[-1].upper(),
-                'duration': audio.info.length if hasattr(audio.info, 'length') else None,
-                'bitrate': audio.info.bitrate if hasattr(audio.info, 'bitrate') else None
-            }
-    except:
-        pass
+    if capabilities.available('mutagen'):
+        try:
+            import mutagen
+            audio = mutagen.File(file_path)
+            if audio:
+                return {
+                    'format': audio.mime[0].split('/')[-1].upper(),
+                    'duration': audio.info.length if hasattr(audio.info, 'length') else None,
+                    'bitrate': audio.info.bitrate if hasattr(audio.info, 'bitrate') else None
+                }
+        except:
+            pass
     
     # Fallback info
     ext = file_path.split('.')[-1].upper()
@@ -402,9 +705,7 @@ def get_audio_format_info(file_path):
 def get_video_format_info(file_path):
     """Get video format information"""
     # Check if moviepy is available
-    try:
-        import moviepy
-    except ImportError:
+    if not capabilities.available('moviepy'):
         print("Moviepy not available for video info")
         # Fallback info
         ext = file_path.split('.')[-1].upper()
@@ -444,9 +745,7 @@ def get_video_format_info(file_path):
 def convert_video_with_moviepy(input_file, output_file, quality='720p'):
     """Convert video using moviepy (no FFmpeg required)"""
     # Check if moviepy is available
-    try:
-        import moviepy
-    except ImportError:
+    if not capabilities.available('moviepy'):
         print("Moviepy not available for video conversion")
         return False
     
@@ -486,52 +785,149 @@ def convert_video_with_moviepy(input_file, output_file, quality='720p'):
         print(f"Moviepy conversion error: {str(e)}")
         return False
 
+# MP3 quality mapping
+MP3_QUALITY_MAP = {
+    'best': '320',
+    'high': '256',
+    'medium': '192',
+    'low': '128',
+    'worst': '96'
+}
+
+def job_output_dir(job):
+    """Directory a job writes its files into"""
+    if shard_output_dirs:
+        return sharded_output_dir(job.output_path, job.download_id)
+    return job.output_path
+
+def build_file_info(file_path):
+    file = os.path.basename(file_path)
+    file_size = os.path.getsize(file_path)
+    return {
+        'filename': file,
+        'format': file.split('.')[-1].upper(),
+        'size_bytes': file_size,
+        'size_mb': f"{file_size / (1024*1024):.1f} MB"
+    }
+
+def remove_files(paths, directories=()):
+    """Best-effort removal of files, then of directories left empty"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    for directory in directories:
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+def cancel_markers(manifest, output_dir):
+    """Strings that identify a job's ffmpeg children on their command line"""
+    markers = manifest.paths()
+    if shard_output_dirs:
+        # İş klasörü yalnızca bu işe ait; henüz bildirilmemiş dosyaları da kapsar
+        markers += [output_dir, os.path.abspath(output_dir)]
+    return markers
+
+def discard_cancelled_output(job, manifest, output_dir):
+    """Remove everything a cancelled job wrote (partial, intermediate and final files)"""
+    paths = []
+    if manifest is not None:
+        paths = [path for path in manifest.paths() if os.path.isfile(path)] + manifest.leftovers()
+    if shard_output_dirs and os.path.isdir(output_dir):
+        # .part-Frag, .ytdl gibi hook'lara hiç yansımayan dosyalar
+        paths += [os.path.join(output_dir, name) for name in os.listdir(output_dir)]
+    remove_files(paths, job_output_dirs(job))
+
+def finish_cancelled_download(job, token, manifest, output_dir):
+    """Clean up after a cancelled attempt, before the worker takes the next job"""
+    latency = cancellations.finish(token)
+    discard_cancelled_output(job, manifest, output_dir)
+    job_registry.update_job(job, status='cancelled', message='İndirme iptal edildi',
+                            cancel_latency=round(latency, 3) if latency is not None else None)
+    complete_shared_download(job, False)
+    return False
+
+def schedule_retry(job, token, error, error_class):
+    """Requeue a failed attempt after a backoff; False if the job was cancelled meanwhile"""
+    delay = retry_policy.delay(job.attempts or 1)
+    with requeue_lock:
+        if token.cancelled or job.status == 'cancelled' or job.download_id not in job_registry:
+            return False
+        job_registry.update_job(
+            job,
+            status='retrying',
+            retry_at=time.time() + delay,
+            error_class=error_class,
+            message=f"Geçici hata ({error_class}), {delay:.1f} sn sonra tekrar denenecek "
+                    f"({job.attempts}/{retry_policy.max_attempts}): {str(error)}"
+        )
+        # Bekleme süresince worker boşta kalır; iş zamanı gelince kendi sınıfının kuyruğuna girer
+        download_scheduler.submit_after(
+            delay, job.download_id, download_video_api,
+            job.video_url, job.format, job.quality, job.output_path, job.download_id,
+            lane=download_lane(job)
+        )
+    retry_metrics.record_retry(error_class)
+    return True
+
+def download_source(video_url):
+    """Key under which fragment concurrency is learned (site of the video)"""
+    if extract_video_id(video_url):
+        return 'youtube'
+    return urlparse(video_url).hostname or 'unknown'
+
 def download_video_api(video_url, format_type, quality, output_path, download_id):
     """Download video for API"""
+    job = job_registry.get(download_id)
+    if job is None or job.status == 'cancelled':
+        # İş kuyrukta beklerken silinmiş veya iptal edilmiş
+        if job is not None:
+            if job.attempts:
+                # Önceki denemelerden kalan yarım dosyalar
+                discard_cancelled_output(job, None, job_output_dir(job))
+            complete_shared_download(job, False)
+        return False
+    job_registry.update_job(job, attempts=(job.attempts or 0) + 1, retry_at=None)
+    
+    # İşin ürettiği dosyalar yt-dlp hook'larından kaydedilir
+    output_dir = job_output_dir(job)
+    manifest = OutputManifest(output_dir)
+    throttle = ProgressThrottle(progress_rate)
+    # İptal isteği hook'larda kontrol edilir ve işin ffmpeg süreçlerini sonlandırır
+    token = cancellations.start(download_id, lambda: cancel_markers(manifest, output_dir))
+    if job.status == 'cancelled':
+        token.cancel()
+    # Bant genişliği payı; bekleme iptal ile kesilir
+    share = bandwidth_shaper.register(download_id, job.rate_limit)
+    fragments = None
+    
     try:
         # Create output path if it doesn't exist
-        os.makedirs(output_path, exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
         
         # Check FFmpeg availability
         ffmpeg_available = check_ffmpeg_available()
         
         # Configure yt-dlp options
-        ydl_opts = {
-            'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s'),
-            'progress_hooks': [lambda d: progress_hook(d, download_id)],
-            # Bot korumasını aşmak için
-            'cookiefile': 'cookies.txt',  # YouTube cookies dosyası
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            # Ek bypass ayarları
-            'extractor_args': {
-                'youtube': {
-                    'skip': ['dash', 'live'],
-                    'player_client': ['android'],
-                    'player_skip': ['webpage', 'configs'],
-                }
-            },
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-        }
+        ydl_opts = build_ydl_opts(
+            outtmpl=os.path.join(output_dir, '%(title)s.%(ext)s'),
+            progress_hooks=[
+                token.check, manifest.progress_hook, bandwidth_shaper.hook(share, token.wait),
+                lambda d: progress_hook(d, job, throttle)
+            ],
+            **manifest.ydl_opts()
+        )
+        ydl_opts['postprocessor_hooks'].insert(0, token.check)
+        if range_downloads:
+            # Bağlantı sayısı parça bütçesinden (concurrent_fragment_downloads) gelir
+            ydl_opts['range_download'] = dict(range_download_opts)
         
         if format_type == "mp3" or format_type == "audio":
-            # MP3 quality mapping
-            mp3_quality_map = {
-                'best': '320',
-                'high': '256',
-                'medium': '192',
-                'low': '128',
-                'worst': '96'
-            }
-            
             # Get audio quality
-            audio_quality = mp3_quality_map.get(quality, '192')
+            audio_quality = MP3_QUALITY_MAP.get(quality, '192')
             
             if format_type == "mp3":
                 if ffmpeg_available:
@@ -551,7 +947,7 @@ def download_video_api(video_url, format_type, quality, output_path, download_id
                         'format': 'bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio/best',
                     })
                     format_display = f"Audio (En iyi kalite - MP3 dönüşümü için FFmpeg gerekli)"
-                    downloads[download_id]['note'] = "FFmpeg kurulumu ile MP3 dönüşümü yapılabilir"
+                    job_registry.update_job(job, note="FFmpeg kurulumu ile MP3 dönüşümü yapılabilir")
             else:  # audio format
                 # FFmpeg olmadan audio indir
                 ydl_opts.update({
@@ -572,37 +968,493 @@ def download_video_api(video_url, format_type, quality, output_path, download_id
             
             ydl_opts['format'] = format_string
         
-        downloads[download_id]['status'] = 'starting'
-        downloads[download_id]['message'] = f"İndirme başlatılıyor... Format: {format_display}"
-        downloads[download_id]['ffmpeg_available'] = ffmpeg_available
+        # Parça bağlantı sayısı bütçeden alınır, dosyalar arasında yeniden ayarlanır
+        fragments = fragment_tuner.start(download_id, download_source(video_url), ydl_opts)
+        ydl_opts['progress_hooks'].insert(2, fragment_tuner.hook(fragments))
+        
+        attempt_note = f" (deneme {job.attempts}/{retry_policy.max_attempts})" if job.attempts > 1 else ""
+        job_registry.update_job(
+            job,
+            status='starting',
+            message=f"İndirme başlatılıyor... Format: {format_display}{attempt_note}",
+            ffmpeg_available=ffmpeg_available
+        )
         
-        download_with_retry(video_url, ydl_opts)
+        run_download(video_url, ydl_opts, token=token)
+        # Son işlem bittikten sonra gelen iptal de sonucu geçersiz kılar
+        token.check()
         
         # Get file info after download
         try:
-            for file in os.listdir(output_path):
-                if file.endswith(('.m4a', '.webm', '.mp3', '.mp4', '.mkv')):
-                    file_path = os.path.join(output_path, file)
-                    file_size = os.path.getsize(file_path)
-                    
-                    downloads[download_id]['file_info'] = {
-                        'filename': file,
-                        'format': file.split('.')[-1].upper(),
-                        'size_bytes': file_size,
-                        'size_mb': f"{file_size / (1024*1024):.1f} MB"
-                    }
-                    break
+            output_files = manifest.files()
+            if output_files:
+                job_registry.update_job(job, output_files=output_files, file_info=build_file_info(output_files[0]))
+            else:
+                job_registry.update_job(job, warning="Dosya bilgisi alınamadı: yt-dlp çıktı dosyası bildirmedi")
         except Exception as e:
-            downloads[download_id]['warning'] = f"Dosya bilgisi alınamadı: {str(e)}"
+            job_registry.update_job(job, warning=f"Dosya bilgisi alınamadı: {str(e)}")
             
-        downloads[download_id]['status'] = 'completed'
-        downloads[download_id]['message'] = "İndirme başarıyla tamamlandı!"
+        job_registry.update_job(job, status='completed', message="İndirme başarıyla tamamlandı!")
+        if job.error_class is not None:
+            retry_metrics.record_recovered(job.error_class)
+        complete_shared_download(job, True)
         return True
         
+    except DownloadCancelled:
+        # Worker serbest kalmadan önce işin tüm süreçleri ve dosyaları temizlenir
+        return finish_cancelled_download(job, token, manifest, output_dir)
+        
+    except Exception as e:
+        error_class, retryable = classify_error(e)
+        if retry_policy.should_retry(retryable, job.attempts):
+            # Yarım dosyalar sonraki denemede kaldığı yerden devam eder
+            if schedule_retry(job, token, e, error_class):
+                return False
+            return finish_cancelled_download(job, token, manifest, output_dir)
+        retry_metrics.record_failure(error_class, retryable)
+        job_registry.update_job(job, status='error', message=f"İndirme hatası: {str(e)}", error_class=error_class)
+        # Yarım kalan dosyaları bırakma
+        remove_files(manifest.leftovers(), job_output_dirs(job))
+        complete_shared_download(job, False)
+        return False
+    
+    finally:
+        cancellations.finish(token)
+        bandwidth_shaper.unregister(share)
+        if fragments is not None:
+            fragment_tuner.finish(fragments)
+
+def build_download_links(video_url):
+    """Download endpoint links for a video"""
+    return {
+        'mp3': {
+            'best': f'/api/download/mp3?url={video_url}&quality=best',
+            'high': f'/api/download/mp3?url={video_url}&quality=high',
+            'medium': f'/api/download/mp3?url={video_url}&quality=medium',
+            'low': f'/api/download/mp3?url={video_url}&quality=low',
+            'audio_only': f'/api/download/audio?url={video_url}'
+        },
+        'mp4': {
+            'best': f'/api/download/mp4?url={video_url}&quality=best',
+            '1080p': f'/api/download/mp4?url={video_url}&quality=1080p',
+            '720p': f'/api/download/mp4?url={video_url}&quality=720p',
+            '480p': f'/api/download/mp4?url={video_url}&quality=480p',
+            '360p': f'/api/download/mp4?url={video_url}&quality=360p'
+        }
+    }
+
+def build_search_result(video_url, info):
+    """Search result entry from full video info"""
+    quality_options, formats = get_available_qualities(info)
+    return {
+        'video_url': video_url,
+        'title': info.get('title', 'Bilinmiyor'),
+        'duration': info.get('duration', 0),
+        'uploader': info.get('uploader', 'Bilinmiyor'),
+        'view_count': info.get('view_count', 0),
+        'thumbnail': info.get('thumbnail', ''),
+        'available_qualities': quality_options,
+        'formats_count': len(formats),
+        'download_links': build_download_links(video_url)
+    }
+
+def build_lightweight_result(entry):
+    """Search result entry from a flat search entry (no format details)"""
+    video_url = entry.get('url', '')
+    thumbnails = entry.get('thumbnails') or []
+    return {
+        'video_url': video_url,
+        'title': entry.get('title') or 'Bilinmiyor',
+        'duration': entry.get('duration') or 0,
+        'uploader': entry.get('uploader') or entry.get('channel') or 'Bilinmiyor',
+        'view_count': entry.get('view_count') or 0,
+        'thumbnail': thumbnails[-1].get('url', '') if thumbnails else '',
+        'available_qualities': ["best", "worst", "720p", "480p", "360p"],
+        'formats_count': 0,
+        'partial': True,
+        'download_links': build_download_links(video_url)
+    }
+
+def requested_rate_limit(data=None):
+    """Per-job bandwidth cap from ?rate_limit= or {"rate_limit": ...} (bytes/s, "500K", "2M")"""
+    value = request.args.get('rate_limit') if data is None else data.get('rate_limit', request.args.get('rate_limit'))
+    return parse_rate(value)
+
+def wants_stream(data=None):
+    """True if the client asked for direct streaming (?stream=1 or {"stream": true})"""
+    value = request.args.get('stream') if data is None else data.get('stream', request.args.get('stream'))
+    return str(value).lower() in ('1', 'true', 'yes')
+
+def stream_format_options(format_type, quality):
+    """(format string, ffmpeg args, mimetype, extension) for a streamed download"""
+    if format_type == 'mp3' and check_ffmpeg_available():
+        bitrate = MP3_QUALITY_MAP.get(quality, '192')
+        return 'bestaudio/best', ['-vn', '-f', 'mp3', '-b:a', f'{bitrate}k'], 'audio/mpeg', 'mp3'
+    if format_type in ('mp3', 'audio'):
+        # Pipe'a yazılabilen tek dosyalı audio (m4a)
+        return 'bestaudio[ext=m4a]/best[ext=mp4]', None, 'audio/mp4', 'm4a'
+    # Birleştirme (video+audio) pipe üzerinde yapılamaz - tek dosyalı mp4 seç
+    resolution = quality.replace('p', '') if quality not in ('best', 'worst') else None
+    if quality == 'worst':
+        format_string = 'worst[ext=mp4]/worst'
+    elif resolution and resolution.isdigit():
+        format_string = f'best[height<={resolution}][ext=mp4]/best[ext=mp4]'
+    else:
+        format_string = 'best[ext=mp4]'
+    return format_string, None, 'video/mp4', 'mp4'
+
+def stream_download(video_url, format_type, quality):
+    """Pipe the media straight into a chunked response without touching download_path"""
+    if not stream_slots.acquire(blocking=False):
+        return jsonify({'error': 'Çok fazla eşzamanlı stream var, lütfen daha sonra tekrar deneyin'}), 503, {'Retry-After': '10'}
+    
+    format_string, ffmpeg_args, mimetype, extension = stream_format_options(format_type, quality)
+    stream = MediaStream(video_url, format_string, BASE_YDL_OPTS, ffmpeg_args,
+                         on_close=lambda _: stream_slots.release())
+    try:
+        stream.start()
+        if not stream.wait_first_chunk():
+            stream.failed()
+            error = stream.error_output()
+            stream.close()
+            return jsonify({'error': f'Stream başlatılamadı: {error or "boş yanıt"}'}), 502
     except Exception as e:
-        downloads[download_id]['status'] = 'error'
-        downloads[download_id]['message'] = f"İndirme hatası: {str(e)}"
+        stream.close()
+        return jsonify({'error': f'Stream error: {str(e)}'}), 500
+    
+    # Dosya adı için cache'te varsa başlığı kullan, yoksa video ID
+    video_id = extract_video_id(video_url)
+    cached = video_info_cache.get(video_id) if video_id else None
+    title = (cached or {}).get('title') or video_id or 'stream'
+    download_name = f"{secure_filename(title) or 'stream'}.{extension}"
+    
+    return Response(stream, mimetype=mimetype, direct_passthrough=True, headers={
+        'Content-Disposition': f"attachment; filename=\"{download_name}\"; filename*=UTF-8''{quote(title)}.{extension}",
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'
+    })
+
+def coalesce_key(job):
+    """Identical downloads share one key: (video ID, format, quality, folder)"""
+    video_id = extract_video_id(job.video_url) or job.video_url
+    return (video_id, job.format, job.quality, os.path.abspath(os.path.expanduser(job.output_path)))
+
+def artifact_available(leader):
+    """A finished leader can be reused while its record and file still exist"""
+    if job_registry.get(leader.download_id) is not leader or leader.status != 'completed':
         return False
+    files = job_output_files(leader)
+    return bool(files) and all(os.path.exists(path) for path in files)
+
+# Son durumda follower'lara kopyalanan alanlar
+SHARED_RESULT_FIELDS = ('status', 'message', 'progress', 'downloaded_bytes', 'total_bytes',
+                        'file_info', 'output_files', 'ffmpeg_available', 'note', 'warning')
+
+def copy_shared_result(follower, leader):
+    """Give a follower the final state of the job it was attached to"""
+    leader_state = leader.to_dict()
+    job_registry.update_job(follower, **{
+        field: leader_state[field] for field in SHARED_RESULT_FIELDS if field in leader_state
+    })
+
+def download_lane(job):
+    """Scheduling class of a download: batch children run in the bulk lane"""
+    return 'bulk' if job.batch_id else 'single'
+
+def enqueue_download(job):
+    """Hand a queued job to the download scheduler, or attach it to an identical one"""
+    role, leader = download_coalescer.attach(coalesce_key(job), job, artifact_valid=artifact_available)
+    
+    if role == 'artifact':
+        # Aynı dosya daha önce indirilmiş - tekrar indirme
+        job_registry.update_job(job, shared_with=leader.download_id)
+        copy_shared_result(job, leader)
+        job_registry.update_job(job, message='Daha önce indirilmiş dosya kullanıldı')
+        return
+    
+    if role == 'follower':
+        # Aynı indirme zaten çalışıyor - ilerlemesini paylaş
+        job_registry.update_job(job, shared_with=leader.download_id,
+                                message='Aynı indirme devam ediyor, ona bağlandı')
+        return
+    
+    download_scheduler.submit(
+        job.download_id, download_video_api,
+        job.video_url, job.format, job.quality, job.output_path, job.download_id,
+        lane=download_lane(job)
+    )
+
+def complete_shared_download(job, success):
+    """Finalize or requeue the followers waiting on a leader job"""
+    followers = download_coalescer.finish(coalesce_key(job), job, success)
+    if not followers:
+        return
+    
+    if job.status == 'cancelled':
+        # Lider iptal edildi - bekleyenler kendi indirmelerini başlatır
+        for follower in followers:
+            job_registry.update_job(follower, shared_with=None, message='İndirme tekrar kuyruğa alındı')
+            enqueue_download(follower)
+        return
+    
+    for follower in followers:
+        copy_shared_result(follower, job)
+
+def submit_download(job):
+    """Queue a new single download: in the shared queue of all workers, or on this worker"""
+    if worker_coordinator is None:
+        job_registry.add(job)
+        enqueue_download(job)
+        return
+    # İşi boş slotu olan ilk worker (bu worker dahil) sahiplenir
+    job_store.publish_queued(job)
+    worker_coordinator.wake()
+
+def claim_jobs(rows):
+    """Run jobs this worker took from the shared queue"""
+    jobs = [DownloadJob.from_dict(data) for data in rows]
+    for job in jobs:
+        job.owner = worker_id
+    job_registry.restore(jobs)
+    for job in jobs:
+        enqueue_download(job)
+
+def claim_queued_job(download_id):
+    """Take one job out of the shared queue without running it (to cancel or delete it here)"""
+    if worker_coordinator is None:
+        return None
+    rows = job_store.claim_queued(worker_id, 1, download_id=download_id)
+    if not rows:
+        return None
+    job = DownloadJob.from_dict(rows[0])
+    job.owner = worker_id
+    job_registry.restore([job])
+    return job
+
+def shared_queue_start(position, now):
+    """Expected start of the position-th job in the shared queue
+
+    All workers' slots drain the shared queue, so it advances by MAX_DOWNLOADS
+    jobs per average job duration.
+    """
+    duration = download_scheduler.average_duration('single')
+    return now + math.ceil(position / max_downloads) * duration
+
+def release_queued_download(job):
+    """Handle shared-download bookkeeping for a job removed before it started"""
+    if job.shared_with:
+        download_coalescer.detach(job, job.shared_with)
+    else:
+        complete_shared_download(job, False)
+
+def cancel_job(job):
+    """Mark a job cancelled and take it out of the queue if it has not started"""
+    with requeue_lock:
+        job_registry.update_job(job, status='cancelled', message='İndirme iptal edildi')
+        
+        # Henüz başlamamış (veya tekrar denemeyi bekleyen) işi kuyruktan çıkar, çalışıyorsa durdur
+        removed = download_scheduler.remove(job.download_id)
+        if not removed:
+            cancellations.cancel(job.download_id)
+    if removed or job.shared_with:
+        release_queued_download(job)
+
+def job_status_dict(job):
+    """Status payload; followers show the live progress of the job they share"""
+    download_info = job.to_dict()
+    if job.shared_with and download_info['status'] in ACTIVE_STATUSES:
+        leader = find_job(job.shared_with)
+        if leader is not None:
+            leader_info = leader.to_dict()
+            for field in ('status', 'progress', 'speed', 'downloaded_bytes', 'total_bytes', 'message'):
+                download_info[field] = leader_info[field]
+    # Çalışan indirmenin anlık bant genişliği payı ve ölçülen hızı
+    bandwidth = bandwidth_shaper.job_stats(job.shared_with or job.download_id)
+    if bandwidth is not None:
+        download_info['bandwidth'] = bandwidth
+    fragments = fragment_tuner.job_stats(job.shared_with or job.download_id)
+    if fragments is not None:
+        download_info['fragments'] = fragments
+    return download_info
+
+# Toplu indirmeler (URL listesi veya playlist/kanal)
+batch_settings = config.get('batch_settings', {})
+DOWNLOAD_FORMATS = ('mp3', 'audio', 'mp4')
+
+def is_collection_url(url):
+    """Playlist, channel or other multi-video URL"""
+    parsed = urlparse(url)
+    if 'list' in parse_qs(parsed.query):
+        return True
+    return parsed.path.startswith(('/playlist', '/channel/', '/c/', '/user/', '/@'))
+
+def flat_entry_url(entry):
+    """Watch URL of a flat-extracted entry"""
+    video_url = entry.get('webpage_url') or entry.get('url')
+    if not video_url and entry.get('id'):
+        video_url = f"https://www.youtube.com/watch?v={entry['id']}"
+    return video_url
+
+def iter_playlist_entries(url, max_depth=2):
+    """Flat video entries of a playlist/channel; pages are fetched only as entries are consumed"""
+    ydl_opts = build_ydl_opts(quiet=True, no_warnings=True, extract_flat='in_playlist', lazy_playlist=True)
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        def walk(info, depth):
+            if info.get('_type') not in ('playlist', 'multi_video') and 'entries' not in info:
+                # Tek video
+                yield info
+                return
+            for entry in info.get('entries') or ():
+                if not entry:
+                    continue
+                # Kanal sekmeleri (Videolar, Shorts...) iç içe playlist olarak gelir
+                if entry.get('_type') == 'playlist' or entry.get('ie_key') == 'YoutubeTab':
+                    if depth < max_depth:
+                        nested = entry if 'entries' in entry else ydl.extract_info(entry['url'], download=False, process=False)
+                        yield from walk(nested, depth + 1)
+                    continue
+                yield entry
+        
+        yield from walk(ydl.extract_info(url, download=False, process=False), 0)
+
+def iter_batch_entries(urls):
+    """Expand a batch request lazily: plain video URLs pass through, collections are paged"""
+    for url in urls:
+        if not is_collection_url(url):
+            yield url
+            continue
+        try:
+            for entry in iter_playlist_entries(url):
+                video_url = flat_entry_url(entry)
+                if video_url:
+                    yield video_url
+        except Exception as e:
+            # Açılamayan kaynak toplu işte kaydedilir, sıradaki URL'ye geçilir
+            yield FailedEntry(url, f"Girdiler alınamadı: {str(e)}")
+
+def create_batch_child(batch, video_url):
+    options = batch.options
+    job = DownloadJob(
+        str(uuid.uuid4()), video_url, options['format'], options['quality'], options['output_path'],
+        message=f"{options['format'].upper()} İndirme kuyruğa alındı (toplu: {batch.batch_id})"
+    )
+    job.batch_id = batch.batch_id
+    job.rate_limit = options.get('rate_limit')
+    return job_registry.add(job)
+
+# Playlist/kanal girdilerini NDJSON olarak sayfa sayfa gönderir
+playlist_settings = config.get('playlist_settings', {})
+PLAYLIST_PAGE_MAX = int(playlist_settings.get('max_page_size', 500))
+playlist_cursors = PlaylistCursors(
+    iter_playlist_entries,
+    max_sessions=int(playlist_settings.get('max_open_cursors', 100)),
+    ttl=float(playlist_settings.get('cursor_ttl_seconds', 300))
+)
+
+def playlist_row(entry):
+    """Compact NDJSON row of a flat playlist entry"""
+    thumbnails = entry.get('thumbnails') or []
+    return {
+        'id': entry.get('id'),
+        'title': entry.get('title'),
+        'url': flat_entry_url(entry),
+        'duration': entry.get('duration'),
+        'channel': entry.get('channel') or entry.get('uploader'),
+        'view_count': entry.get('view_count'),
+        'thumbnail': entry.get('thumbnail') or (thumbnails[-1].get('url') if thumbnails else None)
+    }
+
+batch_manager = BatchManager(
+    create_child=create_batch_child,
+    enqueue_child=enqueue_download,
+    cancel_child=cancel_job,
+    max_workers=int(batch_settings.get('expand_workers', 2)),
+    max_batches=int(batch_settings.get('max_batches', 100))
+)
+
+def find_job(download_id):
+    """Local job, or in shared mode the last stored state of a job run by another worker"""
+    job = job_registry.get(download_id)
+    if job is None and shared_state:
+        data = job_store.get(download_id)
+        if data is not None:
+            job = DownloadJob.from_dict(data)
+    return job
+
+def is_local_job(download_id):
+    return download_id in job_registry
+
+def adopt_jobs(rows):
+    """Take stored jobs into this process and requeue the interrupted ones"""
+    jobs = [DownloadJob.from_dict(data) for data in rows]
+    for job in jobs:
+        if worker_id is not None:
+            job.owner = worker_id
+    job_registry.restore(jobs)
+    
+    requeued = 0
+    for job in jobs:
+        if job.status in ACTIVE_STATUSES:
+            job_registry.update_job(
+                job,
+                status='queued',
+                shared_with=None,
+                message='Sunucu yeniden başlatıldı, indirme tekrar kuyruğa alındı'
+            )
+            enqueue_download(job)
+            requeued += 1
+    
+    if jobs:
+        print(f"{len(jobs)} iş kaydı yüklendi, {requeued} iş tekrar kuyruğa alındı")
+    return requeued
+
+def recover_jobs():
+    """Reload stored jobs and requeue the ones interrupted by a restart"""
+    if job_store is None:
+        return 0
+    if worker_coordinator is not None:
+        # Sadece sahibi olmayan veya sahibi sonlanmış işler alınır
+        return worker_coordinator.start()
+    return adopt_jobs(job_store.load())
+
+def apply_worker_action(target, action):
+    """Request left in the shared store by another worker for a job this worker runs"""
+    if action == 'cancel_batch':
+        batch_manager.cancel(target)
+    elif action == 'clear':
+        clear_jobs()
+    elif action == 'clear_all':
+        clear_jobs(include_active=True)
+    else:
+        job = job_registry.get(target)
+        if job is None:
+            return
+        if action == 'cancel':
+            cancel_job(job)
+        elif action == 'delete':
+            delete_job(job)
+
+def broadcast_worker_action(action):
+    """Ask every other live worker to apply an action to its own jobs"""
+    if worker_coordinator is None:
+        return 0
+    others = [owner for owner in job_store.live_owners(worker_coordinator.stale_after) if owner != worker_id]
+    for owner in others:
+        job_store.request_action(owner, action)
+    return len(others)
+
+worker_coordinator = WorkerCoordinator(
+    job_store, worker_id,
+    on_action=apply_worker_action,
+    on_adopt=adopt_jobs,
+    interval=job_store.flush_interval,
+    stale_after=float(job_settings.get('worker_stale_seconds', 45)),
+    on_claim=claim_jobs,
+    capacity=lambda: download_scheduler.free_slots('single')
+) if shared_state else None
+if worker_coordinator is not None:
+    # Boşalan slot ortak kuyruktaki sıradaki işi hemen alır
+    download_scheduler.on_slot_free = lambda lane: worker_coordinator.wake()
 
 @app.route('/', methods=['GET'])
 def home():
@@ -612,15 +1464,8 @@ def home():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    ffmpeg_available = check_ffmpeg_available()
-    
-    # Check if moviepy is available
-    moviepy_available = False
-    try:
-        import moviepy
-        moviepy_available = True
-    except ImportError:
-        pass
+    ffmpeg_available = capabilities.available('ffmpeg')
+    moviepy_available = capabilities.available('moviepy')
     
     return jsonify({
         'status': 'healthy',
@@ -632,9 +1477,50 @@ def health_check():
             'mp3_conversion': ffmpeg_available,
             'video_audio_merge': ffmpeg_available,
             'high_quality_downloads': moviepy_available or ffmpeg_available
-        }
+        },
+        'capabilities': capabilities.snapshot(),
+        'scheduler': download_scheduler.stats(),
+        'coalescing': download_coalescer.stats(),
+        'events': progress_broker.stats(),
+        'batches': batch_manager.stats(),
+        'playlists': playlist_cursors.stats(),
+        'worker': worker_coordinator.stats() if worker_coordinator is not None else None,
+        'cancellation': cancellations.stats(),
+        'retries': retry_metrics.stats(),
+        'bandwidth': bandwidth_shaper.stats(),
+        'fragments': fragment_tuner.stats(),
+        'job_store': job_store.stats() if job_store is not None else None
+    })
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Cache hit/miss/eviction counters"""
+    return jsonify({
+        'video_info': video_info_cache.stats(),
+        'search_results': search_results_cache.stats(),
+        'ydl_pool': ydl_pool.stats()
     })
 
+def collect_search_results(entries, futures):
+    """Results in search order; lookups still running after the deadline become lightweight records"""
+    processed_results = []
+    partial_results = 0
+    for entry, future in zip(entries, futures):
+        if not future.done():
+            # Süre doldu - arama sonucundaki bilgilerle hafif kayıt dön
+            future.cancel()
+            processed_results.append(build_lightweight_result(entry))
+            partial_results += 1
+            continue
+        try:
+            info = future.result()
+            if info:
+                processed_results.append(build_search_result(entry.get('url', ''), info))
+        except Exception as e:
+            print(f"Video bilgileri alınamadı: {str(e)}")
+            continue
+    return processed_results, partial_results
+
 @app.route('/api/search', methods=['GET', 'POST'])
 def search_video():
     """Search for video by query or URL"""
@@ -647,12 +1533,24 @@ def search_video():
         else:  # POST
             data = request.get_json()
             query = data.get('query', '').strip()
-            page = data.get('page', 1)
-            limit = data.get('limit', 10)
+            page = int(data.get('page', 1))
+            limit = int(data.get('limit', 10))
+        
+        page = max(1, page)
+        limit = max(1, min(limit, SEARCH_WINDOW_MAX))
         
         if not query:
             return jsonify({'error': 'Query parameter is required. Use ?q=query for GET or {"query": "query"} for POST'}), 400
         
+        # Playlist/kanal URL'leri satır satır /api/playlist üzerinden gönderilir
+        if is_collection_url(query) and not extract_video_id(query):
+            return jsonify({
+                'success': True,
+                'search_type': 'playlist',
+                'playlist_url': f'/api/playlist?url={quote(query, safe="")}',
+                'message': 'Playlist/kanal girdileri için playlist_url adresini kullanın (NDJSON)'
+            })
+        
         # Determine if it's a URL or search query
         if is_youtube_url(query):
             # Single video URL
@@ -664,99 +1562,45 @@ def search_video():
             if not info:
                 return jsonify({'error': 'Video bilgileri alınamadı'}), 500
             
-            # Get available qualities
-            quality_options, formats = get_available_qualities(info)
-            
             return jsonify({
                 'success': True,
                 'search_type': search_type,
                 'total_results': 1,
                 'page': 1,
                 'limit': 1,
-                'results': [{
-                    'video_url': video_url,
-                    'title': info.get('title', 'Bilinmiyor'),
-                    'duration': info.get('duration', 0),
-                    'uploader': info.get('uploader', 'Bilinmiyor'),
-                    'view_count': info.get('view_count', 0),
-                    'thumbnail': info.get('thumbnail', ''),
-                    'available_qualities': quality_options,
-                    'formats_count': len(formats),
-                    'download_links': {
-                        'mp3': {
-                            'best': f'/api/download/mp3?url={video_url}&quality=best',
-                            'high': f'/api/download/mp3?url={video_url}&quality=high',
-                            'medium': f'/api/download/mp3?url={video_url}&quality=medium',
-                            'low': f'/api/download/mp3?url={video_url}&quality=low',
-                            'audio_only': f'/api/download/audio?url={video_url}'
-                        },
-                        'mp4': {
-                            'best': f'/api/download/mp4?url={video_url}&quality=best',
-                            '1080p': f'/api/download/mp4?url={video_url}&quality=1080p',
-                            '720p': f'/api/download/mp4?url={video_url}&quality=720p',
-                            '480p': f'/api/download/mp4?url={video_url}&quality=480p',
-                            '360p': f'/api/download/mp4?url={video_url}&quality=360p'
-                        }
-                    }
-                }]
+                'results': [build_search_result(video_url, info)]
             })
         else:
             # Search query
             search_type = 'search'
+            deadline_at = time.time() + search_deadline
             
-            # Get search results
-            search_results = search_youtube(query, max_results=limit)
+            # Get search results (cached window sliced to the requested page)
+            search_results, has_more, from_cache = search_youtube_page(query, page=page, limit=limit)
             if not search_results:
-                return jsonify({'error': 'Video bulunamadı'}), 404
+                response = jsonify({'error': 'Video bulunamadı'})
+                response.headers['X-Cache'] = 'HIT' if from_cache else 'MISS'
+                return response, 404
             
-            # Process each result
-            processed_results = []
-            for entry in search_results:
-                if entry:
-                    try:
-                        # Get detailed info for each video
-                        info = get_video_info(entry.get('url', ''))
-                        if info:
-                            quality_options, formats = get_available_qualities(info)
-                            processed_results.append({
-                                'video_url': entry.get('url', ''),
-                                'title': info.get('title', 'Bilinmiyor'),
-                                'duration': info.get('duration', 0),
-                                'uploader': info.get('uploader', 'Bilinmiyor'),
-                                'view_count': info.get('view_count', 0),
-                                'thumbnail': info.get('thumbnail', ''),
-                                'available_qualities': quality_options,
-                                'formats_count': len(formats),
-                                'download_links': {
-                                    'mp3': {
-                                        'best': f'/api/download/mp3?url={entry.get("url", "")}&quality=best',
-                                        'high': f'/api/download/mp3?url={entry.get("url", "")}&quality=high',
-                                        'medium': f'/api/download/mp3?url={entry.get("url", "")}&quality=medium',
-                                        'low': f'/api/download/mp3?url={entry.get("url", "")}&quality=low',
-                                        'audio_only': f'/api/download/audio?url={entry.get("url", "")}'
-                                    },
-                                    'mp4': {
-                                        'best': f'/api/download/mp4?url={entry.get("url", "")}&quality=best',
-                                        '1080p': f'/api/download/mp4?url={entry.get("url", "")}&quality=1080p',
-                                        '720p': f'/api/download/mp4?url={entry.get("url", "")}&quality=720p',
-                                        '480p': f'/api/download/mp4?url={entry.get("url", "")}&quality=480p',
-                                        '360p': f'/api/download/mp4?url={entry.get("url", "")}&quality=360p'
-                                    }
-                                }
-                            })
-                    except Exception as e:
-                        print(f"Video bilgileri alınamadı: {str(e)}")
-                        continue
+            # Get detailed info for each video concurrently, keeping the original order
+            entries = [entry for entry in search_results if entry]
+            futures = [search_executor.submit(get_video_info, entry.get('url', '')) for entry in entries]
+            wait(futures, timeout=max(0, deadline_at - time.time()))
+            processed_results, partial_results = collect_search_results(entries, futures)
             
-            return jsonify({
+            response = jsonify({
                 'success': True,
                 'search_type': search_type,
                 'query': query,
                 'total_results': len(processed_results),
+                'partial_results': partial_results,
                 'page': page,
                 'limit': limit,
+                'has_more': has_more,
                 'results': processed_results
             })
+            response.headers['X-Cache'] = 'HIT' if from_cache else 'MISS'
+            return response
         
     except Exception as e:
         return jsonify({'error': f'Search error: {str(e)}'}), 500
@@ -781,31 +1625,27 @@ def start_mp3_download():
                 'error': 'Video URL is required. Use ?url=VIDEO_URL for GET or {"video_url": "URL"} for POST'
             }), 400
         
+        try:
+            rate_limit = requested_rate_limit(data if request.method == 'POST' else None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Diske yazmadan doğrudan istemciye aktar
+        if wants_stream(data if request.method == 'POST' else None):
+            return stream_download(video_url, 'mp3', quality)
+        
         # Generate unique download ID
         download_id = str(uuid.uuid4())
         
         # Initialize download status
-        downloads[download_id] = {
-            'status': 'queued',
-            'progress': 0,
-            'speed': '0 MB/s',
-            'downloaded_bytes': 0,
-            'total_bytes': 0,
-            'message': 'MP3 İndirme kuyruğa alındı',
-            'video_url': video_url,
-            'format': 'mp3',
-            'quality': quality,
-            'output_path': custom_path,
-            'start_time': time.time()
-        }
-        
-        # Start download in background thread
-        thread = threading.Thread(
-            target=download_video_api,
-            args=(video_url, 'mp3', quality, custom_path, download_id)
+        job = DownloadJob(
+            download_id, video_url, 'mp3', quality, custom_path,
+            message='MP3 İndirme kuyruğa alındı'
         )
-        thread.daemon = True
-        thread.start()
+        job.rate_limit = rate_limit
+        
+        # Kuyruğa ekle - boş worker olduğunda başlar
+        submit_download(job)
         
         return jsonify({
             'success': True,
@@ -838,31 +1678,27 @@ def start_audio_download():
                 'error': 'Video URL is required. Use ?url=VIDEO_URL for GET or {"video_url": "URL"} for POST'
             }), 400
         
+        try:
+            rate_limit = requested_rate_limit(data if request.method == 'POST' else None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Diske yazmadan doğrudan istemciye aktar
+        if wants_stream(data if request.method == 'POST' else None):
+            return stream_download(video_url, 'audio', 'best')
+        
         # Generate unique download ID
         download_id = str(uuid.uuid4())
         
         # Initialize download status
-        downloads[download_id] = {
-            'status': 'queued',
-            'progress': 0,
-            'speed': '0 MB/s',
-            'downloaded_bytes': 0,
-            'total_bytes': 0,
-            'message': 'Audio İndirme kuyruğa alındı',
-            'video_url': video_url,
-            'format': 'audio',
-            'quality': 'best',
-            'output_path': custom_path,
-            'start_time': time.time()
-        }
-        
-        # Start download in background thread
-        thread = threading.Thread(
-            target=download_video_api,
-            args=(video_url, 'audio', 'best', custom_path, download_id)
+        job = DownloadJob(
+            download_id, video_url, 'audio', 'best', custom_path,
+            message='Audio İndirme kuyruğa alındı'
         )
-        thread.daemon = True
-        thread.start()
+        job.rate_limit = rate_limit
+        
+        # Kuyruğa ekle - boş worker olduğunda başlar
+        submit_download(job)
         
         return jsonify({
             'success': True,
@@ -897,31 +1733,27 @@ def start_mp4_download():
                 'error': 'Video URL is required. Use ?url=VIDEO_URL for GET or {"video_url": "URL"} for POST'
             }), 400
         
+        try:
+            rate_limit = requested_rate_limit(data if request.method == 'POST' else None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Diske yazmadan doğrudan istemciye aktar
+        if wants_stream(data if request.method == 'POST' else None):
+            return stream_download(video_url, 'mp4', quality)
+        
         # Generate unique download ID
         download_id = str(uuid.uuid4())
         
         # Initialize download status
-        downloads[download_id] = {
-            'status': 'queued',
-            'progress': 0,
-            'speed': '0 MB/s',
-            'downloaded_bytes': 0,
-            'total_bytes': 0,
-            'message': 'MP4 İndirme kuyruğa alındı',
-            'video_url': video_url,
-            'format': 'mp4',
-            'quality': quality,
-            'output_path': custom_path,
-            'start_time': time.time()
-        }
-        
-        # Start download in background thread
-        thread = threading.Thread(
-            target=download_video_api,
-            args=(video_url, 'mp4', quality, custom_path, download_id)
+        job = DownloadJob(
+            download_id, video_url, 'mp4', quality, custom_path,
+            message='MP4 İndirme kuyruğa alındı'
         )
-        thread.daemon = True
-        thread.start()
+        job.rate_limit = rate_limit
+        
+        # Kuyruğa ekle - boş worker olduğunda başlar
+        submit_download(job)
         
         return jsonify({
             'success': True,
@@ -958,31 +1790,27 @@ def start_download():
                 'error': 'Video URL is required. Use ?url=VIDEO_URL for GET or {"video_url": "URL"} for POST'
             }), 400
         
+        try:
+            rate_limit = requested_rate_limit(data if request.method == 'POST' else None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Diske yazmadan doğrudan istemciye aktar
+        if wants_stream(data if request.method == 'POST' else None):
+            return stream_download(video_url, format_type, quality)
+        
         # Generate unique download ID
         download_id = str(uuid.uuid4())
         
         # Initialize download status
-        downloads[download_id] = {
-            'status': 'queued',
-            'progress': 0,
-            'speed': '0 MB/s',
-            'downloaded_bytes': 0,
-            'total_bytes': 0,
-            'message': f'{format_type.upper()} İndirme kuyruğa alındı',
-            'video_url': video_url,
-            'format': format_type,
-            'quality': quality,
-            'output_path': custom_path,
-            'start_time': time.time()
-        }
-        
-        # Start download in background thread
-        thread = threading.Thread(
-            target=download_video_api,
-            args=(video_url, format_type, quality, custom_path, download_id)
+        job = DownloadJob(
+            download_id, video_url, format_type, quality, custom_path,
+            message=f'{format_type.upper()} İndirme kuyruğa alındı'
         )
-        thread.daemon = True
-        thread.start()
+        job.rate_limit = rate_limit
+        
+        # Kuyruğa ekle - boş worker olduğunda başlar
+        submit_download(job)
         
         return jsonify({
             'success': True,
@@ -996,49 +1824,424 @@ def start_download():
     except Exception as e:
         return jsonify({'error': f'Download error: {str(e)}'}), 500
 
+def stored_batch(batch_id):
+    """Read-only view of a batch run by another worker, rebuilt from its stored children"""
+    if not shared_state:
+        return None
+    children = [DownloadJob.from_dict(data) for data in job_store.by_batch(batch_id)]
+    if not children:
+        return None
+    first = children[0]
+    batch = DownloadBatch(batch_id, iter(()), {
+        'format': first.format, 'quality': first.quality, 'output_path': first.output_path
+    }, max_concurrency=None, max_items=len(children))
+    batch.children = children
+    batch.start_time = first.start_time
+    if all(job.status not in ACTIVE_STATUSES for job in children):
+        batch.status = 'completed'
+        batch.end_time = max(job.end_time or job.start_time for job in children)
+    return batch
+
+@app.route('/api/download/batch', methods=['POST'])
+def start_batch_download():
+    """Download several videos or a whole playlist/channel as one batch"""
+    try:
+        data = request.get_json(silent=True) or {}
+        urls = data.get('urls') or []
+        if isinstance(urls, str):
+            urls = [urls]
+        if data.get('url'):
+            urls = [data['url']] + list(urls)
+        urls = [u.strip() for u in urls if isinstance(u, str) and u.strip()]
+        if not urls:
+            return jsonify({
+                'error': 'URL listesi gerekli. {"urls": ["URL1", "URL2"]} veya playlist/kanal için {"url": "PLAYLIST_URL"}'
+            }), 400
+        
+        format_type = data.get('format', 'mp4')
+        if format_type not in DOWNLOAD_FORMATS:
+            return jsonify({'error': f"Geçersiz format. Desteklenen: {', '.join(DOWNLOAD_FORMATS)}"}), 400
+        
+        default_concurrency = int(batch_settings.get('max_concurrency', 2))
+        concurrency = max(1, min(int(data.get('concurrency', default_concurrency)), max_downloads))
+        max_items_limit = int(batch_settings.get('max_items', 500))
+        max_items = max(1, min(int(data.get('limit', max_items_limit)), max_items_limit))
+        
+        batch_id = str(uuid.uuid4())
+        batch = batch_manager.create(
+            batch_id,
+            iter_batch_entries(urls),
+            {
+                'format': format_type,
+                'quality': data.get('quality', 'best'),
+                'output_path': data.get('output_path', download_path),
+                'rate_limit': parse_rate(data.get('rate_limit'))
+            },
+            max_concurrency=concurrency,
+            max_items=max_items,
+            source=urls[0] if len(urls) == 1 else f'{len(urls)} URL'
+        )
+        
+        return jsonify({
+            'success': True,
+            'batch_id': batch.batch_id,
+            'message': 'Toplu indirme başlatıldı',
+            'format': format_type,
+            'max_concurrency': concurrency,
+            'max_items': max_items,
+            'status_url': f'/api/batch/{batch.batch_id}'
+        })
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Geçersiz parametre: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Batch download error: {str(e)}'}), 500
+
+@app.route('/api/playlist', methods=['GET'])
+def stream_playlist():
+    """Stream playlist/channel entries as NDJSON (?url=... or ?cursor=... to continue)"""
+    url = request.args.get('url', '').strip()
+    cursor = request.args.get('cursor', '').strip()
+    if not url and not cursor:
+        return jsonify({'error': 'url veya cursor parametresi gerekli'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 100)), PLAYLIST_PAGE_MAX))
+    except ValueError:
+        return jsonify({'error': 'Geçersiz limit'}), 400
+    
+    try:
+        session = playlist_cursors.resume(cursor) if cursor else playlist_cursors.open(url)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Playlist açılamadı: {str(e)}'}), 502
+    
+    # İlk girdi yanıt başlamadan alınır; playlist hiç açılamazsa hata JSON olarak döner
+    try:
+        first = session.next_entry()
+    except Exception as e:
+        session.close()
+        return jsonify({'error': f'Playlist alınamadı: {str(e)}'}), 502
+    
+    page = PlaylistPage(playlist_cursors, session, limit, playlist_row, first=first)
+    return Response(page, mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/batch/<batch_id>', methods=['GET'])
+def get_batch_status(batch_id):
+    """Aggregate progress of a batch and the state of its downloads"""
+    batch = batch_manager.get(batch_id) or stored_batch(batch_id)
+    if batch is None:
+        return jsonify({'error': 'Batch ID not found'}), 404
+    return jsonify(batch.summary())
+
+@app.route('/api/batch/<batch_id>/cancel', methods=['GET', 'POST'])
+def cancel_batch(batch_id):
+    """Stop expanding a batch and cancel its unfinished downloads"""
+    batch = batch_manager.cancel(batch_id)
+    if batch is None:
+        batch = stored_batch(batch_id)
+        if batch is None:
+            return jsonify({'error': 'Batch ID not found'}), 404
+        # Toplu işi başka bir worker yürütüyor
+        job_store.request_action(batch_id, 'cancel_batch')
+        return jsonify({
+            'success': True,
+            'message': 'İptal isteği iletildi',
+            'status': batch.status
+        })
+    return jsonify({
+        'success': True,
+        'message': 'Toplu indirme iptal edildi',
+        'status': batch.status
+    })
+
+@app.route('/api/batches', methods=['GET'])
+def list_batches():
+    """Known batches without their per-download details"""
+    return jsonify({
+        'batches': [batch.summary(include_children=False) for batch in batch_manager.list()],
+        'stats': batch_manager.stats()
+    })
+
 @app.route('/api/status/<download_id>', methods=['GET'])
 def get_download_status(download_id):
     """Get download status"""
-    if download_id not in downloads:
+    job = find_job(download_id)
+    if job is None:
         return jsonify({'error': 'Download ID not found'}), 404
     
-    download_info = downloads[download_id].copy()
+    download_info = job_status_dict(job)
     
     # Calculate elapsed time
-    if 'start_time' in download_info:
-        elapsed = time.time() - download_info['start_time']
-        download_info['elapsed_time'] = f"{elapsed:.1f} seconds"
+    elapsed = time.time() - download_info['start_time']
+    download_info['elapsed_time'] = f"{elapsed:.1f} seconds"
+    
+    if download_info['status'] == 'completed' and download_info.get('file_info'):
+        download_info['file_url'] = f'/api/file/{download_id}'
+    
+    # Tekrar denemeyi bekleyen iş
+    if download_info['status'] == 'retrying':
+        retry_at = download_scheduler.ready_at(download_id)
+        if retry_at is not None:
+            download_info['retry_in'] = f"{max(0, retry_at - time.time()):.1f} seconds"
+    
+    # Queue position and expected start for waiting jobs
+    if download_info['status'] == 'queued':
+        now = time.time()
+        position = download_scheduler.queue_position(download_id)
+        expected_start = download_scheduler.estimate_start(download_id, now=now)
+        if position is not None:
+            download_info['queue_position'] = position
+            download_info['lane'] = download_scheduler.lane_of(download_id)
+        elif worker_coordinator is not None:
+            # Henüz hiçbir worker'ın almadığı iş ortak kuyrukta bekler
+            position = job_store.queue_position(download_id)
+            if position is not None:
+                download_info['queue_position'] = position
+                download_info['lane'] = 'single'
+                download_info['shared_queue'] = True
+                expected_start = shared_queue_start(position, now)
+        if expected_start is not None:
+            download_info['expected_start_time'] = expected_start
+            download_info['expected_start_in'] = f"{max(0, expected_start - now):.1f} seconds"
     
     return jsonify(download_info)
 
+# Bir bağlantıda izlenebilecek en fazla indirme sayısı
+MAX_EVENT_IDS = 100
+
+def job_event_snapshot(download_id):
+    """SSE payload of a job plus the jobs whose updates change it"""
+    job = find_job(download_id)
+    if job is None:
+        return None, ()
+    download_info = job_status_dict(job)
+    if download_info['status'] == 'completed' and download_info.get('file_info'):
+        download_info['file_url'] = f'/api/file/{download_id}'
+    return download_info, ((job.shared_with,) if job.shared_with else ())
+
+def event_stream_response(download_ids):
+    """text/event-stream response pushing status updates for the given downloads"""
+    # Akış bitene kadar bu thread meşgul kalır; sınırın üstündeki istemciler sonra yeniden dener
+    streams = thread_event_streams
+    subscription = None
+    if streams.acquire(blocking=False):
+        subscription = progress_broker.subscribe(download_ids)
+        if subscription is None:
+            streams.release()
+    if subscription is None:
+        response = jsonify({'error': 'Çok fazla canlı bağlantı, lütfen /api/status kullanın'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    
+    min_interval = float(events_settings.get('min_interval_seconds', 0.5))
+    try:
+        interval = max(min_interval, float(request.args.get('interval', min_interval)))
+    except ValueError:
+        interval = min_interval
+    stream = EventStream(
+        progress_broker, subscription, download_ids, job_event_snapshot,
+        interval=interval,
+        max_duration=float(events_settings.get('max_duration_seconds', 120)),
+        keepalive=float(events_settings.get('keepalive_seconds', 15)),
+        is_local=is_local_job if shared_state else None,
+        remote_poll=job_store.flush_interval if shared_state else 1.0
+    )
+    response = Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # İstemci bağlantıyı kapattığında da çağrılır
+    response.call_on_close(streams.release)
+    return response
+
+@app.route('/api/events/<download_id>', methods=['GET'])
+def download_events(download_id):
+    """Server-Sent Events stream of a download's progress"""
+    if find_job(download_id) is None:
+        return jsonify({'error': 'Download ID not found'}), 404
+    return event_stream_response([download_id])
+
+@app.route('/api/events', methods=['GET'])
+def multiplexed_events():
+    """Server-Sent Events for several downloads on one connection (?ids=a,b,c)"""
+    download_ids = [i for i in request.args.get('ids', '').split(',') if i.strip()]
+    download_ids = list(dict.fromkeys(i.strip() for i in download_ids))
+    if not download_ids:
+        return jsonify({'error': 'ids parametresi gerekli'}), 400
+    if len(download_ids) > MAX_EVENT_IDS:
+        return jsonify({'error': f'En fazla {MAX_EVENT_IDS} indirme izlenebilir'}), 400
+    return event_stream_response(download_ids)
+
+# Dosya gönderimi için okuma boyutu (sendfile kullanılamazsa)
+FILE_CHUNK_SIZE = 256 * 1024
+
+def job_artifact_path(job):
+    """Path of the finished file a job can serve (shared jobs point at the leader's file)"""
+    if job.output_files:
+        return job.output_files[0]
+    if job.file_info and job.file_info.get('filename'):
+        # Manifest öncesi kayıtlar
+        return os.path.join(job.output_path, job.file_info['filename'])
+    return None
+
+def iter_file_range(path, start, length):
+    """Yield `length` bytes from `start` without loading the file into memory"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def send_artifact(path, download_name, as_attachment=True):
+    """Stream a file with ETag/Last-Modified and Range/If-Range support"""
+    stat = os.stat(path)
+    size = stat.st_size
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+    etag = f"{stat.st_ino:x}-{size:x}-{int(stat.st_mtime * 1000):x}"
+    
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': quote_etag(etag),
+        'Last-Modified': http_date(last_modified),
+        'Content-Disposition': "{}; filename=\"{}\"; filename*=UTF-8''{}".format(
+            'attachment' if as_attachment else 'inline',
+            download_name.encode('ascii', 'ignore').decode('ascii').replace('"', '') or 'download',
+            quote(download_name)
+        )
+    }
+    mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    
+    # Conditional GET
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = request.if_modified_since is not None and request.if_modified_since >= last_modified
+    if not_modified:
+        return Response(status=304, headers=headers)
+    
+    # Range sadece If-Range hâlâ geçerliyse uygulanır
+    start, length, status = 0, size, 200
+    byte_range = request.range
+    if byte_range is not None:
+        if_range = parse_if_range_header(request.headers.get('If-Range'))
+        if if_range.etag is not None:
+            range_valid = if_range.etag == etag
+        elif if_range.date is not None:
+            range_valid = if_range.date >= last_modified
+        else:
+            range_valid = True
+        
+        if range_valid:
+            bounds = byte_range.range_for_length(size)
+            if bounds is None:
+                headers['Content-Range'] = f'bytes */{size}'
+                return Response(status=416, headers=headers)
+            start, stop = bounds
+            length = stop - start
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+    
+    headers['Content-Length'] = str(length)
+    if request.method == 'HEAD':
+        return Response(status=status, headers=headers, mimetype=mimetype)
+    
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if file_wrapper is not None and start + length == size:
+        # Sunucunun sendfile destekli wrapper'ı (gunicorn vb.): dosya konumundan
+        # sonuna kadar çekirdek tarafından gönderilir, Python belleğine kopyalanmaz
+        f = open(path, 'rb')
+        f.seek(start)
+        body = file_wrapper(f, FILE_CHUNK_SIZE)
+    else:
+        body = iter_file_range(path, start, length)
+    
+    return Response(body, status=status, headers=headers, mimetype=mimetype, direct_passthrough=True)
+
+@app.route('/api/file/<download_id>', methods=['GET', 'HEAD'])
+def download_file(download_id):
+    """Serve the finished file of a download"""
+    job = find_job(download_id)
+    if job is None:
+        return jsonify({'error': 'Download ID not found'}), 404
+    
+    if job.status != 'completed':
+        return jsonify({
+            'error': 'İndirme henüz tamamlanmadı',
+            'status': job_status_dict(job)['status']
+        }), 409
+    
+    path = job_artifact_path(job)
+    if not path or not os.path.isfile(path):
+        return jsonify({'error': 'Dosya artık mevcut değil'}), 410
+    
+    as_attachment = request.args.get('inline', '0') not in ('1', 'true')
+    return send_artifact(path, os.path.basename(path), as_attachment=as_attachment)
+
 @app.route('/api/downloads', methods=['GET'])
 def list_downloads():
-    """List all downloads"""
+    """List downloads (paginated, optionally filtered by status)"""
+    status = request.args.get('status') or None
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = max(1, min(int(request.args.get('limit', 100)), 1000))
+    except ValueError:
+        return jsonify({'error': 'Geçersiz offset veya limit'}), 400
+    newest_first = request.args.get('order', 'asc') == 'desc'
+    
+    if shared_state:
+        # Tüm worker'ların işleri ortak kayıttan; bu worker'ınkiler canlı nesneden
+        jobs = [job_registry.get(data['download_id']) or DownloadJob.from_dict(data)
+                for data in job_store.list_page(status, offset, limit, newest_first)]
+        total = job_store.count(status)
+        counts = job_store.counts()
+    else:
+        jobs = job_registry.list(status=status, offset=offset, limit=limit, newest_first=newest_first)
+        total = job_registry.count(status)
+        counts = job_registry.counts()
+    
+    now = time.time()
     download_list = []
-    for download_id, info in downloads.items():
-        download_info = info.copy()
-        download_info['download_id'] = download_id
+    for job in jobs:
+        download_info = job_status_dict(job)
         
         # Calculate elapsed time
-        if 'start_time' in download_info:
-            elapsed = time.time() - download_info['start_time']
-            download_info['elapsed_time'] = f"{elapsed:.1f} seconds"
+        elapsed = now - download_info['start_time']
+        download_info['elapsed_time'] = f"{elapsed:.1f} seconds"
         
         download_list.append(download_info)
     
     return jsonify({
         'downloads': download_list,
-        'total': len(download_list)
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'counts': counts
     })
 
 @app.route('/api/cancel/<download_id>', methods=['GET', 'POST'])
 def cancel_download(download_id):
     """Cancel a download"""
-    if download_id not in downloads:
-        return jsonify({'error': 'Download ID not found'}), 404
+    job = job_registry.get(download_id) or claim_queued_job(download_id)
+    if job is None:
+        if find_job(download_id) is None:
+            return jsonify({'error': 'Download ID not found'}), 404
+        # İşi başka bir worker çalıştırıyor - isteği ona bırak
+        job_store.request_action(download_id, 'cancel')
+        return jsonify({
+            'success': True,
+            'message': 'İptal isteği iletildi'
+        })
     
-    downloads[download_id]['status'] = 'cancelled'
-    downloads[download_id]['message'] = 'İndirme iptal edildi'
+    cancel_job(job)
     
     return jsonify({
         'success': True,
@@ -1048,63 +2251,145 @@ def cancel_download(download_id):
 @app.route('/api/delete/<download_id>', methods=['GET', 'POST'])
 def delete_download(download_id):
     """Delete a specific download from history"""
-    if download_id not in downloads:
-        return jsonify({'error': 'Download ID not found'}), 404
+    job = job_registry.get(download_id) or claim_queued_job(download_id)
+    if job is None:
+        if find_job(download_id) is None:
+            return jsonify({'error': 'Download ID not found'}), 404
+        job_store.request_action(download_id, 'delete')
+        return jsonify({
+            'success': True,
+            'message': 'Silme isteği iletildi'
+        })
     
-    # Remove the download from history
-    del downloads[download_id]
+    delete_job(job)
     
     return jsonify({
         'success': True,
         'message': 'İndirme geçmişten silindi'
     })
 
+def delete_job(job):
+    """Remove a job from history; a queued job will not run"""
+    with requeue_lock:
+        if job_registry.remove(job.download_id) is None:
+            return
+        # Kuyrukta bekliyorsa çalışmasın
+        removed = download_scheduler.remove(job.download_id)
+        running = not removed and cancellations.cancel(job.download_id) is not None
+    if removed or job.shared_with:
+        job_registry.update_job(job, status='cancelled')
+        release_queued_download(job)
+    elif running:
+        # Çalışan indirme durdurulur; dosyalarını worker temizler
+        job_registry.update_job(job, status='cancelled')
+
+def clear_jobs(include_active=False):
+    """Drop finished jobs from history; with include_active, cancel queued and running jobs first"""
+    if not include_active:
+        return job_registry.clear(keep_statuses=ACTIVE_STATUSES)
+    
+    # Toplu indirmeler yeni alt iş üretmesin
+    for batch in batch_manager.list():
+        batch_manager.cancel(batch.batch_id)
+    if worker_coordinator is not None:
+        # Ortak kuyrukta henüz alınmamış işler hiç başlamaz
+        job_store.forget_unclaimed()
+    active = [job for status in ACTIVE_STATUSES
+              for job in job_registry.list(status=status, limit=len(job_registry))]
+    # Önce takipçiler: lider iptal edildiğinde kendi indirmeleri olarak kuyruğa alınmasınlar
+    active.sort(key=lambda job: job.shared_with is None)
+    for job in active:
+        # İptal durum değişikliği ile toplu indirme slotunu ve paylaşılan indirmeyi serbest bırakır
+        if job.status in ACTIVE_STATUSES:
+            cancel_job(job)
+    return job_registry.clear()
+
 @app.route('/api/clear', methods=['GET', 'POST'])
 def clear_downloads():
     """Clear completed downloads"""
-    global downloads
-    
     # Keep only active downloads
-    active_downloads = {}
-    for download_id, info in downloads.items():
-        if info['status'] in ['queued', 'starting', 'downloading']:
-            active_downloads[download_id] = info
-    
-    downloads = active_downloads
+    removed = clear_jobs()
     
-    return jsonify({
+    response = {
         'success': True,
         'message': 'Tamamlanan indirmeler temizlendi',
-        'remaining_downloads': len(downloads)
-    })
+        'removed_downloads': removed,
+        'remaining_downloads': len(job_registry)
+    }
+    if shared_state:
+        response['notified_workers'] = broadcast_worker_action('clear')
+    return jsonify(response)
 
 @app.route('/api/clear/all', methods=['GET', 'POST'])
 def clear_all_downloads():
     """Clear all downloads (including active ones)"""
-    global downloads
-    
-    downloads = {}
+    # Çalışan ve kuyruktaki işler silinmeden önce iptal edilir
+    removed = clear_jobs(include_active=True)
     
-    return jsonify({
+    response = {
         'success': True,
-        'message': 'Tüm indirmeler temizlendi'
-    })
+        'message': 'Tüm indirmeler temizlendi',
+        'removed_downloads': removed
+    }
+    if shared_state:
+        response['notified_workers'] = broadcast_worker_action('clear_all')
+    return jsonify(response)
+
+def job_output_files(job):
+    """Files on disk that belong to a job"""
+    if job.shared_with:
+        # Paylaşılan dosyanın sahibi lider iştir
+        return []
+    if job.output_files:
+        return list(job.output_files)
+    path = job_artifact_path(job)
+    return [path] if path else []
+
+def job_output_dirs(job):
+    """Per-job directory to remove once its files are gone"""
+    if job.shared_with or not shard_output_dirs:
+        # Paylaşılan klasör (ör. downloads/) iş klasörü değildir
+        return []
+    return [sharded_output_dir(job.output_path, job.download_id)]
+
+# Süresi dolan iş kayıtlarını ve dosyalarını arka planda temizler
+janitor = Janitor(job_registry, download_path, policy=config.get('retention_settings'),
+                  job_files=job_output_files, job_dirs=job_output_dirs)
+
+@app.route('/api/janitor', methods=['GET', 'POST'])
+def janitor_status():
+    """Retention policy status; POST runs a cleanup pass immediately"""
+    if request.method == 'POST':
+        report = janitor.run()
+        return jsonify({'success': True, 'report': report})
+    return jsonify(janitor.stats())
+
+recover_jobs()
+janitor.start()
 
 if __name__ == '__main__':
     print("YouTube MP3/MP4 İndirici - HTTP API Server")
     print("=" * 50)
     print(f"API Server başlatılıyor...")
     print(f"İndirme klasörü: {download_path}")
+    print(f"Eşzamanlı indirme: {max_downloads}")
     print(f"Web Arayüzü: http://localhost:5000")
     print(f"API Endpoint'leri:")
     print(f"  GET  / - Web arayüzü ve dokümantasyon")
     print(f"  GET  /api/health - Sağlık kontrolü")
     print(f"  GET/POST /api/search - Video arama")
     print(f"  POST /api/download - İndirme başlat")
+    print(f"  GET  /api/playlist?url=PLAYLIST_URL - Playlist/kanal girdileri (NDJSON)")
+    print(f"  POST /api/download/batch - Toplu/playlist indirme")
+    print(f"  GET  /api/batch/<id> - Toplu indirme durumu")
     print(f"  GET  /api/status/<id> - İndirme durumu")
+    print(f"  GET  /api/events/<id> - İndirme ilerlemesi (Server-Sent Events)")
+    print(f"  GET  /api/events?ids=a,b - Birden fazla indirme için tek SSE bağlantısı")
     print(f"  GET  /api/downloads - Tüm indirmeler")
+    print(f"  GET  /api/file/<id> - İndirilen dosyayı al (Range destekli)")
     print(f"  POST /api/cancel/<id> - İndirme iptal")
     print(f"  POST /api/clear - Tamamlananları temizle")
+    print(f"  GET/POST /api/janitor - Saklama politikası / temizlik")
     print("=" * 50)
     
     # JSON response'ları güzel formatla
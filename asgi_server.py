@@ -0,0 +1,239 @@
+"""
+ASGI Server
+api_server ile aynı route'lar, asyncio üzerinde (Starlette + uvicorn).
+Bekleme süresi uzun olan istekler (arama, playlist akışı, SSE) coroutine olarak
+çalışır; yt-dlp çağrıları sınırlı thread havuzlarında yapılır. Böylece bekleyen
+binlerce istemci ve SSE abonesi işletim sistemi thread'i tutmaz.
+Diğer route'lar sınırlı bir WSGI havuzu üzerinden Flask uygulamasına gider.
+
+Kullanım: uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import api_server
+from api_server import (
+    app as flask_app, config, search_executor, search_deadline, SEARCH_WINDOW_MAX,
+    MAX_EVENT_IDS, PLAYLIST_PAGE_MAX, events_settings, progress_broker, playlist_cursors,
+    get_video_info, search_youtube_page, collect_search_results, build_search_result,
+    is_collection_url, is_youtube_url, extract_video_id, job_event_snapshot, find_job,
+    is_local_job, playlist_row
+)
+from playlist_stream import PlaylistPage
+from progress_events import AsyncSubscription, EventStream
+
+asgi_settings = config.get('asgi_settings', {})
+# Arama sayfası, tek video bilgisi ve playlist sayfaları için yt-dlp thread'leri
+extract_workers = int(os.environ.get('ASGI_EXTRACT_WORKERS', asgi_settings.get('extract_workers', 32)))
+extract_executor = ThreadPoolExecutor(max_workers=extract_workers, thread_name_prefix='extract')
+# Flask'a giden route'lar (indirme başlatma, durum, dosya...) için thread sayısı
+wsgi_workers = int(os.environ.get('ASGI_WSGI_WORKERS', asgi_settings.get('wsgi_workers', 16)))
+
+
+async def run_blocking(func, *args, executor=None):
+    """Run a blocking call in a bounded pool without holding the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor or extract_executor, func, *args)
+
+
+async def lookup_job(func, *args):
+    """Job lookups read the shared SQLite store in shared mode; keep those off the event loop"""
+    if api_server.shared_state:
+        return await run_blocking(func, *args)
+    return func(*args)
+
+
+async def request_params(request):
+    """Query string for GET, JSON body for POST (same shape the Flask routes read)"""
+    if request.method == 'GET':
+        return dict(request.query_params)
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    return data if isinstance(data, dict) else {}
+
+
+async def search_video(request):
+    """Search for video by query or URL"""
+    try:
+        params = await request_params(request)
+        query = (params.get('q' if request.method == 'GET' else 'query') or '').strip()
+        page = max(1, int(params.get('page', 1)))
+        limit = max(1, min(int(params.get('limit', 10)), SEARCH_WINDOW_MAX))
+
+        if not query:
+            return JSONResponse({'error': 'Query parameter is required. Use ?q=query for GET or {"query": "query"} for POST'}, 400)
+
+        if is_collection_url(query) and not extract_video_id(query):
+            return JSONResponse({
+                'success': True,
+                'search_type': 'playlist',
+                'playlist_url': f'/api/playlist?url={quote(query, safe="")}',
+                'message': 'Playlist/kanal girdileri için playlist_url adresini kullanın (NDJSON)'
+            })
+
+        if is_youtube_url(query):
+            info = await run_blocking(get_video_info, query)
+            if not info:
+                return JSONResponse({'error': 'Video bilgileri alınamadı'}, 500)
+            return JSONResponse({
+                'success': True,
+                'search_type': 'url',
+                'total_results': 1,
+                'page': 1,
+                'limit': 1,
+                'results': [build_search_result(query, info)]
+            })
+
+        deadline_at = time.time() + search_deadline
+        search_results, has_more, from_cache = await run_blocking(search_youtube_page, query, page, limit)
+        headers = {'X-Cache': 'HIT' if from_cache else 'MISS'}
+        if not search_results:
+            return JSONResponse({'error': 'Video bulunamadı'}, 404, headers=headers)
+
+        # Detaylar Flask sunucusundaki gibi ortak arama havuzunda, süre sınırıyla alınır
+        entries = [entry for entry in search_results if entry]
+        futures = [asyncio.wrap_future(search_executor.submit(get_video_info, entry.get('url', '')))
+                   for entry in entries]
+        if futures:
+            await asyncio.wait(futures, timeout=max(0, deadline_at - time.time()))
+        processed_results, partial_results = collect_search_results(entries, futures)
+
+        return JSONResponse({
+            'success': True,
+            'search_type': 'search',
+            'query': query,
+            'total_results': len(processed_results),
+            'partial_results': partial_results,
+            'page': page,
+            'limit': limit,
+            'has_more': has_more,
+            'results': processed_results
+        }, headers=headers)
+
+    except Exception as e:
+        return JSONResponse({'error': f'Search error: {str(e)}'}, 500)
+
+
+def event_stream_response(request, download_ids):
+    """text/event-stream response whose waiting costs a coroutine, not a thread"""
+    subscription = progress_broker.subscribe(download_ids, AsyncSubscription(asyncio.get_running_loop()))
+    if subscription is None:
+        return JSONResponse({'error': 'Çok fazla canlı bağlantı, lütfen /api/status kullanın'}, 503,
+                            headers={'Retry-After': '5'})
+
+    min_interval = float(events_settings.get('min_interval_seconds', 0.5))
+    try:
+        interval = max(min_interval, float(request.query_params.get('interval', min_interval)))
+    except ValueError:
+        interval = min_interval
+    stream = EventStream(
+        progress_broker, subscription, download_ids, job_event_snapshot,
+        interval=interval,
+        max_duration=float(events_settings.get('max_duration_seconds', 120)),
+        keepalive=float(events_settings.get('keepalive_seconds', 15)),
+        is_local=is_local_job if api_server.shared_state else None,
+        remote_poll=api_server.job_store.flush_interval if api_server.shared_state else 1.0,
+        executor=extract_executor if api_server.shared_state else None
+    )
+    return StreamingResponse(stream, media_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+async def download_events(request):
+    """Server-Sent Events stream of a download's progress"""
+    download_id = request.path_params['download_id']
+    if await lookup_job(find_job, download_id) is None:
+        return JSONResponse({'error': 'Download ID not found'}, 404)
+    return event_stream_response(request, [download_id])
+
+
+async def multiplexed_events(request):
+    """Server-Sent Events for several downloads on one connection (?ids=a,b,c)"""
+    download_ids = [i for i in request.query_params.get('ids', '').split(',') if i.strip()]
+    download_ids = list(dict.fromkeys(i.strip() for i in download_ids))
+    if not download_ids:
+        return JSONResponse({'error': 'ids parametresi gerekli'}, 400)
+    if len(download_ids) > MAX_EVENT_IDS:
+        return JSONResponse({'error': f'En fazla {MAX_EVENT_IDS} indirme izlenebilir'}, 400)
+    return event_stream_response(request, download_ids)
+
+
+async def iterate_blocking(page):
+    """Async iteration over a blocking iterator; each step runs in the extract pool"""
+    iterator = iter(page)
+    done = object()
+    try:
+        while True:
+            chunk = await run_blocking(next, iterator, done)
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        # Bağlantı koptuysa açık iterator bırakılır (park edilmediyse kapanır)
+        page.close()
+
+
+async def stream_playlist(request):
+    """Stream playlist/channel entries as NDJSON (?url=... or ?cursor=... to continue)"""
+    url = request.query_params.get('url', '').strip()
+    cursor = request.query_params.get('cursor', '').strip()
+    if not url and not cursor:
+        return JSONResponse({'error': 'url veya cursor parametresi gerekli'}, 400)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 100)), PLAYLIST_PAGE_MAX))
+    except ValueError:
+        return JSONResponse({'error': 'Geçersiz limit'}, 400)
+
+    try:
+        if cursor:
+            session = await run_blocking(playlist_cursors.resume, cursor)
+        else:
+            session = await run_blocking(playlist_cursors.open, url)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, 400)
+    except Exception as e:
+        return JSONResponse({'error': f'Playlist açılamadı: {str(e)}'}, 502)
+
+    try:
+        first = await run_blocking(session.next_entry)
+    except Exception as e:
+        session.close()
+        return JSONResponse({'error': f'Playlist alınamadı: {str(e)}'}, 502)
+
+    page = PlaylistPage(playlist_cursors, session, limit, playlist_row, first=first)
+    return StreamingResponse(iterate_blocking(page), media_type='application/x-ndjson', headers={
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+app = Starlette(routes=[
+    Route('/api/search', search_video, methods=['GET', 'POST']),
+    Route('/api/playlist', stream_playlist, methods=['GET']),
+    Route('/api/events/{download_id}', download_events, methods=['GET']),
+    Route('/api/events', multiplexed_events, methods=['GET']),
+    # Geri kalan her şey (indirmeler, durum, dosyalar...) Flask route'larıdır
+    Mount('/', app=WSGIMiddleware(flask_app, workers=wsgi_workers)),
+])
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 5000))
+    print("YouTube MP3/MP4 İndirici - ASGI Server")
+    print(f"Arama/playlist thread'leri: {extract_workers}, WSGI thread'leri: {wsgi_workers}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -0,0 +1,253 @@
+"""
+Bandwidth
+İndirmeler için ortak bant genişliği sınırlayıcı (token bucket).
+Her iş kendi payı kadar token harcar; paylar genel sınır ve iş başına
+sınırlar içinde max-min adil olarak dağıtılır. İş başladığında, bittiğinde
+ve payını kullanmayan (kaynağı yavaş) işler olduğunda paylar yeniden
+hesaplanır. yt-dlp progress hook'u her yazılan bloktan sonra çağrıldığı için
+token bekleme hook içinde yapılır; yt-dlp blok boyunu bu hıza göre ayarlar.
+"""
+
+import threading
+import time
+
+from yt_dlp.utils import parse_bytes
+
+from job_registry import format_speed
+
+# Bu hızın altına pay verilmez (byte/s)
+MIN_RATE = 16 * 1024
+# Payının bu oranından azını kullanan iş yavaş kaynak sayılır
+UNDERUSE_RATIO = 0.8
+# Yavaş kaynaklı işe ölçülen hızın bu katı kadar pay bırakılır
+UNDERUSE_HEADROOM = 1.25
+# Hız ölçümü penceresi (saniye)
+METER_WINDOW = 1.0
+METER_ALPHA = 0.5
+
+
+def parse_rate(value):
+    """Bytes per second from 2097152, "2M", "500K"...; None if not set"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        rate = int(value)
+    else:
+        rate = parse_bytes(str(value).strip())
+        if rate is None:
+            raise ValueError(f'Geçersiz hız sınırı: {value}')
+    if rate <= 0:
+        return None
+    return max(MIN_RATE, rate)
+
+
+def min_rate(*rates):
+    """Smallest of the given limits, None meaning unlimited"""
+    rates = [rate for rate in rates if rate]
+    return min(rates) if rates else None
+
+
+class TokenBucket:
+    """Byte tokens refilled at `rate`; a consumer may go into debt and waits it off"""
+
+    def __init__(self, rate=None, burst_seconds=1.0):
+        self.burst_seconds = burst_seconds
+        self.rate = None
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.set_rate(rate)
+
+    @property
+    def capacity(self):
+        return self.rate * self.burst_seconds if self.rate else 0.0
+
+    def _refill(self, now):
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate, now=None):
+        self._refill(now or time.monotonic())
+        self.rate = rate
+        if rate:
+            self.tokens = min(self.tokens, self.capacity)
+
+    def reserve(self, amount, now):
+        """Take `amount` tokens; returns the seconds to wait before using them"""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        self.tokens -= amount
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class RateMeter:
+    """Smoothed achieved rate over fixed windows"""
+
+    def __init__(self):
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+        self.rate = None
+
+    def add(self, amount, now):
+        self.window_bytes += amount
+        elapsed = now - self.window_start
+        if elapsed >= METER_WINDOW:
+            sample = self.window_bytes / elapsed
+            self.rate = sample if self.rate is None else self.rate + METER_ALPHA * (sample - self.rate)
+            self.window_start = now
+            self.window_bytes = 0
+
+    def current(self, now):
+        """Rate, decayed if the job has stopped reporting bytes"""
+        if self.rate is None:
+            return None
+        idle = now - self.window_start
+        if idle > 2 * METER_WINDOW:
+            return self.rate * (2 * METER_WINDOW) / idle
+        return self.rate
+
+
+class JobShare:
+    """Bandwidth state of one running download"""
+
+    __slots__ = ('download_id', 'cap', 'allocated', 'bucket', 'meter', 'started', 'consumed', 'waited',
+                 '_offsets')
+
+    def __init__(self, download_id, cap, burst_seconds):
+        self.download_id = download_id
+        self.cap = cap  # İş başına sınır (None: sınırsız)
+        self.allocated = None  # Şu anki payı (None: sınırsız)
+        self.bucket = TokenBucket(None, burst_seconds)
+        self.meter = RateMeter()
+        self.started = time.monotonic()
+        self.consumed = 0
+        self.waited = 0.0  # Sınırlayıcı yüzünden beklenen toplam süre
+        self._offsets = {}  # dosya -> son bildirilen byte sayısı
+
+    def delta(self, d):
+        """New bytes since the previous hook call for the same file"""
+        downloaded = d.get('downloaded_bytes') or 0
+        key = d.get('tmpfilename') or d.get('filename')
+        previous = self._offsets.get(key, 0)
+        self._offsets[key] = downloaded
+        # Dosya baştan yazılıyorsa sayaç küçülür
+        return downloaded - previous if downloaded >= previous else downloaded
+
+
+class BandwidthShaper:
+    """Global and per-job byte rate limits shared fairly by running downloads"""
+
+    def __init__(self, global_limit=None, per_job_limit=None, burst_seconds=1.0, rebalance_interval=1.0):
+        self.global_limit = global_limit
+        self.per_job_limit = per_job_limit
+        self.burst_seconds = burst_seconds
+        self.rebalance_interval = rebalance_interval
+        self._lock = threading.Lock()
+        self._shares = {}  # download_id -> JobShare
+        self._global = TokenBucket(global_limit, burst_seconds)
+        self._rebalanced_at = 0.0
+
+    def register(self, download_id, rate_limit=None):
+        """Start shaping a download; rate_limit is the job's own cap in bytes/s"""
+        share = JobShare(download_id, min_rate(rate_limit, self.per_job_limit), self.burst_seconds)
+        with self._lock:
+            self._shares[download_id] = share
+            self._rebalance(time.monotonic())
+        return share
+
+    def unregister(self, share):
+        """Download finished; its share goes back to the others"""
+        with self._lock:
+            if self._shares.get(share.download_id) is share:
+                del self._shares[share.download_id]
+                self._rebalance(time.monotonic())
+
+    def _demand(self, share, now):
+        """Rate a job can use: its cap, or a bit above what it achieves if it leaves its share unused"""
+        demand = share.cap
+        achieved = share.meter.current(now)
+        if (share.allocated and achieved is not None and now - share.started > 2 * self.rebalance_interval
+                and achieved < share.allocated * UNDERUSE_RATIO):
+            demand = min_rate(demand, max(MIN_RATE, achieved * UNDERUSE_HEADROOM))
+        return demand
+
+    def _rebalance(self, now):
+        """Max-min fair split of the global limit; called with the lock held"""
+        self._rebalanced_at = now
+        shares = list(self._shares.values())
+        if self.global_limit is None:
+            for share in shares:
+                share.allocated = share.cap
+                share.bucket.set_rate(share.allocated, now)
+            return
+
+        # Küçük talepler tam karşılanır, kalan eşit bölünür (water-filling)
+        demands = sorted(((self._demand(share, now), share) for share in shares),
+                         key=lambda item: item[0] if item[0] is not None else float('inf'))
+        remaining = float(self.global_limit)
+        for index, (demand, share) in enumerate(demands):
+            fair = remaining / (len(demands) - index)
+            allocated = fair if demand is None else min(demand, fair)
+            share.allocated = max(MIN_RATE, int(allocated))
+            share.bucket.set_rate(share.allocated, now)
+            remaining = max(0.0, remaining - allocated)
+
+    def consume(self, share, amount):
+        """Account `amount` downloaded bytes; returns the seconds the caller should wait"""
+        if amount <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            share.consumed += amount
+            share.meter.add(amount, now)
+            if now - self._rebalanced_at >= self.rebalance_interval:
+                self._rebalance(now)
+            delay = max(share.bucket.reserve(amount, now), self._global.reserve(amount, now))
+            share.waited += delay
+        return delay
+
+    def hook(self, share, wait=time.sleep):
+        """yt-dlp progress hook that holds the download thread to its share
+
+        wait(seconds) may return early (e.g. a cancel token's wait).
+        """
+        def shape(d):
+            if d.get('status') != 'downloading':
+                return
+            delay = self.consume(share, share.delta(d))
+            if delay > 0:
+                wait(delay)
+        return shape
+
+    @staticmethod
+    def _rate(value):
+        return {'bytes_per_second': int(value), 'text': format_speed(value)} if value else None
+
+    def job_stats(self, download_id):
+        """Allocated and achieved rate of a running download, None if it is not running here"""
+        with self._lock:
+            share = self._shares.get(download_id)
+            if share is None:
+                return None
+            now = time.monotonic()
+            return {
+                'allocated': self._rate(share.allocated),
+                'achieved': self._rate(share.meter.current(now)),
+                'cap': self._rate(share.cap),
+                'throttled_seconds': round(share.waited, 2)
+            }
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            shares = list(self._shares.values())
+            allocated = sum(share.allocated or 0 for share in shares)
+            achieved = sum(share.meter.current(now) or 0 for share in shares)
+        return {
+            'global_limit': self._rate(self.global_limit),
+            'per_job_limit': self._rate(self.per_job_limit),
+            'active_jobs': len(shares),
+            'allocated': self._rate(allocated),
+            'achieved': self._rate(achieved)
+        }
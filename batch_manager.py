@@ -0,0 +1,246 @@
+"""
+Batch Manager
+Birden fazla video (URL listesi veya playlist/kanal) için tek bir toplu indirme.
+Girdiler tembel (lazy) olarak açılır; toplu işin kendi eşzamanlılık sınırı
+kadar alt indirme kuyruğa verilir, biri bittiğinde sıradaki girdi alınır.
+Alt indirmeler normal iş kaydı ve ortak indirme kuyruğu üzerinden çalışır.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from job_registry import TERMINAL_STATUSES, format_speed
+
+
+class FailedEntry:
+    """Batch source that could not be expanded; recorded on the batch, the rest continue"""
+
+    __slots__ = ('url', 'error')
+
+    def __init__(self, url, error):
+        self.url = url
+        self.error = error
+
+
+class DownloadBatch:
+    """Parent record of a batch: lazy entry source plus its child jobs"""
+
+    def __init__(self, batch_id, entries, options, max_concurrency, max_items, source=None):
+        self.batch_id = batch_id
+        self.entries = entries  # video URL'leri üreten iterator
+        self.options = options  # format, quality, output_path
+        self.max_concurrency = max_concurrency
+        self.max_items = max_items
+        self.source = source
+        self.status = 'running'
+        self.error = None
+        self.failed_entries = []  # Açılamayan kaynaklar: {'url', 'error'}
+        self.exhausted = False
+        self.children = []  # DownloadJob (ekleme sırasıyla)
+        self.active = {}  # download_id -> DownloadJob (henüz bitmemiş)
+        self.start_time = time.time()
+        self.end_time = None
+        self._lock = threading.Lock()
+        self._refilling = False
+        self._rerun = False
+
+    def summary(self, include_children=True):
+        """Aggregate progress and throughput of the batch"""
+        with self._lock:
+            children = list(self.children)
+            data = {
+                'batch_id': self.batch_id,
+                'status': self.status,
+                'source': self.source,
+                'format': self.options.get('format'),
+                'quality': self.options.get('quality'),
+                'output_path': self.options.get('output_path'),
+                'max_concurrency': self.max_concurrency,
+                'start_time': self.start_time,
+                'end_time': self.end_time,
+                'entries_exhausted': self.exhausted
+            }
+            if self.error:
+                data['error'] = self.error
+            if self.failed_entries:
+                data['failed_entries'] = list(self.failed_entries)
+
+        counts = {}
+        progress_sum = 0.0
+        downloaded = 0
+        total = 0
+        speed = 0.0
+        for job in children:
+            counts[job.status] = counts.get(job.status, 0) + 1
+            progress_sum += 100 if job.status == 'completed' else (job.progress or 0)
+            downloaded += job.downloaded_bytes or 0
+            total += job.total_bytes or 0
+            if job.status == 'downloading':
+                speed += job.speed or 0
+
+        elapsed = (self.end_time or time.time()) - self.start_time
+        data.update({
+            'total_items': len(children),
+            'counts': counts,
+            'finished_items': sum(counts.get(s, 0) for s in TERMINAL_STATUSES),
+            # Girdiler bitmeden toplam bilinmez; oran şu ana kadar eklenenlere göredir
+            'progress': progress_sum / len(children) if children else 0,
+            'downloaded_bytes': downloaded,
+            'total_bytes': total,
+            'speed': format_speed(speed),
+            'average_speed': format_speed(downloaded / elapsed if elapsed > 0 else 0),
+            'elapsed_time': f"{elapsed:.1f} seconds"
+        })
+        if include_children:
+            data['downloads'] = [{
+                'download_id': job.download_id,
+                'video_url': job.video_url,
+                'status': job.status,
+                'progress': job.progress
+            } for job in children]
+        return data
+
+
+class BatchManager:
+    """Feeds batch entries into the download queue within each batch's cap"""
+
+    def __init__(self, create_child, enqueue_child, cancel_child, max_workers=2, max_batches=100):
+        # create_child(batch, video_url) -> kayda eklenmiş (kuyruğa verilmemiş) iş
+        self.create_child = create_child
+        self.enqueue_child = enqueue_child
+        self.cancel_child = cancel_child
+        self.max_batches = max_batches  # Bellekte tutulan en fazla toplu iş
+        self._lock = threading.Lock()
+        self._batches = {}  # batch_id -> DownloadBatch
+        self._parents = {}  # alt iş download_id -> DownloadBatch
+        # Girdileri açmak (playlist sayfası) ağ beklediği için ayrı küçük havuz
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch')
+
+    def create(self, batch_id, entries, options, max_concurrency, max_items, source=None):
+        batch = DownloadBatch(batch_id, entries, options, max_concurrency, max_items, source=source)
+        with self._lock:
+            self._batches[batch_id] = batch
+            finished = [b for b in self._batches.values() if b.end_time is not None]
+        # En eski bitmiş toplu işleri unut
+        for old in finished[:max(0, len(self._batches) - self.max_batches)]:
+            self.remove(old.batch_id)
+        self._schedule(batch)
+        return batch
+
+    def get(self, batch_id):
+        return self._batches.get(batch_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._batches.values())
+
+    def remove(self, batch_id):
+        with self._lock:
+            batch = self._batches.pop(batch_id, None)
+            if batch is not None:
+                for job in batch.children:
+                    self._parents.pop(job.download_id, None)
+        return batch
+
+    def job_changed(self, download_id):
+        """Registry callback: a finished child frees a slot in its batch"""
+        batch = self._parents.get(download_id)
+        if batch is None:
+            return
+        with batch._lock:
+            job = batch.active.get(download_id)
+            if job is None or job.status not in TERMINAL_STATUSES:
+                return
+            del batch.active[download_id]
+        self._parents.pop(download_id, None)
+        self._schedule(batch)
+
+    def cancel(self, batch_id):
+        batch = self.get(batch_id)
+        if batch is None:
+            return None
+        with batch._lock:
+            if batch.status != 'running':
+                return batch
+            batch.status = 'cancelled'
+            active = list(batch.active.values())
+        for job in active:
+            self.cancel_child(job)
+        self._schedule(batch)
+        return batch
+
+    def _schedule(self, batch):
+        with batch._lock:
+            if batch._refilling:
+                batch._rerun = True
+                return
+            batch._refilling = True
+        self._executor.submit(self._refill, batch)
+
+    def _next_entry(self, batch):
+        try:
+            return next(batch.entries)
+        except StopIteration:
+            pass
+        except Exception as e:
+            batch.error = f"Girdiler alınamadı: {str(e)}"
+        batch.exhausted = True
+        return None
+
+    def _refill(self, batch):
+        while True:
+            while True:
+                with batch._lock:
+                    if batch.status != 'running' or batch.exhausted:
+                        break
+                    if len(batch.active) >= batch.max_concurrency:
+                        break
+                    if len(batch.children) >= batch.max_items:
+                        batch.exhausted = True
+                        break
+                # Sonraki girdi (playlist'te gerekirse yeni sayfa) kilit dışında alınır
+                video_url = self._next_entry(batch)
+                if video_url is None:
+                    break
+                if isinstance(video_url, FailedEntry):
+                    # Tek bir playlist/kanal açılamadı; diğer kaynaklar devam eder
+                    with batch._lock:
+                        batch.failed_entries.append({'url': video_url.url, 'error': video_url.error})
+                    continue
+                try:
+                    job = self.create_child(batch, video_url)
+                except Exception as e:
+                    batch.error = f"Alt indirme oluşturulamadı: {str(e)}"
+                    continue
+                with self._lock:
+                    self._parents[job.download_id] = batch
+                with batch._lock:
+                    batch.children.append(job)
+                    batch.active[job.download_id] = job
+                self.enqueue_child(job)
+                if job.status in TERMINAL_STATUSES:
+                    # Hazır dosya kullanıldı - slot hemen boşalır
+                    with batch._lock:
+                        batch.active.pop(job.download_id, None)
+
+            with batch._lock:
+                if (batch.exhausted or batch.status != 'running') and not batch.active and batch.end_time is None:
+                    if batch.status == 'running':
+                        batch.status = 'completed'
+                    batch.end_time = time.time()
+                    close = getattr(batch.entries, 'close', None)
+                    if close is not None:
+                        close()
+                if not batch._rerun:
+                    batch._refilling = False
+                    return
+                batch._rerun = False
+
+    def stats(self):
+        with self._lock:
+            batches = list(self._batches.values())
+        counts = {}
+        for batch in batches:
+            counts[batch.status] = counts.get(batch.status, 0) + 1
+        return {'batches': len(batches), 'counts': counts, 'tracked_children': len(self._parents)}
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+ASGI / Flask Benchmark
+Aynı API'yi iki sunucuda yan yana çalıştırır: thread'li Flask (python api_server.py)
+ve asyncio tabanlı asgi_server (uvicorn). yt-dlp ağ gecikmesi sahte bir
+YoutubeDL ile taklit edilir; iki senaryo ölçülür:
+  1. Eşzamanlı video bilgisi istekleri (/api/search?q=<video URL>, cache'siz)
+  2. Açık tutulan SSE bağlantıları (/api/events/<id>) sırasında /api/health gecikmesi
+Her senaryoda sunucu sürecinin en yüksek thread sayısı ve bellek kullanımı raporlanır.
+
+Kullanım: python bench_asgi.py [eşzamanlı_istek] [sse_bağlantısı] [gecikme_sn]
+"""
+
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+FLASK_PORT = 5861
+ASGI_PORT = 5862
+
+
+def serve(kind, port, latency):
+    """Child process: one server with yt-dlp network calls replaced by a sleep"""
+    os.environ['JOB_STORE_DB'] = ''
+    os.environ['VIDEO_CACHE_DB'] = ''
+    os.environ.setdefault('MAX_EVENT_SUBSCRIBERS', '100000')
+    import yt_dlp
+
+    class SlowYoutubeDL:
+        def __init__(self, opts=None):
+            self.opts = opts or {}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+        def extract_info(self, url, download=False, **kwargs):
+            time.sleep(latency)
+            return {'id': url[-11:], 'title': 'Benchmark', 'duration': 60, 'formats': []}
+
+        def download(self, urls):
+            # SSE senaryosu boyunca indirme sürer
+            time.sleep(3600)
+
+    yt_dlp.YoutubeDL = SlowYoutubeDL
+    if kind == 'flask':
+        import api_server
+        api_server.app.run(host='127.0.0.1', port=port, threaded=True)
+    else:
+        import uvicorn
+        import asgi_server
+        uvicorn.run(asgi_server.app, host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+
+
+class ProcessSampler:
+    """Peak thread count and resident memory of a process, read from /proc"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.peak_threads = 0
+        self.peak_rss_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _read(self):
+        with open(f'/proc/{self.pid}/status') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(fields['Threads']), int(fields['VmRSS'].split()[0])
+
+    def _run(self):
+        while not self._stop.wait(0.02):
+            try:
+                threads, rss = self._read()
+            except (OSError, KeyError, ValueError):
+                return
+            self.peak_threads = max(self.peak_threads, threads)
+            self.peak_rss_kb = max(self.peak_rss_kb, rss)
+
+    def __enter__(self):
+        self.peak_threads, self.peak_rss_kb = self._read()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def request(port, method, path, body=None):
+    """(status, seconds, response body) over a fresh connection"""
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        return response.status, time.perf_counter() - started, data
+    except OSError:
+        return None, time.perf_counter() - started, b''
+    finally:
+        connection.close()
+
+
+def info_burst(port, count, run):
+    """`count` simultaneous single-video lookups, each a cache miss"""
+    results = [None] * count
+    barrier = threading.Barrier(count + 1)
+
+    def one(i):
+        barrier.wait()
+        results[i] = request(port, 'GET', f'/api/search?q=https://youtu.be/{run}{i:010d}')
+
+    threads = [threading.Thread(target=one, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    latencies = [latency for status, latency, _ in results if status == 200]
+    return wall, latencies, count - len(latencies)
+
+
+def hold_stream(port, download_id, ready, failed, stop):
+    """One SSE connection kept open until `stop` is set"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        connection.request('GET', f'/api/events/{download_id}')
+        response = connection.getresponse()
+        while not stop.is_set():
+            line = response.fp.readline()
+            if not line:
+                break
+            if line.startswith(b'event:'):
+                ready.append(1)
+                stop.wait()
+    except OSError as e:
+        failed.append(repr(e))
+    finally:
+        connection.close()
+
+
+def run_server_bench(kind, port, pid, requests, streams):
+    for _ in range(100):
+        if request(port, 'GET', '/api/health')[0] == 200:
+            break
+        time.sleep(0.1)
+    info_burst(port, 4, 'w')  # Isınma
+
+    with ProcessSampler(pid) as sampler:
+        wall, latencies, failed = info_burst(port, requests, kind[0])
+    print(f"  [{kind}] {requests} eşzamanlı bilgi isteği: {wall:5.2f}s toplam, "
+          f"p50 {statistics.median(latencies) if latencies else 0:5.2f}s  "
+          f"p95 {percentile(latencies, 0.95):5.2f}s  hata {failed}  "
+          f"thread {sampler.peak_threads}  RSS {sampler.peak_rss_kb / 1024:.0f} MB")
+
+    _, _, body = request(port, 'POST', '/api/download/mp4', {'video_url': 'https://youtu.be/benchbench1'})
+    download_id = json.loads(body)['download_id']
+    ready = []
+    failed = []
+    stop = threading.Event()
+    with ProcessSampler(pid) as sampler:
+        holders = [threading.Thread(target=hold_stream, args=(port, download_id, ready, failed, stop), daemon=True)
+                   for _ in range(streams)]
+        for holder in holders:
+            holder.start()
+        deadline = time.monotonic() + 60
+        while len(ready) + len(failed) < streams and time.monotonic() < deadline:
+            time.sleep(0.05)
+        health = [request(port, 'GET', '/api/health')[1] for _ in range(20)]
+        stop.set()
+    if failed:
+        print(f"  [{kind}] {len(failed)} SSE bağlantısı açılamadı: {failed[0]}")
+    print(f"  [{kind}] {len(ready)}/{streams} açık SSE bağlantısı: /api/health p50 "
+          f"{statistics.median(health) * 1000:6.1f} ms  p95 {percentile(health, 0.95) * 1000:6.1f} ms  "
+          f"thread {sampler.peak_threads}  RSS {sampler.peak_rss_kb / 1024:.0f} MB")
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    streams = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.3
+
+    print(f"⚖️  Flask (threaded) vs ASGI - yt-dlp gecikmesi {latency:g}s")
+    print("=" * 64)
+    for kind, port in (('flask', FLASK_PORT), ('asgi', ASGI_PORT)):
+        server = subprocess.Popen(
+            [sys.executable, __file__, '--serve', kind, str(port), str(latency)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            run_server_bench(kind, port, server.pid, requests, streams)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        serve(sys.argv[2], int(sys.argv[3]), float(sys.argv[4]))
+    else:
+        main()
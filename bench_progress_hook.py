@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Progress Hook Benchmark
+Sentetik bir yt-dlp hook akışını (iş başına binlerce 'downloading' çağrısı)
+eşzamanlı indirmeler gibi birden fazla thread'den tekrar oynatır ve
+her çağrıda kaydı güncelleyen eski hook ile hız sınırlı hook'u karşılaştırır.
+
+Kullanım: python bench_progress_hook.py [iş_sayısı] [iş_başına_çağrı]
+"""
+
+import os
+import sys
+import threading
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+# Benchmark iş kayıtlarını kalıcı kayda yazmasın
+os.environ['JOB_STORE_DB'] = ''
+
+import api_server
+from api_server import job_registry, progress_hook
+from job_registry import DownloadJob
+from progress_tracker import ProgressThrottle
+
+CHUNK_SIZE = 10240  # yt-dlp'nin varsayılan ilk blok boyutu
+
+
+def legacy_progress_hook(d, job):
+    """Previous hook: formats and writes every sample into the record"""
+    if d['status'] == 'downloading':
+        try:
+            downloaded = d.get('downloaded_bytes', 0)
+            total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
+            fields = {
+                'status': 'downloading',
+                'downloaded_bytes': downloaded,
+                'total_bytes': total
+            }
+            if total > 0:
+                fields['progress'] = (downloaded / total) * 100
+            speed = d.get('speed', 0)
+            if speed:
+                speed_mb = speed / 1024 / 1024
+                fields['speed'] = f"{speed_mb:.1f} MB/s"
+            job_registry.update_job(job, **fields)
+        except Exception:
+            pass
+    elif d['status'] == 'finished':
+        job_registry.update_job(job, progress=100, status='finished')
+
+
+def hook_stream(calls):
+    """Synthetic hook dicts shaped like yt-dlp's HttpFD reports"""
+    total = calls * CHUNK_SIZE
+    started = time.time()
+    events = []
+    for i in range(1, calls + 1):
+        events.append({
+            'status': 'downloading',
+            'downloaded_bytes': i * CHUNK_SIZE,
+            'total_bytes': total,
+            'filename': 'video.mp4',
+            'tmpfilename': 'video.mp4.part',
+            'elapsed': i * 0.001,
+            'speed': 5e6 + (i % 100) * 1e4,
+            'eta': calls - i,
+            'started': started
+        })
+    events.append({'status': 'finished', 'downloaded_bytes': total, 'total_bytes': total, 'filename': 'video.mp4'})
+    return events
+
+
+def replay(label, jobs, events, make_hook):
+    registry_jobs = [job_registry.add(DownloadJob(f'{label}-{i}', 'u', 'mp4', 'best', '.')) for i in range(jobs)]
+    hooks = [make_hook(job) for job in registry_jobs]
+    barrier = threading.Barrier(jobs + 1)
+
+    def run(hook):
+        barrier.wait()
+        for d in events:
+            hook(d)
+
+    threads = [threading.Thread(target=run, args=(hook,)) for hook in hooks]
+    for thread in threads:
+        thread.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    calls = jobs * len(events)
+    print(f"{label:<22} {wall:6.2f}s duvar  {cpu:6.2f}s CPU  {cpu * 1e6 / calls:6.2f} µs/çağrı")
+    job_registry.remove_many([job.download_id for job in registry_jobs])
+    return cpu
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    events = hook_stream(calls)
+
+    print(f"🔁 {jobs} eşzamanlı indirme x {calls} hook çağrısı")
+    print("=" * 64)
+    before = replay('Eski hook', jobs, events, lambda job: (lambda d: legacy_progress_hook(d, job)))
+    throttles = []
+
+    def throttled(job):
+        throttle = ProgressThrottle(api_server.progress_rate)
+        throttles.append(throttle)
+        return lambda d: progress_hook(d, job, throttle)
+
+    after = replay(f'{api_server.progress_rate:g} Hz hook', jobs, events, throttled)
+    published = sum(t.published for t in throttles)
+    print(f"   Kayda yazılan güncelleme: {published} / {jobs * calls}")
+    print(f"   CPU kazancı: {before / max(after, 1e-9):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
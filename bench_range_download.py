@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Range Download Benchmark
+Range destekleyen yerel bir HTTP sunucusu başlatır; sunucu her bağlantıyı
+ayrı ayrı hız sınırına tabi tutar (tek bağlantıyı kısan CDN gibi). Aynı
+dosya gerçek yt-dlp ile üç kez indirilir:
+  1. Tek bağlantı (yt-dlp HttpFD)
+  2. Paralel aralıklar (range_download.RangeYoutubeDL)
+  3. Paralel aralıklar, sunucu bazı aralıkların ortasında bağlantıyı kesiyor
+Her indirmenin süresi, sha256 doğrulaması ve tekrar istenen aralıklar raporlanır.
+
+Kullanım: python bench_range_download.py [dosya_mb] [bağlantı_sayısı] [bağlantı_başına_kb_s]
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import yt_dlp
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+from range_download import RangeYoutubeDL
+from tests.range_server import RangeServer
+
+def download(server, downloader, opts, directory):
+    os.makedirs(directory, exist_ok=True)
+    options = {
+        'quiet': True,
+        'no_warnings': True,
+        'noprogress': True,
+        'outtmpl': os.path.join(directory, 'video.%(ext)s'),
+        **opts
+    }
+    started = time.monotonic()
+    with downloader(options) as ydl:
+        ydl.download([server.url])
+    elapsed = time.monotonic() - started
+    path = os.path.join(directory, 'video.mp4')
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return elapsed, digest, sorted(os.listdir(directory))
+
+
+def report(label, server, expected, elapsed, digest, files):
+    requests = server.take_requests()
+    ranged = [r for _, r in requests if r]
+    connections = len({port for port, _ in requests})
+    size = len(server.data)
+    ok = '✅' if digest == expected and files == ['video.mp4'] else '❌'
+    print(f"{label:<30} {elapsed:6.2f}s  {size / elapsed / 1024 / 1024:6.2f} MB/s  "
+          f"{len(requests):3d} istek  {len(ranged):3d} aralık  {connections:2d} bağlantı  sha256 {ok}")
+    return elapsed
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 16
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rate_kb = float(sys.argv[3]) if len(sys.argv) > 3 else 2048
+
+    data = os.urandom(int(size_mb * 1024 * 1024))
+    expected = hashlib.sha256(data).hexdigest()
+    server = RangeServer(data, rate_kb * 1024).start()
+
+    range_opts = {
+        'concurrent_fragment_downloads': connections,
+        'range_download': {'min_size': 1024 * 1024, 'chunk_size': 2 * 1024 * 1024, 'retries': 3, 'timeout': 10}
+    }
+    workdir = tempfile.mkdtemp(prefix='bench_range_')
+    print(f"📦 {size_mb:g} MB dosya, bağlantı başına {rate_kb:g} KB/s, {connections} paralel bağlantı")
+    print("=" * 96)
+    try:
+        single = report('Tek bağlantı (HttpFD)', server, expected, *download(
+            server, yt_dlp.YoutubeDL, {}, os.path.join(workdir, 'single')))
+        parallel = report('Paralel aralıklar', server, expected, *download(
+            server, RangeYoutubeDL, range_opts, os.path.join(workdir, 'range')))
+        server.drops_left = 3
+        report('Paralel aralıklar + 3 kopma', server, expected, *download(
+            server, RangeYoutubeDL, range_opts, os.path.join(workdir, 'flaky')))
+        print("=" * 96)
+        print(f"   Hızlanma: {single / parallel:.1f}x")
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
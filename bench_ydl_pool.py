@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+YoutubeDL Pool Benchmark
+Her çağrıda yeni YoutubeDL kurmak ile havuzdan alınan nesneyi kullanmak
+arasındaki kurulum maliyetini ölçer. YouTube'a istek atılmaz; HTTP katmanı
+yerel bir keep-alive sunucusuna yapılan küçük isteklerle çalıştırılır.
+
+Kullanım: python bench_ydl_pool.py [çağrı_sayısı]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import yt_dlp
+from api_server import build_ydl_opts
+from ydl_pool import YDLPool
+
+
+class PingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench(label, calls, fn):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000 / calls:8.2f} ms/çağrı  ({calls} çağrı, {elapsed:.2f}s)")
+    return elapsed / calls
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/'
+
+    # YoutubeDL kapanırken cookie dosyasını yeniden yazar - kopyası ile çalış
+    cookie_dir = tempfile.mkdtemp()
+    cookiefile = os.path.join(cookie_dir, 'cookies.txt')
+    shutil.copy('cookies.txt', cookiefile)
+
+    def opts():
+        return build_ydl_opts(quiet=True, no_warnings=True, cookiefile=cookiefile)
+
+    pool = YDLPool({'info': opts()})
+
+    def fresh_setup():
+        with yt_dlp.YoutubeDL(opts()):
+            pass
+
+    def pooled_setup():
+        with pool.acquire('info'):
+            pass
+
+    def fresh_request():
+        with yt_dlp.YoutubeDL(opts()) as ydl:
+            ydl.urlopen(url).read()
+
+    def pooled_request():
+        with pool.acquire('info') as ydl:
+            ydl.urlopen(url).read()
+
+    print("🔍 YoutubeDL kurulum maliyeti")
+    print("=" * 60)
+    before = bench("Yeni nesne (kurulum)", calls, fresh_setup)
+    after = bench("Havuz (kurulum)", calls, pooled_setup)
+    print(f"   Kazanç: {before / max(after, 1e-9):.0f}x")
+    print()
+    print("🌐 Kurulum + bir HTTP isteği")
+    print("=" * 60)
+    before = bench("Yeni nesne + istek", calls, fresh_request)
+    after = bench("Havuz + istek (keep-alive)", calls, pooled_request)
+    print(f"   Kazanç: {before / max(after, 1e-9):.1f}x")
+    print()
+    print(f"Havuz: {pool.stats()}")
+
+    pool.close_all()
+    server.shutdown()
+    shutil.rmtree(cookie_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Cancellation
+Çalışan indirmeleri işbirlikçi (cooperative) olarak durdurur.
+İptal isteği işin token'ını işaretler; yt-dlp hook'ları token'ı kontrol edip
+aktarımı DownloadCancelled ile keser. İşin dosyaları üzerinde çalışan ffmpeg
+alt süreçleri hemen sonlandırılır. İptal isteği ile worker'ın serbest kalması
+arasındaki süre ölçülür.
+"""
+
+import os
+import signal
+import threading
+import time
+from collections import deque
+
+from yt_dlp.utils import DownloadCancelled as YDLDownloadCancelled
+
+# Gecikme yüzdelikleri için saklanan son iptal sayısı
+LATENCY_SAMPLES = 256
+
+
+class DownloadCancelled(YDLDownloadCancelled):
+    """Raised from yt-dlp hooks to abort a cancelled job; yt-dlp re-raises it unchanged"""
+
+
+class CancelToken:
+    """Cancellation flag of one running job"""
+
+    __slots__ = ('download_id', 'markers', 'requested_at', '_event')
+
+    def __init__(self, download_id, markers=None):
+        self.download_id = download_id
+        self.markers = markers  # () -> alt süreç komut satırında aranacak dosya yolları
+        self.requested_at = None
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        if not self._event.is_set():
+            self.requested_at = time.monotonic()
+            self._event.set()
+
+    def check(self, *_):
+        """Raise DownloadCancelled if the job was cancelled (usable directly as a yt-dlp hook)"""
+        if self._event.is_set():
+            raise DownloadCancelled(f'İndirme iptal edildi ({self.download_id})')
+
+    def wait(self, timeout):
+        """Sleep up to `timeout`; True if cancelled meanwhile"""
+        return self._event.wait(timeout)
+
+
+def child_processes(markers):
+    """PIDs of this process's children whose command line mentions one of `markers` (Linux /proc)"""
+    markers = [m for m in markers if m]
+    if not markers or not os.path.isdir('/proc'):
+        return []
+    parent = os.getpid()
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                # "pid (komut) durum ppid ..." - komut adı boşluk içerebilir
+                ppid = int(f.read().rsplit(b')', 1)[1].split()[1])
+            if ppid != parent:
+                continue
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                cmdline = f.read().decode('utf-8', 'replace')
+        except (OSError, IndexError, ValueError):
+            continue
+        if any(marker in cmdline for marker in markers):
+            pids.append(int(entry))
+    return pids
+
+
+def kill_child_processes(markers):
+    """Kill the ffmpeg (or other) children working on a job's files; returns how many"""
+    killed = 0
+    for pid in child_processes(markers):
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except OSError:
+            pass
+    return killed
+
+
+class CancellationTracker:
+    """Tokens of running jobs and the measured cancel latency"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}  # download_id -> CancelToken
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.cancelled = 0
+        self.killed_processes = 0
+
+    def start(self, download_id, markers=None):
+        token = CancelToken(download_id, markers)
+        with self._lock:
+            self._tokens[download_id] = token
+        return token
+
+    def cancel(self, download_id):
+        """Signal a running job; returns its token, or None if it is not running here"""
+        with self._lock:
+            token = self._tokens.get(download_id)
+        if token is None:
+            return None
+        token.cancel()
+        self._kill(token)
+        return token
+
+    def _kill(self, token):
+        if token.markers is None:
+            return
+        try:
+            killed = kill_child_processes(token.markers())
+        except Exception as e:
+            print(f"Alt süreçler sonlandırılamadı ({token.download_id}): {str(e)}")
+            return
+        if killed:
+            with self._lock:
+                self.killed_processes += killed
+
+    def finish(self, token):
+        """Worker is done with the job; returns the cancel latency in seconds if it was cancelled"""
+        with self._lock:
+            if self._tokens.get(token.download_id) is not token:
+                # Zaten bitirilmiş
+                return None
+            del self._tokens[token.download_id]
+        if not token.cancelled:
+            return None
+        # İptal ile hook kontrolü arasında başlamış bir süreç kalmasın
+        self._kill(token)
+        latency = time.monotonic() - token.requested_at
+        with self._lock:
+            self.cancelled += 1
+            self._latencies.append(latency)
+        return latency
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            running = len(self._tokens)
+        return {
+            'running': running,
+            'cancelled': self.cancelled,
+            'killed_processes': self.killed_processes,
+            'avg_latency_seconds': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'p95_latency_seconds': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3) if latencies else None,
+            'max_latency_seconds': round(latencies[-1], 3) if latencies else None
+        }
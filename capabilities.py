@@ -0,0 +1,99 @@
+"""
+Capability Registry
+ffmpeg, ffprobe, moviepy ve mutagen gibi harici araçların durumunu
+başlangıçta bir kez kontrol eder, arka planda belirli aralıklarla yeniler
+ve istek sırasında sadece bellekten okunmasını sağlar.
+"""
+
+import importlib
+import subprocess
+import threading
+import time
+
+
+def probe_binary(name):
+    """Run `<name> -version` and return (available, version line)"""
+    try:
+        result = subprocess.run([name, '-version'], capture_output=True, text=True, timeout=10)
+        if result.returncode == 0:
+            first_line = result.stdout.splitlines()[0] if result.stdout else ''
+            return True, first_line
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return False, None
+
+
+def probe_module(name):
+    """Import a Python module and return (available, version)"""
+    try:
+        module = importlib.import_module(name)
+        return True, getattr(module, '__version__', None) or getattr(module, 'version_string', None)
+    except Exception:
+        return False, None
+
+
+DEFAULT_PROBES = {
+    'ffmpeg': lambda: probe_binary('ffmpeg'),
+    'ffprobe': lambda: probe_binary('ffprobe'),
+    'moviepy': lambda: probe_module('moviepy'),
+    'mutagen': lambda: probe_module('mutagen'),
+}
+
+
+class CapabilityRegistry:
+    """In-memory view of optional tool availability, refreshed in the background"""
+
+    def __init__(self, probes=None, refresh_interval=300):
+        self.probes = dict(probes or DEFAULT_PROBES)
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._state = {}
+        self._refresher = None
+        self._stop = threading.Event()
+
+    def refresh(self):
+        """Run every probe once and publish the results"""
+        state = {}
+        for name, probe in self.probes.items():
+            try:
+                available, version = probe()
+            except Exception:
+                available, version = False, None
+            state[name] = {
+                'available': bool(available),
+                'version': version,
+                'checked_at': time.time()
+            }
+        with self._lock:
+            self._state = state
+        return state
+
+    def start(self):
+        """Probe synchronously once, then keep refreshing in a daemon thread"""
+        if self._refresher is not None:
+            return
+        self.refresh()
+        if self.refresh_interval and self.refresh_interval > 0:
+            self._refresher = threading.Thread(target=self._refresh_loop, name='capability-refresh', daemon=True)
+            self._refresher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Yetenek kontrolü başarısız: {str(e)}")
+
+    def available(self, name):
+        if not self._state:
+            # start() çağrılmadan okunursa bir kez kontrol et
+            self.refresh()
+        entry = self._state.get(name)
+        return bool(entry and entry['available'])
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._state.items()}
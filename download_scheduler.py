@@ -0,0 +1,344 @@
+"""
+Download Scheduler
+İndirme işleri için sınırlı worker havuzu ve zamanlama sınıfları (lane).
+Her istek için yeni thread açmak yerine işler kuyrukta bekler ve
+sabit sayıda worker tarafından sırayla çalıştırılır.
+Her sınıfın kendi FIFO kuyruğu, ayrılmış (reserved) slotları ve üst sınırı
+vardır; boştaki ortak slotlar öncelik sırasına göre dağıtılır. Böylece
+toplu indirmeler arama ve tekil indirmelerin kapasitesini tüketemez.
+Tekrar denenecek işler bekleme süresince worker tutmaz; zamanı gelince
+kendi sınıflarının kuyruğuna eklenir.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+# Henüz tamamlanmış iş yokken tahmin için kullanılan varsayılan süre (saniye)
+DEFAULT_JOB_SECONDS = 60.0
+# Ortalama iş süresi için EWMA katsayısı
+DURATION_ALPHA = 0.2
+# Bekleme süresi yüzdelikleri için saklanan son örnek sayısı
+WAIT_SAMPLES = 256
+
+
+class SchedulingLane:
+    """Queue, capacity and wait-time counters of one scheduling class"""
+
+    def __init__(self, name, reserved=0, limit=None):
+        self.name = name
+        self.reserved = reserved  # Sadece bu sınıfın kullanabileceği slotlar
+        self.limit = limit  # Aynı anda en fazla çalışan iş
+        self.queue = OrderedDict()  # job_id -> (fn, args, kwargs, kuyruğa giriş zamanı)
+        # Çalıştırma sırası -> (job_id, başlama zamanı); aynı işin önceki denemesi
+        # bitmeden başlayan yeni denemesi kendi kaydını tutar
+        self.running = {}
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.avg_duration = None
+        self.avg_wait = None
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+
+    def record_wait(self, seconds):
+        self.waits.append(seconds)
+        if self.avg_wait is None:
+            self.avg_wait = seconds
+        else:
+            self.avg_wait += DURATION_ALPHA * (seconds - self.avg_wait)
+
+    def stats(self, now):
+        waits = sorted(self.waits)
+        oldest = next(iter(self.queue.values()), None)
+        return {
+            'reserved': self.reserved,
+            'limit': self.limit,
+            'running': len(self.running),
+            'queued': len(self.queue),
+            'started': self.started,
+            'completed': self.completed,
+            'failed': self.failed,
+            'oldest_wait_seconds': round(now - oldest[3], 2) if oldest else 0,
+            'avg_wait_seconds': round(self.avg_wait, 3) if self.avg_wait is not None else None,
+            'p95_wait_seconds': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+            'avg_job_seconds': round(self.avg_duration, 1) if self.avg_duration else None
+        }
+
+
+class LaneExecutor:
+    """concurrent.futures-style submit() onto one lane (drop-in for a ThreadPoolExecutor)"""
+
+    def __init__(self, scheduler, lane):
+        self.scheduler = scheduler
+        self.lane = lane
+
+    def submit(self, fn, *args, **kwargs):
+        return self.scheduler.submit_task(self.lane, fn, *args, **kwargs)
+
+
+class DownloadScheduler:
+    """Bounded worker pool shared by prioritized lanes with reserved capacity
+
+    lanes maps lane name -> {'reserved': slots only that lane may use,
+    'limit': max running jobs of the lane}, highest priority first.
+    """
+
+    def __init__(self, max_workers=5, name='download', lanes=None, initializer=None, clock=time.time):
+        self.max_workers = max(1, int(max_workers))
+        self.name = name
+        self.initializer = initializer  # Her worker thread'i başlarken çağrılır
+        self.clock = clock  # Zaman kaynağı (testlerde sahte saat verilebilir)
+        self.on_slot_free = None  # Bir iş bittiğinde (kilit dışında) lane adıyla çağrılır
+        self._cond = threading.Condition()
+        self._lanes = OrderedDict()
+        for lane_name, options in (lanes or {'default': {}}).items():
+            limit = options.get('limit') or self.max_workers
+            self._lanes[lane_name] = SchedulingLane(
+                lane_name,
+                reserved=max(0, int(options.get('reserved', 0))),
+                limit=max(1, min(int(limit), self.max_workers))
+            )
+        self._reserved_total = sum(lane.reserved for lane in self._lanes.values())
+        if self._reserved_total > self.max_workers:
+            raise ValueError('Ayrılmış slotların toplamı worker sayısını aşıyor')
+        self.default_lane = next(iter(self._lanes))
+        self._workers = []
+        self._task_ids = itertools.count(1)
+        self._run_ids = itertools.count(1)
+        # Zamanı gelmemiş işler: (ready_at, sıra, job_id) heap'i ve job_id -> (lane, entry, ready_at)
+        self._delayed_heap = []
+        self._delayed = {}
+        self._delayed_seq = itertools.count()
+        self._completed = 0
+        self._failed = 0
+
+    def _ensure_workers(self):
+        """Start worker threads on first use"""
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f"{self.name}-worker-{len(self._workers) + 1}",
+                daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def submit(self, job_id, fn, *args, lane=None, **kwargs):
+        """Queue a job; it runs when its lane gets a free slot"""
+        with self._cond:
+            self._ensure_workers()
+            self._lanes[lane or self.default_lane].queue[job_id] = (fn, args, kwargs, self.clock())
+            self._cond.notify()
+        return job_id
+
+    def submit_after(self, delay, job_id, fn, *args, lane=None, **kwargs):
+        """Queue a job once `delay` seconds have passed; no worker is held meanwhile"""
+        ready_at = self.clock() + max(0.0, delay)
+        with self._cond:
+            self._ensure_workers()
+            entry = (fn, args, kwargs, ready_at)
+            self._delayed[job_id] = (lane or self.default_lane, entry, ready_at)
+            heapq.heappush(self._delayed_heap, (ready_at, next(self._delayed_seq), job_id))
+            # Bekleyen worker'lar bir sonraki uyanma zamanını yeniden hesaplasın
+            self._cond.notify_all()
+        return job_id
+
+    def submit_task(self, lane, fn, *args, **kwargs):
+        """Queue a short task on a lane and return a Future for its result"""
+        future = Future()
+        task_id = f"{lane}-task-{next(self._task_ids)}"
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return None
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+                return False
+            return True
+
+        self.submit(task_id, run, lane=lane)
+        # Başlamadan iptal edilen görev kuyrukta yer tutmasın
+        future.add_done_callback(lambda f: f.cancelled() and self.remove(task_id))
+        return future
+
+    def executor(self, lane):
+        return LaneExecutor(self, lane)
+
+    def _find(self, job_id):
+        for lane in self._lanes.values():
+            if job_id in lane.queue:
+                return lane
+        return None
+
+    def remove(self, job_id):
+        """Remove a job that has not started yet (queued or waiting to be retried)"""
+        with self._cond:
+            if self._delayed.pop(job_id, None) is not None:
+                # Heap kaydı kuyruğa alınırken atlanır
+                return True
+            lane = self._find(job_id)
+            return lane is not None and lane.queue.pop(job_id, None) is not None
+
+    def is_queued(self, job_id):
+        with self._cond:
+            return job_id in self._delayed or self._find(job_id) is not None
+
+    def ready_at(self, job_id):
+        """Timestamp a delayed job joins its lane queue, None if it is not delayed"""
+        with self._cond:
+            delayed = self._delayed.get(job_id)
+            return delayed[2] if delayed else None
+
+    def lane_of(self, job_id):
+        """Lane of a queued or running job"""
+        with self._cond:
+            for lane in self._lanes.values():
+                if job_id in lane.queue or any(running_id == job_id for running_id, _ in lane.running.values()):
+                    return lane.name
+        return None
+
+    def _position(self, job_id):
+        """(lane, 1-based position) counting jobs that will be dispatched first"""
+        ahead = 0
+        for lane in self._lanes.values():
+            for index, queued_id in enumerate(lane.queue, start=1):
+                if queued_id == job_id:
+                    return lane, ahead + index
+            # Kendi slotları dışında ortak kapasite kullanabilen üst sınıflar öne geçer
+            if lane.limit > lane.reserved:
+                ahead += len(lane.queue)
+        return None, None
+
+    def queue_position(self, job_id):
+        """1-based position of a queued job, None if it is not waiting"""
+        with self._cond:
+            return self._position(job_id)[1]
+
+    def estimate_start(self, job_id, now=None):
+        """Expected start timestamp of a queued job based on average job duration"""
+        now = now or self.clock()
+        with self._cond:
+            lane, position = self._position(job_id)
+            if position is None:
+                return None
+
+            duration = lane.avg_duration or DEFAULT_JOB_SECONDS
+            # Sınıfın her slotunun ne zaman boşalacağını simüle et
+            free_at = [max(now, started + duration) for _, started in lane.running.values()]
+            free_at += [now] * max(0, lane.limit - len(free_at))
+            heapq.heapify(free_at)
+
+        start = now
+        for _ in range(position):
+            start = heapq.heappop(free_at)
+            heapq.heappush(free_at, start + duration)
+        return start
+
+    def free_slots(self, lane_name):
+        """Jobs `lane_name` could start right now beyond the ones already queued in it"""
+        with self._cond:
+            lane = self._lanes[lane_name]
+            shared_busy = sum(max(0, len(other.running) - other.reserved) for other in self._lanes.values())
+            shared_free = self.max_workers - self._reserved_total - shared_busy
+            startable = min(lane.limit - len(lane.running),
+                            max(0, lane.reserved - len(lane.running)) + max(0, shared_free))
+            return max(0, startable - len(lane.queue))
+
+    def average_duration(self, lane_name):
+        """EWMA job duration of a lane, or the default before any job completed"""
+        with self._cond:
+            return self._lanes[lane_name].avg_duration or DEFAULT_JOB_SECONDS
+
+    def stats(self):
+        """Scheduler counters for health/status reporting"""
+        now = self.clock()
+        with self._cond:
+            return {
+                'workers': self.max_workers,
+                'running': sum(len(lane.running) for lane in self._lanes.values()),
+                'queued': sum(len(lane.queue) for lane in self._lanes.values()),
+                'delayed': len(self._delayed),
+                'completed': self._completed,
+                'failed': self._failed,
+                'shared_slots': self.max_workers - self._reserved_total,
+                'lanes': {name: lane.stats(now) for name, lane in self._lanes.items()}
+            }
+
+    def _promote_delayed(self, now):
+        """Move delayed jobs whose time has come into their lane queues; returns seconds to the next one"""
+        while self._delayed_heap:
+            ready_at, _, job_id = self._delayed_heap[0]
+            delayed = self._delayed.get(job_id)
+            if delayed is None or delayed[2] != ready_at:
+                # Kaldırılmış veya yeniden zamanlanmış
+                heapq.heappop(self._delayed_heap)
+                continue
+            if ready_at > now:
+                return ready_at - now
+            heapq.heappop(self._delayed_heap)
+            del self._delayed[job_id]
+            lane_name, entry, _ = delayed
+            self._lanes[lane_name].queue[job_id] = entry
+        return None
+
+    def _next_job(self):
+        """Highest-priority lane that may start a job now; called with the lock held"""
+        shared_busy = sum(max(0, len(lane.running) - lane.reserved) for lane in self._lanes.values())
+        shared_free = self.max_workers - self._reserved_total - shared_busy
+        for lane in self._lanes.values():
+            if not lane.queue or len(lane.running) >= lane.limit:
+                continue
+            if len(lane.running) < lane.reserved or shared_free > 0:
+                job_id, job = lane.queue.popitem(last=False)
+                return lane, job_id, job
+        return None
+
+    def _worker_loop(self):
+        if self.initializer is not None:
+            try:
+                self.initializer()
+            except Exception as e:
+                print(f"Worker hazırlanamadı: {str(e)}")
+        while True:
+            with self._cond:
+                timeout = self._promote_delayed(self.clock())
+                picked = self._next_job()
+                while picked is None:
+                    self._cond.wait(timeout)
+                    timeout = self._promote_delayed(self.clock())
+                    picked = self._next_job()
+                lane, job_id, (fn, args, kwargs, queued_at) = picked
+                started = self.clock()
+                run_id = next(self._run_ids)
+                lane.running[run_id] = (job_id, started)
+                lane.started += 1
+                lane.record_wait(started - queued_at)
+
+            ok = False
+            try:
+                ok = fn(*args, **kwargs) is not False
+            except Exception as e:
+                print(f"Worker hatası ({job_id}): {str(e)}")
+            finally:
+                elapsed = self.clock() - started
+                with self._cond:
+                    lane.running.pop(run_id, None)
+                    if ok:
+                        self._completed += 1
+                        lane.completed += 1
+                        if lane.avg_duration is None:
+                            lane.avg_duration = elapsed
+                        else:
+                            lane.avg_duration += DURATION_ALPHA * (elapsed - lane.avg_duration)
+                    else:
+                        self._failed += 1
+                        lane.failed += 1
+                    # Boşalan slot başka bir sınıfın işini başlatabilir
+                    self._cond.notify_all()
+                if self.on_slot_free is not None:
+                    self.on_slot_free(lane.name)
@@ -0,0 +1,222 @@
+"""
+Fragment Tuner
+Parçalı (HLS/DASH) indirmelerde eşzamanlı parça bağlantısı sayısını ayarlar.
+Sunucu genelinde bir bağlantı bütçesi vardır; her iş bu bütçeden pay alır.
+Kaynak (site) başına, farklı bağlantı sayılarında ölçülen toplam hız tutulur:
+bir bağlantı daha eklemek hızı belirgin artırıyorsa sayı büyütülür, artırmıyorsa
+küçültülür. yt-dlp parça havuzunu her dosyanın başında kurduğu için yeni sayı
+işin bir sonraki dosyasında (ör. videodan sonra ses) ve sonraki işlerde uygulanır.
+"""
+
+import threading
+import time
+
+# Bağlantı sayısı başına hız ölçümü için EWMA katsayısı
+THROUGHPUT_ALPHA = 0.3
+# Ölçüm için dosyanın en az bu kadar sürmesi gerekir (saniye)
+MIN_SAMPLE_SECONDS = 1.0
+
+
+class SourceTuner:
+    """Throughput observed at each connection count for one source, and the next count to use"""
+
+    def __init__(self, initial, max_connections):
+        self.target = max(1, min(initial, max_connections))
+        self.max_connections = max_connections
+        self.throughput = {}  # bağlantı sayısı -> ortalama toplam hız (byte/s)
+        self.samples = 0
+        self.stable_samples = 0
+
+    def record(self, connections, throughput, gain_threshold, probe_every):
+        previous = self.throughput.get(connections)
+        self.throughput[connections] = throughput if previous is None else \
+            previous + THROUGHPUT_ALPHA * (throughput - previous)
+        self.samples += 1
+
+        current = self.throughput[connections]
+        lower = max((n for n in self.throughput if n < connections), default=None)
+        higher = min((n for n in self.throughput if n > connections), default=None)
+        if higher is not None and self.throughput[higher] < current * (1 + gain_threshold):
+            # Daha fazla bağlantının fayda etmediği ölçülmüş - burada kal
+            target = connections if lower is None or current >= self.throughput[lower] * (1 + gain_threshold) \
+                else lower
+        elif lower is None:
+            # İlk ölçüm: daha fazla bağlantı dene
+            target = connections * 2
+        elif current >= self.throughput[lower] * (1 + gain_threshold):
+            # Bağlantı eklemek hızı artırdı - büyümeye devam
+            target = connections + max(1, connections - lower)
+        else:
+            # Bağlantı başına hız düştü, toplam artmadı - daha az bağlantı yeterli
+            target = lower
+        target = max(1, min(target, self.max_connections))
+
+        if target == self.target:
+            self.stable_samples += 1
+            if self.stable_samples >= probe_every and target < self.max_connections:
+                # Koşullar değişmiş olabilir - arada bir fazlasını dene
+                target += 1
+                self.stable_samples = 0
+        else:
+            self.stable_samples = 0
+        self.target = target
+
+    def stats(self):
+        return {
+            'target': self.target,
+            'samples': self.samples,
+            'throughput_by_connections': {
+                n: {'total': int(rate), 'per_connection': int(rate / n)}
+                for n, rate in sorted(self.throughput.items())
+            }
+        }
+
+
+class JobFragments:
+    """Connection grant and fragment counters of one running download"""
+
+    __slots__ = ('download_id', 'source', 'connections', 'fragmented', 'files', 'fragments_done',
+                 'fragment_count', 'file_started', 'file_bytes', 'started', 'downloaded', '_current', '_opts')
+
+    def __init__(self, download_id, source, opts):
+        self.download_id = download_id
+        self.source = source
+        self.connections = 1  # Bütçeden ayrılan bağlantı sayısı
+        self.fragmented = False
+        self.files = 0
+        self.fragments_done = 0
+        self.fragment_count = None
+        self.file_started = None
+        self.file_bytes = 0
+        self.started = time.monotonic()
+        self.downloaded = 0  # Bitmiş dosyaların byte sayısı
+        self._current = None  # Şu an indirilen dosya
+        self._opts = opts  # yt-dlp seçenekleri (YoutubeDL.params ile aynı sözlük)
+
+
+class FragmentTuner:
+    """Server-wide fragment connection budget and per-source concurrency tuning
+
+    The budget is a soft limit: every running download keeps at least one connection,
+    so with more downloads than free connections the total in use exceeds the budget
+    until jobs finish or are regranted at their next file.
+    """
+
+    def __init__(self, connection_budget=32, max_per_job=8, initial=2, gain_threshold=0.15, probe_every=5):
+        self.connection_budget = max(1, int(connection_budget))
+        self.max_per_job = max(1, min(int(max_per_job), self.connection_budget))
+        self.initial = max(1, int(initial))
+        self.gain_threshold = float(gain_threshold)
+        self.probe_every = max(1, int(probe_every))
+        self._lock = threading.Lock()
+        self._jobs = {}  # download_id -> JobFragments
+        self._sources = {}  # kaynak -> SourceTuner
+
+    def _source(self, source):
+        tuner = self._sources.get(source)
+        if tuner is None:
+            tuner = self._sources[source] = SourceTuner(self.initial, self.max_per_job)
+        return tuner
+
+    def _grant(self, job, want):
+        """Connections for a job: what it wants, within its fair share and what other jobs leave
+
+        Every download keeps at least one connection, even when that goes over the
+        budget. Called with the lock held.
+        """
+        others = [other for other in self._jobs.values() if other is not job]
+        # Tek bağlantılı dosya indiren işler paydan hariç tutulur
+        single = sum(1 for other in others if other.file_started is not None and not other.fragmented)
+        fair = (self.connection_budget - single) // (len(others) - single + 1)
+        free = self.connection_budget - sum(other.connections for other in others)
+        job.connections = max(1, min(want, fair, free))
+        job._opts['concurrent_fragment_downloads'] = job.connections
+        return job.connections
+
+    def start(self, download_id, source, opts):
+        """Reserve connections for a download and set them in its yt-dlp options"""
+        job = JobFragments(download_id, source, opts)
+        with self._lock:
+            self._jobs[download_id] = job
+            self._grant(job, self._source(source).target)
+        return job
+
+    def finish(self, job):
+        with self._lock:
+            if self._jobs.get(job.download_id) is job:
+                del self._jobs[job.download_id]
+
+    def _file_started(self, job, d, now):
+        job.files += 1
+        job._current = d.get('filename')
+        job.file_started = now
+        job.file_bytes = 0
+        job.fragments_done = 0
+        job.fragment_count = d.get('fragment_count')
+        job.fragmented = d.get('fragment_count') is not None or d.get('fragment_index') is not None
+        if not job.fragmented:
+            # Tek bağlantılı dosya - fazla ayrılan bağlantılar diğer işlere kalsın
+            self._grant(job, 1)
+
+    def _file_finished(self, job, d, now):
+        size = d.get('downloaded_bytes') or d.get('total_bytes') or job.file_bytes
+        job.downloaded += size
+        if job.fragmented and job.file_started is not None:
+            elapsed = now - job.file_started
+            if elapsed >= MIN_SAMPLE_SECONDS and size:
+                self._source(job.source).record(job.connections, size / elapsed,
+                                                self.gain_threshold, self.probe_every)
+        job._current = None
+        job.file_started = None
+        # Sonraki dosya (ör. ses) yeni bağlantı sayısıyla başlar
+        self._grant(job, self._source(job.source).target)
+
+    def hook(self, job):
+        """yt-dlp progress hook that tracks fragments and retunes between files"""
+        def observe(d):
+            status = d.get('status')
+            if status not in ('downloading', 'finished'):
+                return
+            now = time.monotonic()
+            with self._lock:
+                if status == 'downloading':
+                    if job._current is None or d.get('filename') != job._current:
+                        self._file_started(job, d, now)
+                    job.file_bytes = d.get('downloaded_bytes') or 0
+                    if d.get('fragment_index') is not None:
+                        job.fragments_done = d['fragment_index']
+                    if d.get('fragment_count'):
+                        job.fragment_count = d['fragment_count']
+                elif job._current is not None:
+                    self._file_finished(job, d, now)
+        return observe
+
+    def job_stats(self, download_id):
+        """Fragment counters of a running download, None if it is not running here"""
+        with self._lock:
+            job = self._jobs.get(download_id)
+            if job is None:
+                return None
+            elapsed = time.monotonic() - job.file_started if job.file_started is not None else None
+            throughput = job.file_bytes / elapsed if elapsed else None
+            return {
+                'source': job.source,
+                'connections': job.connections,
+                'fragmented': job.fragmented,
+                'files': job.files,
+                'fragments_done': job.fragments_done,
+                'fragment_count': job.fragment_count,
+                'throughput': int(throughput) if throughput else None,
+                'per_connection_throughput': int(throughput / job.connections) if throughput else None
+            }
+
+    def stats(self):
+        with self._lock:
+            in_use = sum(job.connections for job in self._jobs.values())
+            return {
+                'connection_budget': self.connection_budget,
+                'connections_in_use': in_use,
+                'max_per_job': self.max_per_job,
+                'active_jobs': len(self._jobs),
+                'sources': {source: tuner.stats() for source, tuner in self._sources.items()}
+            }
@@ -0,0 +1,41 @@
+"""
+Gunicorn Config
+Üretim modu: birden fazla worker süreci, iş durumu ortak SQLite kaydında.
+Tekil indirmeler ortak kuyrukta (SQLite) bekler; boş slotu olan worker sıradaki işi
+atomik olarak alır. MAX_DOWNLOADS worker'lara bölünür, artan slotlar WORKER_SLOT
+sırasına göre verilir; durum, iptal ve silme istekleri hangi worker'a gelirse gelsin çalışır.
+Worker'lar asgi_server'ı uvicorn ile çalıştırır: /api/events bağlantıları thread tutmaz.
+
+Kullanım: gunicorn -c gunicorn.conf.py asgi_server:app
+"""
+
+import multiprocessing
+import os
+
+# api_server import edilmeden önce (her worker'da) okunur
+os.environ.setdefault('SHARED_STATE', '1')
+os.environ.setdefault('WEB_CONCURRENCY', str(min(4, multiprocessing.cpu_count())))
+os.environ.setdefault('VIDEO_CACHE_DB', 'video_cache.db')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ['WEB_CONCURRENCY'])
+# SSE, arama ve playlist akışı coroutine olarak çalışır; diğer Flask route'ları
+# worker başına ASGI_WSGI_WORKERS thread'lik havuzda
+worker_class = 'uvicorn.workers.UvicornWorker'
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+# Her worker kendi thread'lerini ve SQLite bağlantılarını fork'tan sonra açmalı
+preload_app = False
+accesslog = '-'
+
+
+def pre_fork(server, worker):
+    # Arbiter'da çalışır: yeni worker boştaki en küçük slotu alır, yeniden başlatılan worker öncekinin slotunu
+    taken = {getattr(other, 'download_slot', None) for other in server.WORKERS.values()}
+    worker.download_slot = next(slot for slot in range(server.num_workers + len(taken)) if slot not in taken)
+
+
+def post_fork(server, worker):
+    # api_server import edilmeden önce: indirme sınırından artan payın hangi worker'a düşeceği
+    os.environ['WORKER_SLOT'] = str(worker.download_slot)
@@ -0,0 +1,199 @@
+"""
+Janitor
+İş geçmişi ve indirilen dosyalar için saklama politikası.
+Arka planda belirli aralıklarla çalışır; süresi dolan kayıtları,
+geçmiş sınırını aşan eski kayıtları ve disk doluluk eşiği aşıldığında
+en eski tamamlanmış indirmeleri dosyalarıyla birlikte siler.
+"""
+
+import heapq
+import os
+import shutil
+import threading
+import time
+
+from job_registry import TERMINAL_STATUSES
+
+DEFAULT_POLICY = {
+    'interval_seconds': 300,
+    'ttl_seconds': {
+        'completed': 86400,
+        'error': 21600,
+        'cancelled': 3600
+    },
+    'max_history': 10000,
+    'disk_high_watermark': 0.90,
+    'disk_low_watermark': 0.80,
+    # Bir çalışmada disk eşiği için en fazla bu kadar grup silinir
+    'disk_max_batches': 50,
+    'delete_files': True
+}
+
+BATCH_SIZE = 500
+# Disk eşiği aşıldığında bir seferde silinen tamamlanmış iş sayısı
+DISK_BATCH_SIZE = 20
+
+
+class Janitor:
+    """Background garbage collector for job records and their output files"""
+
+    def __init__(self, registry, disk_path, policy=None, job_files=None, job_dirs=None):
+        self.registry = registry
+        self.disk_path = disk_path
+        self.policy = dict(DEFAULT_POLICY)
+        self.policy.update(policy or {})
+        self.policy['ttl_seconds'] = dict(DEFAULT_POLICY['ttl_seconds'], **(policy or {}).get('ttl_seconds', {}))
+        # İşin diskteki dosyalarını döndüren fonksiyon
+        self.job_files = job_files or (lambda job: [])
+        # Dosyalar silindikten sonra boşalırsa kaldırılacak iş klasörleri
+        self.job_dirs = job_dirs or (lambda job: [])
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_run = None
+        self.totals = {'runs': 0, 'records_removed': 0, 'files_removed': 0, 'bytes_reclaimed': 0}
+
+    def start(self):
+        interval = self.policy.get('interval_seconds')
+        if self._thread is not None or not interval or interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._loop, name='janitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.policy['interval_seconds']):
+            try:
+                self.run()
+            except Exception as e:
+                print(f"Temizlik hatası: {str(e)}")
+
+    def _oldest_terminal(self):
+        """Terminal jobs across statuses, oldest end_time first"""
+        def by_end(status):
+            offset = 0
+            while True:
+                page = self.registry.list(status=status, offset=offset, limit=BATCH_SIZE)
+                if not page:
+                    return
+                for job in page:
+                    yield (job.end_time or job.start_time, job.download_id, job)
+                offset += len(page)
+        return (item[2] for item in heapq.merge(*(by_end(s) for s in TERMINAL_STATUSES)))
+
+    def _expired(self, now):
+        expired = []
+        for status, ttl in self.policy['ttl_seconds'].items():
+            if ttl is None or ttl < 0:
+                continue
+            offset = 0
+            done = False
+            while not done:
+                page = self.registry.list(status=status, offset=offset, limit=BATCH_SIZE)
+                if not page:
+                    break
+                for job in page:
+                    # Bitmiş iş indeksleri end_time sırasındadır (JobRegistry.restore da korur)
+                    if (job.end_time or job.start_time) + ttl > now:
+                        done = True
+                        break
+                    expired.append(job)
+                offset += len(page)
+        return expired
+
+    def _disk_usage(self):
+        try:
+            usage = shutil.disk_usage(self.disk_path)
+        except OSError:
+            return None
+        return usage.used / usage.total if usage.total else None
+
+    def _delete(self, jobs, report, reason):
+        """Remove jobs and their files; returns the bytes freed on disk"""
+        removed = self.registry.remove_many([job.download_id for job in jobs])
+        report['records_removed'] += len(removed)
+        report['by_reason'][reason] = report['by_reason'].get(reason, 0) + len(removed)
+        freed = 0
+        if not self.policy.get('delete_files', True):
+            return freed
+        for job in removed:
+            for path in self.job_files(job):
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                except OSError:
+                    continue
+                report['files_removed'] += 1
+                report['bytes_reclaimed'] += size
+                freed += size
+            for directory in self.job_dirs(job):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+        return freed
+
+    def run(self):
+        """Apply the retention policy once and return what was reclaimed"""
+        with self._lock:
+            started = time.time()
+            report = {'records_removed': 0, 'files_removed': 0, 'bytes_reclaimed': 0, 'by_reason': {}}
+
+            # 1) Süresi dolan kayıtlar
+            expired = self._expired(started)
+            if expired:
+                self._delete(expired, report, 'ttl')
+
+            # 2) Geçmiş sınırı
+            max_history = self.policy.get('max_history')
+            if max_history is not None and max_history >= 0:
+                excess = sum(self.registry.count(s) for s in TERMINAL_STATUSES) - max_history
+                if excess > 0:
+                    oldest = []
+                    for job in self._oldest_terminal():
+                        oldest.append(job)
+                        if len(oldest) >= excess:
+                            break
+                    self._delete(oldest, report, 'max_history')
+
+            # 3) Disk doluluk eşiği - en eski tamamlanmış indirmelerden başla
+            high = self.policy.get('disk_high_watermark')
+            low = self.policy.get('disk_low_watermark', high)
+            usage = self._disk_usage()
+            report['disk_usage_before'] = usage
+            if high and usage is not None and usage > high:
+                batches = 0
+                while usage is not None and usage > low:
+                    if batches >= self.policy.get('disk_max_batches', 50):
+                        report['disk_watermark_stopped'] = 'max_batches'
+                        break
+                    batch = self.registry.list(status='completed', limit=DISK_BATCH_SIZE)
+                    if not batch:
+                        break
+                    batches += 1
+                    if not self._delete(batch, report, 'disk_watermark'):
+                        # Disk başka bir sebepten dolu veya işlerin dosyası yok - geçmişi boşuna silme
+                        report['disk_watermark_stopped'] = 'nothing_freed'
+                        break
+                    usage = self._disk_usage()
+            report['disk_usage_after'] = self._disk_usage()
+
+            report['started_at'] = started
+            report['duration_seconds'] = round(time.time() - started, 3)
+            self.last_run = report
+            self.totals['runs'] += 1
+            for key in ('records_removed', 'files_removed', 'bytes_reclaimed'):
+                self.totals[key] += report[key]
+            if report['records_removed']:
+                print(f"Temizlik: {report['records_removed']} kayıt, {report['files_removed']} dosya, "
+                      f"{report['bytes_reclaimed'] / (1024 * 1024):.1f} MB silindi")
+            return report
+
+    def stats(self):
+        return {
+            'policy': self.policy,
+            'last_run': self.last_run,
+            'totals': dict(self.totals)
+        }
@@ -0,0 +1,284 @@
+"""
+Job Registry
+İndirme işlerinin durumunu tutan thread-safe kayıt.
+Her iş __slots__ tabanlı kompakt bir nesnedir; duruma göre indeksler
+sayesinde listeleme ve temizleme tüm geçmişi taramadan yapılır.
+"""
+
+import threading
+import time
+from itertools import islice
+
+# Hâlâ çalışan (temizlenmemesi gereken) durumlar
+ACTIVE_STATUSES = ('queued', 'starting', 'downloading', 'finished', 'retrying')
+# Bitmiş işler - saklama süresi bu durumlara uygulanır
+TERMINAL_STATUSES = ('completed', 'error', 'cancelled')
+
+# Değeri None ise yanıtta gösterilmeyen alanlar
+OPTIONAL_FIELDS = ('note', 'warning', 'ffmpeg_available', 'file_info', 'end_time', 'shared_with',
+                   'output_files', 'batch_id', 'owner', 'cancel_latency', 'attempts', 'retry_at',
+                   'error_class', 'rate_limit')
+
+
+def format_speed(bytes_per_second):
+    """Human-readable download speed"""
+    if not bytes_per_second:
+        return '0 MB/s'
+    return f"{bytes_per_second / 1024 / 1024:.1f} MB/s"
+
+
+class DownloadJob:
+    """State of a single download"""
+
+    __slots__ = (
+        'download_id', 'video_url', 'format', 'quality', 'output_path',
+        'status', 'progress', 'speed', 'downloaded_bytes', 'total_bytes',
+        'message', 'start_time', 'note', 'warning', 'ffmpeg_available',
+        'file_info', 'end_time', 'shared_with', 'output_files', 'batch_id', 'owner',
+        'cancel_latency', 'attempts', 'retry_at', 'error_class', 'rate_limit',
+        '_lock'
+    )
+
+    def __init__(self, download_id, video_url, format, quality, output_path, message=''):
+        self.download_id = download_id
+        self.video_url = video_url
+        self.format = format
+        self.quality = quality
+        self.output_path = output_path
+        self.status = 'queued'
+        self.progress = 0
+        self.speed = 0.0  # bytes/s - metin hali to_dict'te üretilir
+        self.downloaded_bytes = 0
+        self.total_bytes = 0
+        self.message = message
+        self.start_time = time.time()
+        self.note = None
+        self.warning = None
+        self.ffmpeg_available = None
+        self.file_info = None
+        self.end_time = None
+        self.shared_with = None  # Bağlı olunan (lider) işin download_id'si
+        self.output_files = None  # İşin ürettiği dosyalar (ana dosya ilk sırada)
+        self.batch_id = None  # Bağlı olduğu toplu indirme
+        self.owner = None  # İşi çalıştıran worker süreci (çoklu worker modunda)
+        self.cancel_latency = None  # İptal isteğinden worker'ın serbest kalmasına kadar geçen süre (sn)
+        self.attempts = None  # Başlatılan indirme denemesi sayısı
+        self.retry_at = None  # Bir sonraki denemenin kuyruğa gireceği zaman
+        self.error_class = None  # Son hatanın sınıfı (retry_policy.classify_error)
+        self.rate_limit = None  # İşe özel bant genişliği sınırı (byte/s)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a job from a stored to_record() payload"""
+        job = cls(data['download_id'], data['video_url'], data['format'],
+                  data['quality'], data['output_path'], message=data.get('message') or '')
+        for field in cls.__slots__:
+            if field != '_lock' and data.get(field) is not None:
+                setattr(job, field, data[field])
+        if not isinstance(job.speed, (int, float)):
+            # Biçimlendirilmiş metin (to_dict çıktısı) hızı geri vermez
+            job.speed = 0.0
+        return job
+
+    def to_dict(self):
+        """JSON-ready copy of the job state"""
+        data = self.to_record()
+        data['speed'] = format_speed(data['speed'])
+        return data
+
+    def to_record(self):
+        """Job state with the raw speed in bytes/s, as persisted by JobStore"""
+        with self._lock:
+            data = {
+                'download_id': self.download_id,
+                'status': self.status,
+                'progress': self.progress,
+                'speed': self.speed,
+                'downloaded_bytes': self.downloaded_bytes,
+                'total_bytes': self.total_bytes,
+                'message': self.message,
+                'video_url': self.video_url,
+                'format': self.format,
+                'quality': self.quality,
+                'output_path': self.output_path,
+                'start_time': self.start_time
+            }
+            for field in OPTIONAL_FIELDS:
+                value = getattr(self, field)
+                if value is not None:
+                    data[field] = value
+        return data
+
+
+class JobRegistry:
+    """Thread-safe job store with O(1) per-status indexes"""
+
+    def __init__(self, store=None, on_change=None, owner=None):
+        self._lock = threading.Lock()
+        self._jobs = {}  # download_id -> DownloadJob (ekleme sırasıyla)
+        self._by_status = {}  # status -> {download_id: DownloadJob}
+        self.store = store  # İsteğe bağlı kalıcı kayıt (JobStore)
+        self.on_change = on_change  # Güncellenen/silinen işin download_id'si ile çağrılır
+        self.owner = owner  # Bu süreçte eklenen işlerin sahibi (çoklu worker modu)
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, download_id):
+        return download_id in self._jobs
+
+    def add(self, job):
+        if self.owner is not None:
+            job.owner = self.owner
+        with self._lock:
+            self._jobs[job.download_id] = job
+            self._by_status.setdefault(job.status, {})[job.download_id] = job
+            if self.store is not None:
+                self.store.mark_dirty(job, urgent=True)
+        return job
+
+    def get(self, download_id):
+        return self._jobs.get(download_id)
+
+    def update(self, download_id, **fields):
+        """Update job fields; status changes also move the job between indexes"""
+        job = self._jobs.get(download_id)
+        if job is None:
+            return None
+        self.update_job(job, **fields)
+        return job
+
+    def update_job(self, job, **fields):
+        new_status = fields.get('status')
+        if new_status in TERMINAL_STATUSES and 'end_time' not in fields:
+            fields['end_time'] = time.time()
+        if new_status is None:
+            with job._lock:
+                for field, value in fields.items():
+                    setattr(job, field, value)
+            status_changed = False
+        else:
+            # Durum ve indeks aynı kritik bölümde değişir; aksi halde eşzamanlı iki güncelleme
+            # işi iki ayrı durum indeksinde bırakabilir
+            with self._lock:
+                with job._lock:
+                    old_status = job.status
+                    for field, value in fields.items():
+                        setattr(job, field, value)
+                status_changed = new_status != old_status
+                if status_changed:
+                    self._reindex(job, old_status, new_status)
+        if self.store is not None:
+            with self._lock:
+                if self._jobs.get(job.download_id) is job:
+                    # Durum değişiklikleri hemen, ilerleme güncellemeleri toplu yazılır
+                    self.store.mark_dirty(job, urgent=status_changed)
+        if self.on_change is not None:
+            self.on_change(job.download_id)
+
+    def _notify(self, download_ids):
+        if self.on_change is not None:
+            for download_id in download_ids:
+                self.on_change(download_id)
+
+    def _reindex(self, job, old_status, new_status):
+        """Move a job between status indexes; the caller holds self._lock"""
+        # Silinmiş bir işin güncellemesi indeksi tekrar doldurmamalı
+        if self._jobs.get(job.download_id) is not job:
+            return
+        bucket = self._by_status.get(old_status)
+        if bucket is not None:
+            bucket.pop(job.download_id, None)
+        self._by_status.setdefault(new_status, {})[job.download_id] = job
+
+    def remove(self, download_id):
+        with self._lock:
+            job = self._jobs.pop(download_id, None)
+            if job is None:
+                return None
+            bucket = self._by_status.get(job.status)
+            if bucket is not None:
+                bucket.pop(download_id, None)
+            if self.store is not None:
+                self.store.forget([download_id])
+        self._notify([download_id])
+        return job
+
+    def clear(self, keep_statuses=()):
+        """Remove every job whose status is not in keep_statuses; returns removed count
+
+        Records are only dropped - callers cancel running jobs first.
+        """
+        with self._lock:
+            if not keep_statuses:
+                removed_ids = list(self._jobs)
+                self._jobs = {}
+                self._by_status = {}
+                if self.store is not None:
+                    self.store.forget_all(owner=self.owner)
+            else:
+                removed_ids = []
+                for status in list(self._by_status):
+                    if status in keep_statuses:
+                        continue
+                    bucket = self._by_status.pop(status)
+                    for download_id in bucket:
+                        self._jobs.pop(download_id, None)
+                    removed_ids.extend(bucket)
+                if self.store is not None and removed_ids:
+                    self.store.forget(removed_ids)
+        self._notify(removed_ids)
+        return len(removed_ids)
+
+    def remove_many(self, download_ids):
+        """Remove several jobs at once; returns the removed job objects"""
+        removed = []
+        with self._lock:
+            for download_id in download_ids:
+                job = self._jobs.pop(download_id, None)
+                if job is None:
+                    continue
+                bucket = self._by_status.get(job.status)
+                if bucket is not None:
+                    bucket.pop(download_id, None)
+                removed.append(job)
+            if self.store is not None and removed:
+                self.store.forget([job.download_id for job in removed])
+        self._notify([job.download_id for job in removed])
+        return removed
+
+    def restore(self, jobs):
+        """Load jobs from the store without writing them back
+
+        Terminal indexes stay ordered by end_time, which the janitor relies on.
+        """
+        with self._lock:
+            finished = set()
+            for job in jobs:
+                self._jobs[job.download_id] = job
+                self._by_status.setdefault(job.status, {})[job.download_id] = job
+                if job.status in TERMINAL_STATUSES:
+                    finished.add(job.status)
+            # Kayıttan gelen (ör. başlangıç sırasına göre ya da devralınan) işler araya girer
+            for status in finished:
+                bucket = self._by_status[status]
+                ordered = sorted(bucket.values(), key=lambda job: job.end_time or job.start_time)
+                self._by_status[status] = {job.download_id: job for job in ordered}
+
+    def count(self, status=None):
+        if status is None:
+            return len(self._jobs)
+        return len(self._by_status.get(status, ()))
+
+    def counts(self):
+        with self._lock:
+            return {status: len(bucket) for status, bucket in self._by_status.items() if bucket}
+
+    def list(self, status=None, offset=0, limit=100, newest_first=False):
+        """Page of jobs, optionally filtered by status, without copying the whole store"""
+        with self._lock:
+            source = self._jobs if status is None else self._by_status.get(status, {})
+            values = reversed(source.values()) if newest_first else iter(source.values())
+            page = list(islice(values, offset, offset + limit))
+        return page
@@ -0,0 +1,369 @@
+"""
+Job Store
+İndirme işlerini SQLite (WAL) üzerinde kalıcı olarak saklar.
+İlerleme güncellemeleri bellekte "kirli" olarak işaretlenir ve arka planda
+toplu halde yazılır; her parça (chunk) için diske yazma/fsync yapılmaz.
+Birden fazla worker süreci aynı veritabanını paylaşabilir: her iş kaydının
+bir sahibi (owner) vardır, diğer worker'lar kaydı okur ve istek bırakır.
+Sahipsiz 'queued' kayıtlar ortak indirme kuyruğudur: boş slotu olan worker
+en eskisini atomik olarak sahiplenip çalıştırır.
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+COLUMN_TYPES = {
+    'download_id': 'TEXT PRIMARY KEY',
+    'video_url': 'TEXT',
+    'format': 'TEXT',
+    'quality': 'TEXT',
+    'output_path': 'TEXT',
+    'status': 'TEXT',
+    'progress': 'REAL',
+    'speed': 'REAL',  # byte/s; biçimlendirme çıktıda yapılır
+    'downloaded_bytes': 'INTEGER',
+    'total_bytes': 'INTEGER',
+    'message': 'TEXT',
+    'start_time': 'REAL',
+    'note': 'TEXT',
+    'warning': 'TEXT',
+    'ffmpeg_available': 'INTEGER',
+    'file_info': 'TEXT',
+    'end_time': 'REAL',
+    'shared_with': 'TEXT',
+    'output_files': 'TEXT',
+    'batch_id': 'TEXT',
+    'owner': 'TEXT',
+    'cancel_latency': 'REAL',
+    'attempts': 'INTEGER',
+    'retry_at': 'REAL',
+    'error_class': 'TEXT',
+    'rate_limit': 'INTEGER',
+}
+COLUMNS = tuple(COLUMN_TYPES)
+
+# JSON olarak saklanan alanlar
+JSON_COLUMNS = ('file_info', 'output_files')
+
+# Sahibine ulaşmayan istekler bu süreden sonra silinir (saniye)
+ACTION_TTL = 3600
+
+# Kilitli veritabanında bir ifadenin bekleyebileceği en uzun süre (saniye)
+BUSY_TIMEOUT = 30
+
+
+class JobStore:
+    """SQLite-backed job persistence with batched, coalesced writes"""
+
+    def __init__(self, db_path, flush_interval=1.0):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.busy_timeout = BUSY_TIMEOUT
+        self._lock = threading.Lock()
+        self._dirty = {}  # download_id -> job
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.writes = 0
+        self.flushes = 0
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=self.busy_timeout)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # WAL + NORMAL: commit'ler fsync beklemez, sadece checkpoint'te diske senkronlanır
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        columns = ', '.join(f'{name} {kind}' for name, kind in COLUMN_TYPES.items())
+        self._conn.execute(f'CREATE TABLE IF NOT EXISTS jobs ({columns}, updated_at REAL)')
+        # Eski veritabanlarına sonradan eklenen kolonları ekle
+        existing = {row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+        for name, kind in COLUMN_TYPES.items():
+            if name not in existing:
+                self._conn.execute(f'ALTER TABLE jobs ADD COLUMN {name} {kind}')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id)')
+        # Çoklu worker: canlılık sinyali ve sahibine iletilecek istekler
+        self._conn.execute('CREATE TABLE IF NOT EXISTS workers (owner TEXT PRIMARY KEY, heartbeat REAL)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS job_actions ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, target TEXT, action TEXT, requested_at REAL)'
+        )
+        self._conn.commit()
+
+        self._flusher = threading.Thread(target=self._flush_loop, name='job-store-flush', daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def mark_dirty(self, job, urgent=False):
+        """Schedule the job row for the next batched write"""
+        with self._lock:
+            self._dirty[job.download_id] = job
+        if urgent:
+            self._wake.set()
+
+    def forget(self, download_ids):
+        """Delete rows and drop any pending writes for them"""
+        download_ids = list(download_ids)
+        with self._lock:
+            for download_id in download_ids:
+                self._dirty.pop(download_id, None)
+            self._conn.executemany('DELETE FROM jobs WHERE download_id = ?', [(i,) for i in download_ids])
+            self._conn.commit()
+
+    def forget_all(self, owner=None):
+        """Delete every row, or only the rows of one worker"""
+        with self._lock:
+            self._dirty.clear()
+            if owner is None:
+                self._conn.execute('DELETE FROM jobs')
+            else:
+                self._conn.execute('DELETE FROM jobs WHERE owner = ?', (owner,))
+            self._conn.commit()
+
+    @staticmethod
+    def _row_to_dict(row):
+        data = dict(zip(COLUMNS, row))
+        for column in JSON_COLUMNS:
+            if data[column] is not None:
+                data[column] = json.loads(data[column])
+        if data['ffmpeg_available'] is not None:
+            data['ffmpeg_available'] = bool(data['ffmpeg_available'])
+        # Eski veritabanlarında kolon TEXT: sayı metin olarak, eski kayıtlarda "1.2 MB/s" olarak döner
+        try:
+            data['speed'] = float(data['speed'] or 0)
+        except (TypeError, ValueError):
+            data['speed'] = 0.0
+        return data
+
+    def _select(self, where='', params=(), suffix=''):
+        with self._lock:
+            cursor = self._conn.execute(f'SELECT {", ".join(COLUMNS)} FROM jobs {where} {suffix}', params)
+            rows = cursor.fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def load(self):
+        """All stored jobs as dicts, oldest first"""
+        return self._select(suffix='ORDER BY start_time')
+
+    def get(self, download_id):
+        """Stored state of one job (as last flushed by its owner), or None"""
+        rows = self._select('WHERE download_id = ?', (download_id,))
+        return rows[0] if rows else None
+
+    def list_page(self, status=None, offset=0, limit=100, newest_first=False):
+        where, params = ('WHERE status = ?', (status,)) if status else ('', ())
+        order = 'DESC' if newest_first else 'ASC'
+        return self._select(where, params + (limit, offset), f'ORDER BY start_time {order} LIMIT ? OFFSET ?')
+
+    def count(self, status=None):
+        with self._lock:
+            if status is None:
+                return self._conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+            return self._conn.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (status,)).fetchone()[0]
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return dict(rows)
+
+    def by_batch(self, batch_id):
+        return self._select('WHERE batch_id = ?', (batch_id,), 'ORDER BY start_time')
+
+    def heartbeat(self, owner):
+        """Mark a worker process as alive"""
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO workers (owner, heartbeat) VALUES (?, ?)', (owner, time.time()))
+            self._conn.commit()
+
+    def retire(self, owner):
+        """Worker is shutting down; its jobs can be adopted right away"""
+        with self._lock:
+            self._conn.execute('DELETE FROM workers WHERE owner = ?', (owner,))
+            self._conn.commit()
+
+    def live_owners(self, stale_after):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT owner FROM workers WHERE heartbeat >= ?', (time.time() - stale_after,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def claim_orphans(self, owner, stale_after):
+        """Atomically take over jobs with no owner or a dead one; returns their rows
+
+        Queued single downloads of a dead worker go back to the shared queue instead.
+        """
+        cutoff = time.time() - stale_after
+        with self._lock:
+            # IMMEDIATE: aynı anda başlayan worker'lar aynı işi sahiplenemez
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                dead = 'owner != ? AND owner NOT IN (SELECT owner FROM workers WHERE heartbeat >= ?)'
+                self._conn.execute(
+                    f"UPDATE jobs SET owner = NULL WHERE status = 'queued' AND batch_id IS NULL AND {dead}",
+                    (owner, cutoff)
+                )
+                ids = [row[0] for row in self._conn.execute(
+                    f"SELECT download_id FROM jobs WHERE (owner IS NULL AND status != 'queued') OR ({dead})",
+                    (owner, cutoff)
+                )]
+                self._conn.executemany('UPDATE jobs SET owner = ? WHERE download_id = ?', [(owner, i) for i in ids])
+                self._conn.execute('DELETE FROM workers WHERE heartbeat < ?', (cutoff,))
+                # Hedefi kalmamış eski istekler
+                self._conn.execute('DELETE FROM job_actions WHERE requested_at < ?', (time.time() - ACTION_TTL,))
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+        if not ids:
+            return []
+        return self._select(f'WHERE owner = ? AND download_id IN ({", ".join("?" * len(ids))})',
+                            (owner,) + tuple(ids), 'ORDER BY start_time')
+
+    def publish_queued(self, job):
+        """Write a queued job without an owner; any worker with a free slot may claim it"""
+        with self._lock:
+            # Bu süreçte bekleyen yazım, işi sahiplenen worker'ın kaydını ezmesin
+            self._dirty.pop(job.download_id, None)
+            row = self._row(job, time.time())
+            row[COLUMNS.index('owner')] = None
+            self._insert([row])
+
+    def claim_queued(self, owner, limit, download_id=None):
+        """Atomically take the oldest unowned queued jobs (or the given one); returns their rows"""
+        if limit <= 0:
+            return []
+        where, params = "status = 'queued' AND owner IS NULL", ()
+        if download_id is not None:
+            where, params = where + ' AND download_id = ?', (download_id,)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                ids = [row[0] for row in self._conn.execute(
+                    f'SELECT download_id FROM jobs WHERE {where} ORDER BY start_time, download_id LIMIT ?',
+                    params + (limit,)
+                )]
+                self._conn.executemany('UPDATE jobs SET owner = ? WHERE download_id = ?', [(owner, i) for i in ids])
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+        if not ids:
+            return []
+        return self._select(f'WHERE owner = ? AND download_id IN ({", ".join("?" * len(ids))})',
+                            (owner,) + tuple(ids), 'ORDER BY start_time, download_id')
+
+    def queue_position(self, download_id):
+        """1-based position of an unowned queued job in the shared queue, None if it is not there"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs AS ahead, jobs AS job WHERE job.download_id = ? "
+                "AND job.status = 'queued' AND job.owner IS NULL "
+                "AND ahead.status = 'queued' AND ahead.owner IS NULL "
+                "AND (ahead.start_time < job.start_time OR "
+                "(ahead.start_time = job.start_time AND ahead.download_id <= job.download_id))",
+                (download_id,)
+            ).fetchone()
+        return row[0] or None
+
+    def shared_queue_length(self):
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND owner IS NULL").fetchone()
+        return row[0]
+
+    def forget_unclaimed(self):
+        """Delete queued jobs no worker has claimed yet"""
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE status = 'queued' AND owner IS NULL")
+            self._conn.commit()
+
+    def request_action(self, target, action):
+        """Leave a request (cancel, delete...) for the worker owning a job or batch"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO job_actions (target, action, requested_at) VALUES (?, ?, ?)',
+                (target, action, time.time())
+            )
+            self._conn.commit()
+
+    def take_actions(self, owner):
+        """Pending requests for this worker's jobs, batches or the worker itself"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, target, action FROM job_actions WHERE target = ? '
+                'OR target IN (SELECT download_id FROM jobs WHERE owner = ?) '
+                'OR target IN (SELECT batch_id FROM jobs WHERE owner = ? AND batch_id IS NOT NULL) '
+                'ORDER BY id', (owner, owner, owner)
+            ).fetchall()
+            if rows:
+                self._conn.executemany('DELETE FROM job_actions WHERE id = ?', [(row[0],) for row in rows])
+                self._conn.commit()
+        return [(target, action) for _, target, action in rows]
+
+    def flush(self):
+        """Write every dirty job in a single transaction"""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            dirty, self._dirty = self._dirty, {}
+            now = time.time()
+            rows = [self._row(job, now) for job in dirty.values()]
+            self._insert(rows)
+            self.flushes += 1
+            return len(rows)
+
+    @staticmethod
+    def _row(job, now):
+        data = job.to_record()
+        row = []
+        for column in COLUMNS:
+            value = data.get(column)
+            if column in JSON_COLUMNS and value is not None:
+                value = json.dumps(value, ensure_ascii=False)
+            row.append(value)
+        row.append(now)
+        return row
+
+    def _insert(self, rows):
+        """Write rows in one transaction; called with the lock held"""
+        placeholders = ', '.join('?' * (len(COLUMNS) + 1))
+        self._conn.executemany(
+            f'INSERT OR REPLACE INTO jobs ({", ".join(COLUMNS)}, updated_at) VALUES ({placeholders})',
+            rows
+        )
+        self._conn.commit()
+        self.writes += len(rows)
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"İş kaydı yazılamadı: {str(e)}")
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            print(f"İş kaydı yazılamadı: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._dirty)
+        return {
+            'path': self.db_path,
+            'pending_writes': pending,
+            'rows_written': self.writes,
+            'flushes': self.flushes,
+            'flush_interval': self.flush_interval
+        }
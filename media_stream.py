@@ -0,0 +1,137 @@
+"""
+Media Stream
+İndirmeyi diske yazmadan doğrudan HTTP yanıtına aktarır.
+yt-dlp çıktısı (gerekirse ffmpeg dönüşümünden geçerek) pipe üzerinden okunur;
+pipe'lar sınırlı olduğu için yavaş istemci yt-dlp'yi de yavaşlatır
+(backpressure), istemci bağlantıyı kestiğinde süreçler sonlandırılır.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+def ydl_cli_args(opts):
+    """Translate the shared yt-dlp option dict into command line arguments"""
+    args = []
+    cookiefile = opts.get('cookiefile')
+    if cookiefile and os.path.exists(cookiefile):
+        args += ['--cookies', cookiefile]
+    if opts.get('user_agent'):
+        args += ['--user-agent', opts['user_agent']]
+    for extractor, extractor_opts in (opts.get('extractor_args') or {}).items():
+        values = ';'.join(f"{key}={','.join(value)}" for key, value in extractor_opts.items())
+        args += ['--extractor-args', f'{extractor}:{values}']
+    for header, value in (opts.get('http_headers') or {}).items():
+        if header.lower() != 'user-agent':
+            args += ['--add-header', f'{header}:{value}']
+    return args
+
+
+class MediaStream:
+    """yt-dlp (and optional ffmpeg) subprocess pipeline read in bounded chunks"""
+
+    def __init__(self, video_url, format_string, base_opts, ffmpeg_args=None, on_close=None):
+        self.video_url = video_url
+        self.format_string = format_string
+        self.base_opts = base_opts
+        self.ffmpeg_args = ffmpeg_args
+        self.on_close = on_close
+        self.processes = []
+        self._stderr = []
+        self._output = None
+        self._pending = b''
+        self.bytes_sent = 0
+        self.closed = False
+
+    def start(self):
+        ydl_err = tempfile.TemporaryFile()
+        self._stderr.append(ydl_err)
+        command = [sys.executable, '-m', 'yt_dlp', '--quiet', '--no-warnings', '--no-playlist',
+                   '--no-part', '-f', self.format_string, '-o', '-']
+        command += ydl_cli_args(self.base_opts)
+        command += ['--', self.video_url]
+        downloader = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=ydl_err, bufsize=0)
+        self.processes.append(downloader)
+        self._output = downloader.stdout
+
+        if self.ffmpeg_args:
+            ffmpeg_err = tempfile.TemporaryFile()
+            self._stderr.append(ffmpeg_err)
+            converter = subprocess.Popen(
+                ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0'] + self.ffmpeg_args + ['pipe:1'],
+                stdin=downloader.stdout, stdout=subprocess.PIPE, stderr=ffmpeg_err, bufsize=0
+            )
+            # ffmpeg kapanırsa yt-dlp SIGPIPE alsın diye ebeveyndeki kopyayı kapat
+            downloader.stdout.close()
+            self.processes.append(converter)
+            self._output = converter.stdout
+        return self
+
+    def read(self, size=CHUNK_SIZE):
+        if self._pending:
+            chunk, self._pending = self._pending, b''
+            return chunk
+        chunk = self._output.read(size)
+        if chunk:
+            self.bytes_sent += len(chunk)
+        return chunk
+
+    def wait_first_chunk(self):
+        """Block until the pipeline produces data; False if it ended without any"""
+        self._pending = self.read()
+        return bool(self._pending)
+
+    def error_output(self):
+        """Last lines written to stderr by the pipeline"""
+        lines = []
+        for err in self._stderr:
+            try:
+                err.seek(0)
+                lines += err.read().decode('utf-8', 'replace').strip().splitlines()
+            except (OSError, ValueError):
+                pass
+        return '\n'.join(lines[-5:])
+
+    def failed(self):
+        """True if any process exited with an error"""
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                return True
+        return any(process.returncode for process in self.processes)
+
+    def close(self):
+        """Stop the pipeline (client finished or disconnected)"""
+        if self.closed:
+            return
+        self.closed = True
+        for process in reversed(self.processes):
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            if process.stdout:
+                process.stdout.close()
+        for err in self._stderr:
+            err.close()
+        if self.on_close is not None:
+            self.on_close(self)
+
+    def __iter__(self):
+        # WSGI sunucusu yanıt bitince veya istemci koptuğunda close() çağırır;
+        # başlamamış bir generator'ın finally bloğu çalışmadığı için kapanış close()'da
+        while not self.closed:
+            chunk = self.read()
+            if not chunk:
+                self.close()
+                break
+            yield chunk
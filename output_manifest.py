@@ -0,0 +1,81 @@
+"""
+Output Manifest
+Bir indirmenin ürettiği dosyaları yt-dlp hook'larından toplar.
+İndirme klasörünü taramak yerine işin tam dosya yolları kaydedilir;
+dosya bilgisi, dosya sunumu ve temizlik bu listeyi kullanır.
+Çıktı klasörleri indirme ID'sine göre alt klasörlere bölünür.
+"""
+
+import os
+import threading
+
+# İndirme ID'sinin ilk karakterleri ile oluşturulan ara klasör uzunluğu
+SHARD_PREFIX_LENGTH = 2
+
+
+def sharded_output_dir(output_path, download_id):
+    """Per-job directory: <output_path>/<id prefix>/<id>"""
+    return os.path.join(output_path, download_id[:SHARD_PREFIX_LENGTH], download_id)
+
+
+class OutputManifest:
+    """Exact files yt-dlp reports for one job, collected from its hooks"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._final = []  # post_hooks: son işlemden sonraki dosyalar
+        self._downloaded = []  # progress_hooks: indirilen ham dosyalar
+        self._intermediate = []  # postprocessor_hooks: ara dosyalar
+        self._partials = set()  # .part gibi geçici dosyalar
+
+    @staticmethod
+    def _add(items, path):
+        if path:
+            path = os.path.abspath(path)
+            if path not in items:
+                items.append(path)
+
+    def progress_hook(self, d):
+        with self._lock:
+            if d.get('tmpfilename'):
+                self._partials.add(os.path.abspath(d['tmpfilename']))
+            if d.get('status') == 'finished':
+                self._add(self._downloaded, d.get('filename'))
+
+    def postprocessor_hook(self, d):
+        filepath = (d.get('info_dict') or {}).get('filepath')
+        with self._lock:
+            self._add(self._intermediate, filepath)
+
+    def post_hook(self, filename):
+        with self._lock:
+            self._add(self._final, filename)
+
+    def ydl_opts(self):
+        """Hook options to merge into a yt-dlp option dict"""
+        return {
+            'postprocessor_hooks': [self.postprocessor_hook],
+            'post_hooks': [self.post_hook],
+        }
+
+    def paths(self):
+        """Every path reported so far, existing or not (final, intermediate, raw, partial)"""
+        with self._lock:
+            return self._final + self._intermediate + self._downloaded + sorted(self._partials)
+
+    def files(self):
+        """Output files that exist on disk, the final (post-processed) file first"""
+        with self._lock:
+            candidates = self._final + self._intermediate[::-1] + self._downloaded[::-1]
+        files = []
+        for path in candidates:
+            if path not in files and os.path.isfile(path):
+                files.append(path)
+        return files
+
+    def leftovers(self):
+        """Temporary files that are still on disk (interrupted or failed downloads)"""
+        with self._lock:
+            partials = sorted(self._partials)
+        return [path for path in partials if os.path.isfile(path)]
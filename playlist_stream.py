@@ -0,0 +1,181 @@
+"""
+Playlist Stream
+Playlist/kanal girdilerini NDJSON olarak satır satır gönderir.
+Girdiler yt-dlp'den sayfa sayfa (lazy) okunur; sayfa sonunda açık kalan
+iterator bir cursor ile saklanır, sonraki istek kaldığı yerden devam eder.
+Cursor süresi dolmuşsa playlist yeniden açılıp offset kadar girdi atlanır.
+"""
+
+import base64
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from itertools import islice
+
+_END = object()
+
+
+def encode_cursor(url, offset, key):
+    raw = json.dumps({'u': url, 'o': offset, 'k': key}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(url, offset, key) from a cursor; ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return data['u'], int(data['o']), data.get('k')
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError('Geçersiz cursor') from e
+
+
+class PlaylistSession:
+    """Open entry iterator of one playlist and its position"""
+
+    __slots__ = ('url', 'entries', 'offset', 'pending', 'last_used')
+
+    def __init__(self, url, entries, offset=0):
+        self.url = url
+        self.entries = entries
+        self.offset = offset  # Bir sonraki gönderilecek girdinin sırası
+        self.pending = _END  # İleriye bakılarak okunmuş ama gönderilmemiş girdi
+        self.last_used = time.time()
+
+    def next_entry(self):
+        if self.pending is not _END:
+            entry, self.pending = self.pending, _END
+            return entry
+        return next(self.entries, _END)
+
+    def has_more(self):
+        if self.pending is _END:
+            self.pending = next(self.entries, _END)
+        return self.pending is not _END
+
+    def close(self):
+        close = getattr(self.entries, 'close', None)
+        if close is not None:
+            close()
+
+
+class PlaylistCursors:
+    """Open playlist sessions keyed by cursor, bounded by count and idle time"""
+
+    def __init__(self, open_entries, max_sessions=100, ttl=300):
+        self.open_entries = open_entries  # url -> girdi iterator'ı
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # key -> PlaylistSession
+        self.resumed = 0
+        self.replayed = 0
+        self.opened = 0
+
+    def open(self, url):
+        self.opened += 1
+        return PlaylistSession(url, iter(self.open_entries(url)))
+
+    def resume(self, cursor):
+        """Session for a cursor; reopened and fast-forwarded if it is no longer held"""
+        url, offset, key = decode_cursor(cursor)
+        with self._lock:
+            session = self._sessions.pop(key, None)
+        if session is not None and session.offset == offset:
+            self.resumed += 1
+            return session
+        if session is not None:
+            session.close()
+        # Sunucu yeniden başlamış, süre dolmuş veya cursor başka bir worker'da
+        self.replayed += 1
+        session = PlaylistSession(url, iter(self.open_entries(url)), offset=offset)
+        for _ in islice(session.entries, offset):
+            pass
+        return session
+
+    def park(self, session):
+        """Keep a session for its continuation cursor; returns the cursor"""
+        key = uuid.uuid4().hex
+        session.last_used = time.time()
+        expired = []
+        with self._lock:
+            self._sessions[key] = session
+            now = time.time()
+            while self._sessions:
+                oldest_key, oldest = next(iter(self._sessions.items()))
+                if len(self._sessions) <= self.max_sessions and now - oldest.last_used < self.ttl:
+                    break
+                del self._sessions[oldest_key]
+                expired.append(oldest)
+        for old in expired:
+            old.close()
+        return encode_cursor(session.url, session.offset, key)
+
+    def stats(self):
+        with self._lock:
+            held = len(self._sessions)
+        return {
+            'open_sessions': held,
+            'max_sessions': self.max_sessions,
+            'opened': self.opened,
+            'resumed': self.resumed,
+            'replayed': self.replayed
+        }
+
+
+class PlaylistPage:
+    """NDJSON response body: up to `limit` entry rows, then a cursor row"""
+
+    def __init__(self, cursors, session, limit, row, first=_END):
+        self.cursors = cursors
+        self.session = session
+        self.limit = limit
+        self.row = row  # girdi sözlüğü -> JSON'a yazılacak satır
+        self.first = first
+        self.sent = 0
+        self.closed = False
+        self._parked = False
+
+    def __iter__(self):
+        session = self.session
+        error = None
+        while self.sent < self.limit and not self.closed:
+            try:
+                entry = self.first if self.first is not _END else session.next_entry()
+            except Exception as e:
+                error = str(e)
+                break
+            self.first = _END
+            if entry is _END:
+                break
+            row = self.row(entry)
+            row['index'] = session.offset
+            session.offset += 1
+            self.sent += 1
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+
+        tail = {'count': self.sent, 'offset': session.offset, 'has_more': False}
+        has_more = False
+        if error is None:
+            try:
+                has_more = session.has_more()
+            except Exception as e:
+                error = str(e)
+        if error is not None:
+            tail['error'] = error
+        if has_more:
+            tail['has_more'] = True
+            tail['cursor'] = self.cursors.park(session)
+            self._parked = True
+        yield json.dumps(tail, ensure_ascii=False) + '\n'
+        self.close()
+
+    def close(self):
+        """Release the iterator unless it was kept for the next page"""
+        if self.closed:
+            return
+        self.closed = True
+        if not self._parked:
+            self.session.close()
@@ -0,0 +1,304 @@
+"""
+Progress Events
+İndirme ilerlemesini Server-Sent Events (SSE) olarak yayınlar.
+İş kaydı her güncellendiğinde sadece o işi izleyen aboneler uyandırılır;
+abone başına yayın hızı sınırlıdır ve ara güncellemeler birleştirilir.
+Bağlantılar süre sınırlıdır, istemci (EventSource) otomatik yeniden bağlanır.
+Akış hem thread'li (WSGI) hem asyncio (ASGI) sunucularda iterate edilebilir.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from job_registry import TERMINAL_STATUSES
+
+
+class Subscription:
+    """Wake-up signal and pending changes of one SSE client"""
+
+    __slots__ = ('ids', 'event', 'dirty', '_lock')
+
+    def __init__(self):
+        self.ids = set()
+        self.event = threading.Event()
+        self.dirty = set()
+        self._lock = threading.Lock()
+
+    def notify(self, download_id):
+        with self._lock:
+            self.dirty.add(download_id)
+        self.event.set()
+
+    def take(self):
+        """Changed job IDs since the last call"""
+        with self._lock:
+            dirty, self.dirty = self.dirty, set()
+            self.event.clear()
+        return dirty
+
+
+class AsyncSubscription(Subscription):
+    """Subscription that also wakes an asyncio task; notify() may run on any thread"""
+
+    __slots__ = ('loop', 'wakeup')
+
+    def __init__(self, loop):
+        super().__init__()
+        self.loop = loop
+        self.wakeup = asyncio.Event()
+
+    def notify(self, download_id):
+        super().notify(download_id)
+        try:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+        except RuntimeError:
+            pass  # Event loop kapanmış
+
+    def take(self):
+        self.wakeup.clear()
+        return super().take()
+
+    async def wait(self, timeout):
+        """True if woken before the timeout"""
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class ProgressBroker:
+    """Routes job updates to the subscriptions watching those jobs"""
+
+    def __init__(self, max_subscribers=100):
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._watchers = {}  # download_id -> {Subscription}
+        self._active = 0
+        self.published = 0
+        self.delivered = 0
+        self.rejected = 0
+
+    def subscribe(self, ids, subscription=None):
+        """New subscription, or None when the subscriber limit is reached"""
+        with self._lock:
+            if self._active >= self.max_subscribers:
+                self.rejected += 1
+                return None
+            self._active += 1
+        subscription = subscription or Subscription()
+        self.watch(subscription, ids)
+        return subscription
+
+    def watch(self, subscription, ids):
+        """Replace the set of jobs a subscription is woken for"""
+        ids = set(ids)
+        with self._lock:
+            for download_id in subscription.ids - ids:
+                watchers = self._watchers.get(download_id)
+                if watchers is not None:
+                    watchers.discard(subscription)
+                    if not watchers:
+                        del self._watchers[download_id]
+            for download_id in ids - subscription.ids:
+                self._watchers.setdefault(download_id, set()).add(subscription)
+            subscription.ids = ids
+
+    def unsubscribe(self, subscription):
+        self.watch(subscription, ())
+        with self._lock:
+            self._active -= 1
+
+    def publish(self, download_id):
+        """Called on every job update; cheap when nobody watches the job"""
+        watchers = self._watchers.get(download_id)
+        if not watchers:
+            return
+        with self._lock:
+            watchers = list(self._watchers.get(download_id, ()))
+            self.published += 1
+            self.delivered += len(watchers)
+        for subscription in watchers:
+            subscription.notify(download_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': self._active,
+                'max_subscribers': self.max_subscribers,
+                'watched_jobs': len(self._watchers),
+                'published': self.published,
+                'delivered': self.delivered,
+                'rejected': self.rejected
+            }
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class EventStream:
+    """SSE response body for one or more download IDs
+
+    snapshot(download_id) returns (status payload or None, related IDs whose
+    updates also change this job's payload, e.g. the leader of a shared job).
+    With an executor, the async iterator calls snapshot() in that pool.
+    """
+
+    def __init__(self, broker, subscription, ids, snapshot, interval=0.5,
+                 max_duration=120, keepalive=15, retry_ms=1000, is_local=None, remote_poll=1.0,
+                 executor=None):
+        self.broker = broker
+        self.subscription = subscription
+        self.ids = list(dict.fromkeys(ids))
+        self.snapshot = snapshot
+        self.interval = interval
+        self.max_duration = max_duration
+        self.keepalive = keepalive
+        self.retry_ms = retry_ms
+        # Başka bir worker'da çalışan işler yayın almaz; ortak kayıttan periyodik okunur
+        self.is_local = is_local
+        self.remote_poll = remote_poll
+        # snapshot() ortak kayıttan (SQLite) okuyorsa event loop'u bekletmemeli
+        self.executor = executor
+        self._last_payload = {}
+        self.events_sent = 0
+        self.closed = False
+
+    def _render(self, pending, related, changed):
+        """Events for the changed jobs; finished or unknown jobs leave pending"""
+        chunks = []
+        for download_id in [i for i in self.ids if i in changed and i in pending]:
+            payload, links = self.snapshot(download_id)
+            related[download_id] = set(links)
+            if payload is None:
+                pending.discard(download_id)
+                chunks.append(format_event('error', {'download_id': download_id, 'error': 'Download ID not found'}))
+            elif payload.get('status') in TERMINAL_STATUSES:
+                pending.discard(download_id)
+                chunks.append(format_event('end', payload))
+            else:
+                encoded = format_event('progress', payload)
+                if self._last_payload.get(download_id) == encoded:
+                    continue
+                self._last_payload[download_id] = encoded
+                chunks.append(encoded)
+        self.events_sent += len(chunks)
+        return ''.join(chunks)
+
+    def _flush(self, pending, related, changed):
+        """Render the jobs affected by `changed` and re-point the subscription"""
+        affected = set()
+        for download_id in changed:
+            if download_id in pending:
+                affected.add(download_id)
+            affected.update(i for i, links in related.items() if download_id in links)
+        body = self._render(pending, related, affected)
+        for download_id in list(related):
+            if download_id not in pending:
+                del related[download_id]
+        self.broker.watch(self.subscription, pending.union(*related.values()))
+        return body
+
+    async def _flush_async(self, pending, related, changed):
+        if self.executor is None:
+            return self._flush(pending, related, changed)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._flush, pending, related, changed)
+
+    def _wait_timeout(self, pending, now, last_output, deadline):
+        """(timeout, jobs to poll because another worker runs them)"""
+        remote = [i for i in pending if not self.is_local(i)] if self.is_local is not None else []
+        timeout = min(self.keepalive - (now - last_output), deadline - now)
+        if remote:
+            timeout = min(timeout, self.remote_poll)
+        return max(0, timeout), remote
+
+    def __iter__(self):
+        started = time.monotonic()
+        deadline = started + self.max_duration
+        pending = set(self.ids)
+        related = {}  # izlenen iş -> payload'ını etkileyen diğer işler
+        changed = set(self.ids)  # ilk olayda tüm işlerin mevcut durumu gönderilir
+        last_sent = None
+        last_output = time.monotonic()
+        yield f"retry: {self.retry_ms}\n\n"
+
+        while pending and not self.closed:
+            now = time.monotonic()
+            if changed:
+                # Abone başına hız sınırı: aradaki güncellemeler tek olayda birleşir
+                if last_sent is not None and now - last_sent < self.interval:
+                    time.sleep(min(self.interval - (now - last_sent), max(0, deadline - now)))
+                    changed |= self.subscription.take()
+                body = self._flush(pending, related, changed)
+                last_sent = time.monotonic()
+                changed = set()
+                if body:
+                    last_output = last_sent
+                    yield body
+                continue
+
+            if deadline - now <= 0:
+                # Süre doldu; istemci retry süresi sonra yeniden bağlanır
+                yield ": reconnect\n\n"
+                break
+            timeout, remote = self._wait_timeout(pending, now, last_output, deadline)
+            if self.subscription.event.wait(timeout):
+                changed = self.subscription.take()
+            elif remote:
+                changed = set(remote)
+            if not changed and time.monotonic() - last_output >= self.keepalive and time.monotonic() < deadline:
+                last_output = time.monotonic()
+                yield ": keepalive\n\n"
+        self.close()
+
+    async def __aiter__(self):
+        """Same stream for asyncio servers; needs an AsyncSubscription"""
+        started = time.monotonic()
+        deadline = started + self.max_duration
+        pending = set(self.ids)
+        related = {}
+        changed = set(self.ids)
+        last_sent = None
+        last_output = time.monotonic()
+        try:
+            yield f"retry: {self.retry_ms}\n\n"
+
+            while pending and not self.closed:
+                now = time.monotonic()
+                if changed:
+                    if last_sent is not None and now - last_sent < self.interval:
+                        await asyncio.sleep(min(self.interval - (now - last_sent), max(0, deadline - now)))
+                        changed |= self.subscription.take()
+                    body = await self._flush_async(pending, related, changed)
+                    last_sent = time.monotonic()
+                    changed = set()
+                    if body:
+                        last_output = last_sent
+                        yield body
+                    continue
+
+                if deadline - now <= 0:
+                    yield ": reconnect\n\n"
+                    break
+                timeout, remote = self._wait_timeout(pending, now, last_output, deadline)
+                if await self.subscription.wait(timeout):
+                    changed = self.subscription.take()
+                elif remote:
+                    changed = set(remote)
+                if not changed and time.monotonic() - last_output >= self.keepalive and time.monotonic() < deadline:
+                    last_output = time.monotonic()
+                    yield ": keepalive\n\n"
+        finally:
+            # İstemci bağlantıyı kapattığında görev iptal edilir
+            self.close()
+
+    def close(self):
+        """Release the subscription (stream finished or client disconnected)"""
+        if self.closed:
+            return
+        self.closed = True
+        self.broker.unsubscribe(self.subscription)
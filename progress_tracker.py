@@ -0,0 +1,37 @@
+"""
+Progress Tracker
+yt-dlp her indirilen parça için progress_hook çağırır. Son değerler iş başına
+küçük bir sayısal yapıda tutulur ve iş kaydına saniyede en fazla belirli
+sayıda (ör. 4 Hz) yazılır; metin biçimlendirme durum okunurken yapılır.
+"""
+
+import time
+
+
+class ProgressThrottle:
+    """Latest numeric progress of one download, published at a limited rate"""
+
+    __slots__ = ('interval', 'downloaded', 'total', 'speed', 'last_publish', 'samples', 'published')
+
+    def __init__(self, rate=4.0):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.downloaded = 0
+        self.total = 0
+        self.speed = 0.0
+        self.last_publish = None
+        self.samples = 0
+        self.published = 0
+
+    def record(self, downloaded, total, speed):
+        """Store a hook sample; True when it is time to publish it"""
+        self.downloaded = downloaded
+        self.total = total
+        if speed:
+            self.speed = speed
+        self.samples += 1
+        now = time.monotonic()
+        if self.last_publish is not None and now - self.last_publish < self.interval:
+            return False
+        self.last_publish = now
+        self.published += 1
+        return True
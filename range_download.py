@@ -0,0 +1,392 @@
+"""
+Range Download
+Tek dosyalı (progressive) HTTP formatları için paralel byte aralığı indirici.
+Boyutu bilinen format URL'si aralıklara bölünür; aralıklar havuzdan alınan
+keep-alive bağlantılarla aynı anda indirilir ve önceden ayrılmış geçici
+dosyaya os.pwrite ile kendi konumlarına yazılır. Hata alan aralığın yalnızca
+kalan kısmı tekrar istenir. Sunucu Range desteklemiyorsa, boyut bilinmiyorsa,
+dosya küçükse veya proxy kullanılıyorsa yt-dlp'nin tek bağlantılı HttpFD'si
+kullanılır. Bağlantı sayısı concurrent_fragment_downloads seçeneğinden alınır.
+"""
+
+import http.client
+import os
+import re
+import ssl
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+from yt_dlp import YoutubeDL
+from yt_dlp.dependencies import certifi
+from yt_dlp.downloader import get_suitable_downloader
+from yt_dlp.downloader.common import FileDownloader
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.networking.exceptions import TransportError
+
+# Bağlantıdan tek seferde okunan blok (byte)
+BLOCK_SIZE = 256 * 1024
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# Hata alan aralık için bekleme: 0.5, 1, 2... en fazla 8 saniye
+RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 8.0
+CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+)')
+
+
+class RangeError(TransportError):
+    """A range request failed (yt-dlp reports it like any network error)"""
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections reused across ranges and files"""
+
+    def __init__(self, timeout=20, verify=True, max_idle=16, idle_seconds=30):
+        self.timeout = timeout
+        self.verify = verify
+        self.max_idle = max_idle
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._idle = {}  # (scheme, host, port) -> [(bağlantı, bırakıldığı zaman)]
+        self._ssl_context = None
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def key(url):
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        return parts.scheme, parts.hostname, port
+
+    def _context(self):
+        if self._ssl_context is None:
+            context = ssl.create_default_context(cafile=certifi.where() if certifi else None)
+            if not self.verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            self._ssl_context = context
+        return self._ssl_context
+
+    def acquire(self, key):
+        now = time.monotonic()
+        expired = []
+        conn = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                candidate, released = idle.pop()
+                if now - released <= self.idle_seconds:
+                    conn = candidate
+                    self.reused += 1
+                    break
+                expired.append(candidate)
+            if conn is None:
+                self.created += 1
+        for old in expired:
+            old.close()
+        if conn is not None:
+            return conn
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._context())
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def release(self, key, conn):
+        """Return a connection whose last response was read to the end"""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn, _ in connections:
+                conn.close()
+
+
+class ByteRange:
+    """One byte range of the file; position moves forward as blocks are written"""
+
+    __slots__ = ('index', 'position', 'end', 'failures')
+
+    def __init__(self, index, start, end):
+        self.index = index
+        self.position = start
+        self.end = end  # Dahil
+        self.failures = 0
+
+
+class RangeTransfer:
+    """Shared state of one parallel download: file, pending ranges and counters"""
+
+    def __init__(self, fd, url, headers, total, ranges, tmpfilename, filename, info_dict):
+        self.fd = fd
+        self.url = url
+        self.key = ConnectionPool.key(url)
+        parts = urlsplit(url)
+        self.path = parts.path + (f'?{parts.query}' if parts.query else '') or '/'
+        self.headers = headers
+        self.total = total
+        self.ranges = ranges
+        self.pending = list(reversed(ranges))
+        self.tmpfilename = tmpfilename
+        self.filename = filename
+        self.info_dict = info_dict
+        self.lock = threading.Lock()
+        self.hook_lock = threading.Lock()
+        self.stop = threading.Event()
+        self.error = None
+        self.downloaded = 0
+        self.ranges_done = 0
+        self.retries = 0
+        self.start_time = time.time()
+
+    def next_range(self):
+        with self.lock:
+            return self.pending.pop() if self.pending else None
+
+    def fail(self, error):
+        """First error wins; every worker stops at its next block"""
+        with self.lock:
+            if self.error is None:
+                self.error = error
+        self.stop.set()
+
+
+class RangeFD(FileDownloader):
+    """Parallel byte-range downloader for single-file HTTP formats"""
+
+    @classmethod
+    def FD_NAME(cls):
+        return 'range'
+
+    def __init__(self, ydl, params, pool=None):
+        super().__init__(ydl, params)
+        settings = params.get('range_download') or {}
+        self.min_size = int(settings.get('min_size', 0))
+        self.chunk_size = max(BLOCK_SIZE, int(settings.get('chunk_size', 4 * 1024 * 1024)))
+        self.range_retries = int(settings.get('retries', 5))
+        self.pool = pool or ConnectionPool(timeout=float(settings.get('timeout', 20)),
+                                           verify=not params.get('nocheckcertificate'))
+
+    def _headers(self, info_dict):
+        headers = {name: value for name, value in (info_dict.get('http_headers') or {}).items()
+                   if name.lower() not in ('accept-encoding', 'connection', 'range')}
+        # Byte konumları sıkıştırılmamış içeriğe göre olmalı
+        headers['Accept-Encoding'] = 'identity'
+        if 'Cookie' not in headers:
+            cookie = self.ydl.cookiejar.get_cookie_header(info_dict['url'])
+            if cookie:
+                headers['Cookie'] = cookie
+        return headers
+
+    def _probe(self, url, headers):
+        """(final url, total size) from a one-byte range request; size is None without Range support"""
+        for _ in range(MAX_REDIRECTS + 1):
+            key = ConnectionPool.key(url)
+            parts = urlsplit(url)
+            conn = self.pool.acquire(key)
+            try:
+                conn.request('GET', parts.path + (f'?{parts.query}' if parts.query else '') or '/',
+                             headers={**headers, 'Range': 'bytes=0-0'})
+                response = conn.getresponse()
+                location = response.getheader('Location')
+                if response.status == 206:
+                    response.read()
+                    self.pool.release(key, conn)
+                    match = CONTENT_RANGE.match(response.getheader('Content-Range') or '')
+                    return url, int(match.group(3)) if match else None
+            except BaseException:
+                conn.close()
+                raise
+            # Yanıtın gövdesi (ör. Range'i yok sayan sunucuda tüm dosya) okunmaz
+            conn.close()
+            if response.status in REDIRECT_STATUSES and location:
+                url = urljoin(url, location)
+                continue
+            return url, None
+        return url, None
+
+    def _fallback(self, filename, info_dict):
+        fd = HttpFD(self.ydl, self.params)
+        for ph in self._progress_hooks:
+            if ph != self.report_progress:
+                fd.add_progress_hook(ph)
+        return fd.real_download(filename, info_dict)
+
+    def real_download(self, filename, info_dict):
+        url = info_dict['url']
+        headers = self._headers(info_dict)
+        total = None
+        if (not self.params.get('proxy') and hasattr(os, 'pwrite')
+                and urlsplit(url).scheme in ('http', 'https')):
+            try:
+                url, total = self._probe(url, headers)
+            except (OSError, http.client.HTTPException) as err:
+                self.write_debug(f'Range probe failed, using single connection: {err}')
+        if not total or total < self.min_size:
+            return self._fallback(filename, info_dict)
+
+        connections = max(1, int(self.params.get('concurrent_fragment_downloads') or 1))
+        # Aralık sayısı bağlantı sayısının katı olsun ki son aralıklar tek bağlantıda kalmasın
+        count = -(-total // self.chunk_size)
+        count = -(-count // connections) * connections
+        chunk = max(BLOCK_SIZE, -(-total // count))
+        ranges = [ByteRange(index, start, min(start + chunk, total) - 1)
+                  for index, start in enumerate(range(0, total, chunk), 1)]
+        connections = min(connections, len(ranges))
+
+        tmpfilename = self.temp_name(filename)
+        self.report_destination(filename)
+        fd = os.open(tmpfilename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            try:
+                os.posix_fallocate(fd, 0, total)
+            except (AttributeError, OSError):
+                os.ftruncate(fd, total)
+            transfer = RangeTransfer(fd, url, headers, total, ranges, tmpfilename, filename, info_dict)
+            self.write_debug(f'Downloading {total} bytes in {len(ranges)} ranges over {connections} connections')
+            workers = [threading.Thread(target=self._worker, args=(transfer,), daemon=True,
+                                        name=f'range-{index}') for index in range(connections)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            os.close(fd)
+
+        if transfer.error is not None:
+            # Önceden ayrılmış dosyada boşluklar olabilir; HttpFD buradan devam edemez
+            self.try_remove(tmpfilename)
+            raise transfer.error
+
+        self.write_debug(f'Range download finished: {transfer.retries} range retries, '
+                         f'{self.pool.reused} reused connections')
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            'downloaded_bytes': total,
+            'total_bytes': total,
+            'filename': filename,
+            'status': 'finished',
+            'elapsed': time.time() - transfer.start_time,
+            'ctx_id': info_dict.get('ctx_id'),
+        }, info_dict)
+        return True
+
+    def _worker(self, transfer):
+        conn = None
+        try:
+            while not transfer.stop.is_set():
+                part = transfer.next_range()
+                if part is None:
+                    break
+                while not transfer.stop.is_set():
+                    if conn is None:
+                        conn = self.pool.acquire(transfer.key)
+                    try:
+                        complete = self._fetch(transfer, conn, part)
+                    except (OSError, http.client.HTTPException, RangeError) as err:
+                        conn.close()
+                        conn = None
+                        if transfer.stop.is_set():
+                            break
+                        part.failures += 1
+                        with transfer.lock:
+                            transfer.retries += 1
+                        if part.failures > self.range_retries:
+                            transfer.fail(err if isinstance(err, RangeError) else RangeError(str(err), cause=err))
+                            break
+                        # Yalnızca aralığın kalan kısmı tekrar istenir
+                        self.report_retry(err, part.failures, self.range_retries, frag_index=part.index, fatal=False)
+                        transfer.stop.wait(min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** (part.failures - 1)))
+                        continue
+                    if not complete:
+                        # Okunmamış yanıt gövdesi kaldı - bağlantı tekrar kullanılamaz
+                        conn.close()
+                        conn = None
+                    break
+        except Exception as err:
+            # Hook'lardan gelen hatalar (ör. iptal) indirmeyi durdurur
+            transfer.fail(err)
+        finally:
+            if conn is not None:
+                if transfer.stop.is_set():
+                    conn.close()
+                else:
+                    self.pool.release(transfer.key, conn)
+
+    def _fetch(self, transfer, conn, part):
+        """Download the rest of one range; False if the transfer was stopped midway"""
+        conn.request('GET', transfer.path, headers={**transfer.headers,
+                                                    'Range': f'bytes={part.position}-{part.end}'})
+        response = conn.getresponse()
+        if response.status != 206:
+            raise RangeError(f'HTTP Error {response.status}: {response.reason}')
+        match = CONTENT_RANGE.match(response.getheader('Content-Range') or '')
+        if not match or int(match.group(1)) != part.position or int(match.group(3)) != transfer.total:
+            raise RangeError(f'Unexpected Content-Range: {response.getheader("Content-Range")}')
+        while part.position <= part.end:
+            if transfer.stop.is_set():
+                return False
+            block = response.read(min(BLOCK_SIZE, part.end - part.position + 1))
+            if not block:
+                raise RangeError(f'Connection closed at byte {part.position} of range {part.index}')
+            os.pwrite(transfer.fd, block, part.position)
+            part.position += len(block)
+            self._progress(transfer, len(block), part.position > part.end)
+        return True
+
+    def _progress(self, transfer, amount, range_finished):
+        # Hook'lar (bant genişliği beklemesi dahil) sırayla çağrılır
+        with transfer.hook_lock:
+            transfer.downloaded += amount
+            if range_finished:
+                transfer.ranges_done += 1
+            now = time.time()
+            speed = self.calc_speed(transfer.start_time, now, transfer.downloaded)
+            self._hook_progress({
+                'status': 'downloading',
+                'downloaded_bytes': transfer.downloaded,
+                'total_bytes': transfer.total,
+                'tmpfilename': transfer.tmpfilename,
+                'filename': transfer.filename,
+                'eta': self.calc_eta(speed, transfer.total - transfer.downloaded),
+                'speed': speed,
+                'elapsed': now - transfer.start_time,
+                'fragment_index': transfer.ranges_done,
+                'fragment_count': len(transfer.ranges),
+                'ctx_id': transfer.info_dict.get('ctx_id'),
+            }, transfer.info_dict)
+
+
+class RangeYoutubeDL(YoutubeDL):
+    """YoutubeDL that downloads single-file HTTP formats with RangeFD"""
+
+    def __init__(self, params=None, *args, **kwargs):
+        super().__init__(params, *args, **kwargs)
+        settings = self.params.get('range_download') or {}
+        # Video ve ses dosyaları aynı bağlantıları kullanır
+        self.range_pool = ConnectionPool(timeout=float(settings.get('timeout', 20)),
+                                         verify=not self.params.get('nocheckcertificate'))
+
+    def dl(self, name, info, subtitle=False, test=False):
+        if (test or subtitle or name == '-' or not info.get('url')
+                or get_suitable_downloader(info, self.params) is not HttpFD):
+            return super().dl(name, info, subtitle=subtitle, test=test)
+
+        fd = RangeFD(self, self.params, pool=self.range_pool)
+        for ph in self._progress_hooks:
+            fd.add_progress_hook(ph)
+        self.write_debug(f'Invoking {fd.FD_NAME} downloader on "{info["url"]}"')
+        new_info = self._copy_infodict(info)
+        if new_info.get('http_headers') is None:
+            new_info['http_headers'] = self._calc_headers(new_info)
+        return fd.download(name, new_info, subtitle)
+
+    def close(self):
+        super().close()
+        self.range_pool.close()
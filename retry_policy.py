@@ -0,0 +1,121 @@
+"""
+Retry Policy
+Başarısız indirmelerin tekrar denenip denenmeyeceğine karar verir.
+Hatalar mesaj ve türlerine göre sınıflandırılır: kalıcı hatalar (özel,
+kaldırılmış, bölge kısıtlı videolar...) hemen sonuçlanır; geçici hatalar
+(429, 5xx, ağ) üstel bekleme ve jitter ile iş kuyruğuna tekrar alınır.
+Sınıf başına deneme sayıları metrik olarak tutulur.
+"""
+
+import random
+import re
+import threading
+
+from yt_dlp.utils import GeoRestrictedError, UnsupportedError
+
+# (sınıf, mesajda aranan parçalar) - ilk eşleşen kullanılır, sıra önemlidir
+PERMANENT_ERRORS = (
+    ('private', ('private video', "granted access to this video")),
+    ('geo_blocked', ('not available in your country', 'geo restricted', 'geo-restricted',
+                     'not made this video available in your country')),
+    ('age_restricted', ('confirm your age', 'age-restricted', 'age restricted')),
+    ('members_only', ('members-only', 'join this channel')),
+    ('removed', ('video unavailable', 'has been removed', 'no longer available',
+                 'account associated with this video has been terminated', 'copyright')),
+    ('live', ('live event will begin', 'premieres in')),
+    ('unsupported', ('unsupported url', 'is not a valid url', 'incomplete youtube id')),
+    ('format_unavailable', ('requested format is not available',)),
+    ('disk_full', ('no space left on device',)),
+)
+RETRYABLE_ERRORS = (
+    ('bot_check', ("confirm you're not a bot", 'confirm you’re not a bot')),
+    ('rate_limited', ('http error 429', 'too many requests')),
+    ('server_error', ('http error 500', 'http error 502', 'http error 503', 'http error 504')),
+    ('expired_url', ('http error 403',)),
+    ('network', ('timed out', 'timeout', 'connection reset', 'connection refused', 'connection aborted',
+                 'remote end closed', 'incomplete read', 'temporary failure in name resolution',
+                 'name or service not known', 'network is unreachable', 'eof occurred', '[ssl')),
+)
+HTTP_STATUS = re.compile(r'http error (\d{3})')
+
+
+def classify_error(error):
+    """(error class, retryable) for an exception raised by a download attempt"""
+    if isinstance(error, GeoRestrictedError):
+        return 'geo_blocked', False
+    if isinstance(error, UnsupportedError):
+        return 'unsupported', False
+
+    message = str(error).lower()
+    for name, needles in PERMANENT_ERRORS:
+        if any(needle in message for needle in needles):
+            return name, False
+    for name, needles in RETRYABLE_ERRORS:
+        if any(needle in message for needle in needles):
+            return name, True
+
+    match = HTTP_STATUS.search(message)
+    if match:
+        status = int(match.group(1))
+        if status >= 500:
+            return 'server_error', True
+        if status in (404, 410):
+            return 'removed', False
+        if 400 <= status < 500:
+            return 'client_error', False
+    # Bilinmeyen hatalar eskisi gibi tekrar denenir
+    return 'unknown', True
+
+
+class RetryPolicy:
+    """Attempt limit and exponential backoff with jitter"""
+
+    def __init__(self, max_attempts=3, base_delay=2.0, max_delay=120.0, jitter=0.5):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.jitter = min(1.0, max(0.0, float(jitter)))  # Gecikmenin rastgele kısaltılabilen oranı
+
+    def should_retry(self, retryable, attempts):
+        """attempts: download attempts made so far, including the failed one"""
+        return retryable and attempts < self.max_attempts
+
+    def delay(self, attempts):
+        """Seconds to wait before the next attempt"""
+        delay = min(self.max_delay, self.base_delay * (2 ** max(0, attempts - 1)))
+        # Aynı anda hata alan işler aynı anda tekrar denemesin
+        return delay * (1 - self.jitter * random.random())
+
+
+class RetryMetrics:
+    """Per-class counters of failed attempts and their outcome"""
+
+    FIELDS = ('errors', 'retried', 'recovered', 'exhausted', 'permanent')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._classes = {}
+
+    def _count(self, error_class, field):
+        with self._lock:
+            counters = self._classes.setdefault(error_class, dict.fromkeys(self.FIELDS, 0))
+            counters[field] += 1
+
+    def record_retry(self, error_class):
+        self._count(error_class, 'errors')
+        self._count(error_class, 'retried')
+
+    def record_failure(self, error_class, retryable):
+        """Final failure: retries ran out (retryable) or the error was permanent"""
+        self._count(error_class, 'errors')
+        self._count(error_class, 'exhausted' if retryable else 'permanent')
+
+    def record_recovered(self, error_class):
+        """A job succeeded after a retry caused by this error class"""
+        self._count(error_class, 'recovered')
+
+    def stats(self):
+        with self._lock:
+            classes = {name: dict(counters) for name, counters in self._classes.items()}
+        totals = {field: sum(counters[field] for counters in classes.values()) for field in self.FIELDS}
+        return {'totals': totals, 'classes': classes}
@@ -0,0 +1,142 @@
+"""
+Shared State
+Çoklu worker (prefork) modunda her sürecin koordinasyonu.
+Worker'lar ortak SQLite kaydında canlılık sinyali bırakır, başka bir
+worker'ın kendi işleri için bıraktığı istekleri (iptal, silme...) uygular
+ve sonlanmış worker'ların işlerini atomik olarak sahiplenip devam ettirir.
+Ortak kuyruktaki (sahipsiz) işler, boş slotu olan worker tarafından alınır.
+"""
+
+import atexit
+import os
+import socket
+import threading
+import time
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def worker_download_limit(total, workers, slot=None):
+    """This worker's share of the global download limit
+
+    Each worker gets total // workers; the remainder goes to the lowest slots
+    (gunicorn.conf.py hands out WORKER_SLOT). Without a slot the remainder is
+    left unused so the workers never exceed `total` together.
+    """
+    share, remainder = divmod(total, workers)
+    if slot is not None and slot < remainder:
+        share += 1
+    # total < workers: toplu indirmeler worker'da kaldığı için her worker yine bir indirme çalıştırır
+    return max(1, share)
+
+
+class WorkerCoordinator:
+    """Heartbeat, cross-worker requests and orphan takeover for one worker process"""
+
+    def __init__(self, store, owner, on_action, on_adopt, interval=1.0, stale_after=45.0,
+                 on_claim=None, capacity=None):
+        self.store = store
+        self.owner = owner
+        self.on_action = on_action  # (target, action) -> None
+        self.on_adopt = on_adopt  # [iş kaydı dict] -> None
+        self.on_claim = on_claim  # Ortak kuyruktan alınan [iş kaydı dict] -> None
+        self.capacity = capacity  # () -> şu an başlatılabilecek iş sayısı
+        self.interval = interval
+        # Heartbeat yazımı kilitli veritabanında busy timeout kadar bekleyebilir; bu sırada
+        # canlı bir worker ölü sayılıp işleri devralınmasın diye eşik bunun açıkça üstünde tutulur
+        self.min_stale_after = store.busy_timeout + 2 * interval
+        self.stale_after = max(stale_after, self.min_stale_after)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._last_adopt = 0.0
+        self.actions_applied = 0
+        self.adopted = 0
+        self.claimed = 0
+
+    def start(self):
+        """Register the worker, adopt orphaned jobs and start the background loop"""
+        if self._thread is not None:
+            return 0
+        self.store.heartbeat(self.owner)
+        adopted = self.adopt_orphans()
+        self.claim_queued()
+        self._thread = threading.Thread(target=self._loop, name='worker-coordinator', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return adopted
+
+    def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        try:
+            self.store.flush()
+            self.store.retire(self.owner)
+        except Exception as e:
+            print(f"Worker kaydı kapatılamadı: {str(e)}")
+
+    def adopt_orphans(self):
+        rows = self.store.claim_orphans(self.owner, self.stale_after)
+        self._last_adopt = time.monotonic()
+        if rows:
+            self.adopted += len(rows)
+            self.on_adopt(rows)
+        return len(rows)
+
+    def claim_queued(self):
+        """Take as many jobs from the shared queue as this worker can start now"""
+        if self.on_claim is None:
+            return 0
+        rows = self.store.claim_queued(self.owner, self.capacity())
+        if rows:
+            self.claimed += len(rows)
+            self.on_claim(rows)
+        return len(rows)
+
+    def wake(self):
+        """Check the shared queue without waiting for the next heartbeat (new job or freed slot)"""
+        self._wake.set()
+
+    def apply_actions(self):
+        actions = self.store.take_actions(self.owner)
+        for target, action in actions:
+            try:
+                self.on_action(target, action)
+            except Exception as e:
+                print(f"Worker isteği uygulanamadı ({action} {target}): {str(e)}")
+        self.actions_applied += len(actions)
+        return len(actions)
+
+    def _loop(self):
+        last_beat = time.monotonic()
+        while not self._stop.is_set():
+            woken = self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                if not woken or time.monotonic() - last_beat >= self.interval:
+                    last_beat = time.monotonic()
+                    self.store.heartbeat(self.owner)
+                    if time.monotonic() - self._last_adopt >= self.stale_after:
+                        self.adopt_orphans()
+                    self.apply_actions()
+                self.claim_queued()
+            except Exception as e:
+                print(f"Worker koordinasyon hatası: {str(e)}")
+
+    def stats(self):
+        return {
+            'worker_id': self.owner,
+            'live_workers': len(self.store.live_owners(self.stale_after)),
+            'adopted_jobs': self.adopted,
+            'claimed_jobs': self.claimed,
+            'shared_queue': self.store.shared_queue_length(),
+            'actions_applied': self.actions_applied,
+            'heartbeat_interval': self.interval,
+            'stale_after': self.stale_after
+        }
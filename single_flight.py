@@ -0,0 +1,88 @@
+"""
+Single-Flight Download Coalescing
+Aynı (video, format, kalite, klasör) için gelen eşzamanlı istekler tek bir
+indirmeye bağlanır. Sonradan gelen istekler çalışan işin ilerlemesini paylaşır,
+iş bittikten sonra gelenler ise hazır dosyayı kullanır.
+"""
+
+import threading
+
+
+class DownloadCoalescer:
+    """Tracks in-flight leader jobs, their followers and finished artifacts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> leader job
+        self._followers = {}  # leader download_id -> [follower jobs]
+        self._artifacts = {}  # key -> completed leader job
+        self._artifact_keys = {}  # leader download_id -> {key} (kayıttan silinince temizlemek için)
+        self.leaders = 0
+        self.coalesced = 0
+        self.reused = 0
+
+    def attach(self, key, job, artifact_valid=None):
+        """Register a job; returns ('leader' | 'follower' | 'artifact', leader job)"""
+        with self._lock:
+            leader = self._inflight.get(key)
+            if leader is not None and leader is not job:
+                self._followers.setdefault(leader.download_id, []).append(job)
+                self.coalesced += 1
+                return 'follower', leader
+
+            artifact = self._artifacts.get(key)
+            if artifact is not None:
+                if artifact_valid is None or artifact_valid(artifact):
+                    self.reused += 1
+                    return 'artifact', artifact
+                self._drop_artifact(key)
+
+            self._inflight[key] = job
+            self.leaders += 1
+            return 'leader', job
+
+    def detach(self, job, leader_id):
+        """Stop following a leader (e.g. the follower was cancelled)"""
+        with self._lock:
+            followers = self._followers.get(leader_id)
+            if followers and job in followers:
+                followers.remove(job)
+                return True
+        return False
+
+    def finish(self, key, leader, success):
+        """Leader is done; returns the followers that were waiting on it"""
+        with self._lock:
+            if self._inflight.get(key) is leader:
+                del self._inflight[key]
+            followers = self._followers.pop(leader.download_id, [])
+            if success:
+                self._drop_artifact(key)
+                self._artifacts[key] = leader
+                self._artifact_keys.setdefault(leader.download_id, set()).add(key)
+        return followers
+
+    def forget_artifact(self, leader_id):
+        """Drop finished-artifact entries that point at a removed leader"""
+        with self._lock:
+            for key in self._artifact_keys.pop(leader_id, ()):
+                del self._artifacts[key]
+
+    def _drop_artifact(self, key):
+        artifact = self._artifacts.pop(key, None)
+        if artifact is not None:
+            keys = self._artifact_keys.get(artifact.download_id)
+            keys.discard(key)
+            if not keys:
+                del self._artifact_keys[artifact.download_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'inflight': len(self._inflight),
+                'followers': sum(len(f) for f in self._followers.values()),
+                'artifacts': len(self._artifacts),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'reused': self.reused
+            }
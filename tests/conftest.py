@@ -0,0 +1,104 @@
+"""
+Ortak test yardımcıları: sahte saat, worker'ı tutan engelli görevler,
+Range destekleyen yerel HTTP sunucusu, geçici JobStore ve api_server test istemcisi.
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from job_store import JobStore
+from range_server import RangeServer
+
+# api_server içe aktarılırken kalıcı kayıt ve disk cache'i açılmasın
+os.environ['JOB_STORE_DB'] = ''
+os.environ['VIDEO_CACHE_DB'] = ''
+
+WAIT = 5.0  # Beklenen olaylar için üst süre (saniye)
+RANGE_FILE_SIZE = 2 * 1024 * 1024
+
+
+def wait_until(condition, timeout=WAIT):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('koşul zamanında sağlanmadı')
+        time.sleep(0.005)
+
+
+def start_download(client, output_path, video_id='ddddddddddd'):
+    """Start an MP4 download through the API and return its job"""
+    import api_server
+
+    response = client.post('/api/download/mp4', json={
+        'video_url': f'https://www.youtube.com/watch?v={video_id}', 'output_path': str(output_path)
+    })
+    assert response.status_code == 200
+    return api_server.job_registry.get(response.get_json()['download_id'])
+
+
+class FakeClock:
+    """Manually advanced replacement for time.time"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class Gate:
+    """Task that blocks its worker until released"""
+
+    def __init__(self, name, log=None, result=True):
+        self.name = name
+        self.log = log
+        self.result = result
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def __call__(self):
+        if self.log is not None:
+            self.log.append(self.name)
+        self.started.set()
+        self.released.wait(WAIT)
+        return self.result
+
+    def release(self):
+        self.released.set()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def range_server():
+    server = RangeServer(os.urandom(RANGE_FILE_SIZE)).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'), flush_interval=60)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def api_client():
+    """Flask test client; jobs are cleared before and after the test"""
+    # İçe aktarma ortam değişkenleri ayarlandıktan sonra, yalnızca gereken testlerde
+    import api_server
+
+    api_server.clear_jobs(include_active=True)
+    yield api_server.app.test_client()
+    api_server.clear_jobs(include_active=True)
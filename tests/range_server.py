@@ -0,0 +1,96 @@
+"""
+Range destekleyen yerel HTTP sunucusu (range_download testleri ve benchmark'ı için).
+Her bağlantı ayrı ayrı hız sınırına tabi tutulabilir (tek bağlantıyı kısan CDN gibi);
+istenirse bazı aralık yanıtları ortasında kesilir, Range başlığı yok sayılır veya
+206 yanıtı Content-Range olmadan gönderilir.
+"""
+
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RANGE = re.compile(r'bytes=(\d+)-(\d*)')
+WRITE_BLOCK = 16 * 1024
+
+
+class RangeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, data, per_connection_rate=None):
+        super().__init__(('127.0.0.1', 0), RangeHandler)
+        self.data = data
+        self.per_connection_rate = per_connection_rate  # byte/s, None: sınırsız
+        self.lock = threading.Lock()
+        self.drops_left = 0  # Ortasında kesilecek aralık isteği sayısı
+        self.ignore_range = False  # Range başlığına rağmen 200 ile tüm dosya
+        self.omit_content_range = False  # 206 yanıtında Content-Range yok
+        self.requests = []  # (bağlantı portu, istenen aralık)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/video.mp4'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def take_requests(self):
+        with self.lock:
+            requests, self.requests = self.requests, []
+        return requests
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(len(self.server.data)))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+
+    def do_GET(self):
+        data = self.server.data
+        match = None if self.server.ignore_range else RANGE.match(self.headers.get('Range') or '')
+        start, end = 0, len(data) - 1
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else end, end)
+        with self.server.lock:
+            self.server.requests.append((self.client_address[1], self.headers.get('Range')))
+            drop = bool(match) and end - start > WRITE_BLOCK and self.server.drops_left > 0
+            if drop:
+                self.server.drops_left -= 1
+
+        self.send_response(206 if match else 200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        if match and not self.server.omit_content_range:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+        self.end_headers()
+
+        # Bağlantı başına hız sınırı
+        rate = self.server.per_connection_rate
+        began = time.monotonic()
+        sent = 0
+        position = start
+        while position <= end:
+            if drop and sent >= (end - start + 1) // 2:
+                self.close_connection = True
+                return
+            block = data[position:min(position + WRITE_BLOCK, end + 1)]
+            try:
+                self.wfile.write(block)
+            except OSError:
+                return
+            position += len(block)
+            sent += len(block)
+            delay = sent / rate - (time.monotonic() - began) if rate else 0
+            if delay > 0:
+                time.sleep(delay)
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+import pytest
+from starlette.testclient import TestClient
+
+import api_server
+import asgi_server
+from progress_events import AsyncSubscription, EventStream, ProgressBroker
+
+
+@pytest.fixture
+def client():
+    with TestClient(asgi_server.app) as client:
+        yield client
+
+
+def test_search_without_usable_entries(client, monkeypatch):
+    # Boş future listesi asyncio.wait'e verilmez
+    monkeypatch.setattr(asgi_server, 'search_youtube_page', lambda query, page, limit: ([None], False, False))
+    response = client.get('/api/search?q=nothing')
+    assert response.status_code == 200
+    assert response.json()['total_results'] == 0
+
+
+def test_shared_mode_job_lookup_runs_off_the_loop(client, monkeypatch):
+    threads = []
+
+    def find_job(download_id):
+        threads.append(threading.current_thread().name)
+        return None
+
+    monkeypatch.setattr(api_server, 'shared_state', True)
+    monkeypatch.setattr(asgi_server, 'find_job', find_job)
+    assert client.get('/api/events/remote-job').status_code == 404
+    assert threads and threads[0].startswith('extract')
+
+
+def test_async_stream_takes_snapshots_in_executor():
+    threads = []
+
+    def snapshot(download_id):
+        threads.append(threading.current_thread().name)
+        return {'download_id': download_id, 'status': 'completed'}, ()
+
+    async def collect():
+        broker = ProgressBroker()
+        subscription = broker.subscribe(['job'], AsyncSubscription(asyncio.get_running_loop()))
+        stream = EventStream(broker, subscription, ['job'], snapshot, executor=asgi_server.extract_executor)
+        return [chunk async for chunk in stream], broker.stats()['subscribers']
+
+    chunks, subscribers = asyncio.run(collect())
+    assert chunks[-1].startswith('event: end')
+    assert subscribers == 0
+    assert threads == [threads[0]] and threads[0].startswith('extract')
@@ -0,0 +1,71 @@
+import pytest
+
+from bandwidth import MIN_RATE, BandwidthShaper, TokenBucket
+
+
+def allocations(*shares):
+    return [share.allocated for share in shares]
+
+
+def test_token_bucket_refills_at_rate_up_to_its_burst():
+    bucket = TokenBucket(None, burst_seconds=1.0)
+    bucket.set_rate(1000, now=100.0)
+
+    # Yarım saniyede 500 token birikir
+    assert bucket.reserve(500, 100.5) == 0.0
+    # Borca giren tüketici borcu kapanana kadar bekler
+    assert bucket.reserve(500, 100.5) == pytest.approx(0.5)
+    # Uzun beklemede birikim burst kapasitesini aşmaz
+    bucket.reserve(0, 110.0)
+    assert bucket.tokens == pytest.approx(bucket.capacity) == 1000
+    assert bucket.reserve(1500, 110.0) == pytest.approx(0.5)
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(None)
+    assert bucket.reserve(10 ** 9, 100.0) == 0.0
+
+
+def test_small_demands_are_met_and_the_rest_split_evenly():
+    shaper = BandwidthShaper(global_limit=1_000_000)
+    capped = shaper.register('capped', rate_limit=100_000)
+    first = shaper.register('first')
+    second = shaper.register('second')
+
+    assert allocations(capped, first, second) == [100_000, 450_000, 450_000]
+    assert [share.bucket.rate for share in (capped, first, second)] == [100_000, 450_000, 450_000]
+
+    # Biten işin payı diğerlerine kalır
+    shaper.unregister(capped)
+    assert allocations(first, second) == [500_000, 500_000]
+
+
+def test_slow_source_leaves_its_share_to_the_others():
+    shaper = BandwidthShaper(global_limit=1_000_000, rebalance_interval=1.0)
+    capped = shaper.register('capped', rate_limit=100_000)
+    slow = shaper.register('slow')
+    fast = shaper.register('fast')
+
+    now = slow.started + 10
+    # Payının çok altında kalan iş ölçülen hızının biraz üstünü alır
+    slow.meter.rate = 50_000
+    slow.meter.window_start = now
+    with shaper._lock:
+        shaper._rebalance(now)
+
+    assert allocations(capped, slow, fast) == [100_000, 62_500, 837_500]
+
+
+def test_per_job_limit_without_global_limit():
+    shaper = BandwidthShaper(per_job_limit=200_000)
+    default = shaper.register('default')
+    own = shaper.register('own', rate_limit=50_000)
+
+    assert allocations(default, own) == [200_000, 50_000]
+
+
+def test_allocation_never_drops_below_the_minimum_rate():
+    shaper = BandwidthShaper(global_limit=2 * MIN_RATE)
+    shares = [shaper.register(f'job-{index}') for index in range(4)]
+
+    assert allocations(*shares) == [MIN_RATE] * 4
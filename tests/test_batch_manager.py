@@ -0,0 +1,56 @@
+import threading
+
+import api_server
+from batch_manager import BatchManager, FailedEntry
+from conftest import WAIT
+from job_registry import DownloadJob
+
+
+def test_failed_collection_does_not_stop_the_batch():
+    enqueued = []
+    done = threading.Event()
+
+    def enqueue(job):
+        enqueued.append(job.video_url)
+        job.status = 'completed'
+        if len(enqueued) == 2:
+            done.set()
+
+    manager = BatchManager(
+        create_child=lambda batch, url: DownloadJob(url, url, 'mp4', 'best', ''),
+        enqueue_child=enqueue, cancel_child=lambda job: None
+    )
+    entries = iter(['a', FailedEntry('https://youtube.com/playlist?list=x', 'Girdiler alınamadı: 404'), 'b'])
+    batch = manager.create('batch', entries, {}, max_concurrency=1, max_items=10)
+
+    assert done.wait(WAIT)
+    manager._executor.shutdown(wait=True)
+    summary = batch.summary()
+    assert enqueued == ['a', 'b']
+    assert summary['status'] == 'completed'
+    assert summary['total_items'] == 2
+    assert summary['failed_entries'] == [
+        {'url': 'https://youtube.com/playlist?list=x', 'error': 'Girdiler alınamadı: 404'}
+    ]
+    assert 'error' not in summary
+
+
+def test_batch_entries_continue_after_a_collection_fails(monkeypatch):
+    def entries(url):
+        if 'broken' in url:
+            yield {'id': 'aaaaaaaaaaa'}
+            raise RuntimeError('sayfa alınamadı')
+        yield {'id': 'bbbbbbbbbbb'}
+
+    monkeypatch.setattr(api_server, 'iter_playlist_entries', entries)
+    result = list(api_server.iter_batch_entries([
+        'https://www.youtube.com/playlist?list=broken',
+        'https://www.youtube.com/watch?v=ccccccccccc',
+        'https://www.youtube.com/playlist?list=fine',
+    ]))
+
+    assert result[0] == 'https://www.youtube.com/watch?v=aaaaaaaaaaa'
+    assert isinstance(result[1], FailedEntry)
+    assert result[1].url == 'https://www.youtube.com/playlist?list=broken'
+    assert 'sayfa alınamadı' in result[1].error
+    assert result[2:] == ['https://www.youtube.com/watch?v=ccccccccccc', 'https://www.youtube.com/watch?v=bbbbbbbbbbb']
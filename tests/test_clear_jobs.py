@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+import api_server
+from conftest import WAIT, start_download, wait_until
+from job_registry import DownloadJob
+
+
+class BlockingYDL:
+    """Reports progress until the download is cancelled through its hooks"""
+
+    started = []
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def download(self, urls):
+        BlockingYDL.started.append(urls[0])
+        deadline = time.monotonic() + WAIT
+        while time.monotonic() < deadline:
+            for hook in self.opts['progress_hooks']:
+                hook({'status': 'downloading', 'downloaded_bytes': 10, 'total_bytes': 100})
+            time.sleep(0.01)
+        raise AssertionError('indirme iptal edilmedi')
+
+
+@pytest.fixture
+def client(monkeypatch, api_client):
+    BlockingYDL.started = []
+    monkeypatch.setattr(api_server.yt_dlp, 'YoutubeDL', BlockingYDL)
+    return api_client
+
+
+def test_clear_keeps_active_jobs(client, tmp_path):
+    job = start_download(client, tmp_path, 'aaaaaaaaaaa')
+    wait_until(lambda: job.status == 'downloading')
+
+    assert client.post('/api/clear').get_json()['removed_downloads'] == 0
+    assert api_server.job_registry.get(job.download_id) is job
+    assert job.status == 'downloading'
+
+
+def test_clear_all_cancels_running_and_shared_jobs(client, tmp_path):
+    leader = start_download(client, tmp_path, 'bbbbbbbbbbb')
+    follower = start_download(client, tmp_path, 'bbbbbbbbbbb')
+    assert follower.shared_with == leader.download_id
+    wait_until(lambda: leader.status == 'downloading')
+
+    response = client.post('/api/clear/all').get_json()
+    assert response['removed_downloads'] == 2
+    assert len(api_server.job_registry) == 0
+    assert leader.status == 'cancelled'
+    assert follower.status == 'cancelled'
+
+    # Lider durduğunda takipçi ayrı bir indirme olarak başlatılmaz
+    wait_until(lambda: api_server.cancellations.stats()['running'] == 0)
+    # Lider kaydını iptal sonrası temizlik sırasında bırakır
+    wait_until(lambda: api_server.download_coalescer.stats()['inflight'] == 0)
+    assert BlockingYDL.started == ['https://www.youtube.com/watch?v=bbbbbbbbbbb']
+    assert api_server.download_coalescer.stats()['followers'] == 0
+
+
+def test_clear_all_finishes_batches(client, tmp_path):
+    response = client.post('/api/download/batch', json={
+        'urls': [f'https://youtu.be/c{i:010d}' for i in range(6)],
+        'concurrency': 2, 'output_path': str(tmp_path)
+    }).get_json()
+    batch = api_server.batch_manager.get(response['batch_id'])
+    wait_until(lambda: len(batch.active) == 2)
+
+    client.post('/api/clear/all')
+    wait_until(lambda: batch.end_time is not None)
+    assert batch.status == 'cancelled'
+    assert not batch.active
+    assert len(batch.children) == 2
+    assert all(job.status == 'cancelled' for job in batch.children)
+
+
+def test_removed_jobs_drop_their_artifacts(client, tmp_path):
+    coalescer = api_server.download_coalescer
+    jobs = []
+    for video_id in ('ddddddddddd', 'eeeeeeeeeee'):
+        job = DownloadJob(video_id, f'https://youtu.be/{video_id}', 'mp4', 'best', str(tmp_path))
+        api_server.job_registry.add(job)
+        coalescer.attach(api_server.coalesce_key(job), job)
+        coalescer.finish(api_server.coalesce_key(job), job, True)
+        api_server.job_registry.update_job(job, status='completed')
+        jobs.append(job)
+    assert coalescer.stats()['artifacts'] == 2
+
+    # Janitor ve /api/clear kayıtları toplu siler
+    api_server.job_registry.remove_many([jobs[0].download_id])
+    assert coalescer.stats()['artifacts'] == 1
+    client.post('/api/clear')
+    assert coalescer.stats()['artifacts'] == 0
+
+
+@pytest.mark.parametrize('query', ['offset=abc', 'limit=', 'limit=1.5'])
+def test_list_downloads_rejects_bad_paging(client, query):
+    response = client.get(f'/api/downloads?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
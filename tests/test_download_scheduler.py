@@ -0,0 +1,315 @@
+import time
+
+import pytest
+
+from conftest import WAIT, Gate, wait_until
+from download_scheduler import DownloadScheduler
+
+LANES = {
+    'interactive': {'reserved': 1},
+    'single': {'reserved': 1},
+    'bulk': {'limit': 2},
+}
+
+
+def running(scheduler, lane=None):
+    stats = scheduler.stats()
+    return stats['lanes'][lane]['running'] if lane else stats['running']
+
+
+def settle(scheduler):
+    """Give idle workers a chance to pick up anything they are allowed to start"""
+    time.sleep(0.05)
+    with scheduler._cond:
+        scheduler._cond.notify_all()
+    time.sleep(0.05)
+
+
+def poke(scheduler):
+    with scheduler._cond:
+        scheduler._cond.notify_all()
+
+
+@pytest.fixture
+def scheduler(clock):
+    return DownloadScheduler(max_workers=4, name='test', lanes=LANES, clock=clock)
+
+
+def test_reserved_slots_exceeding_workers_are_rejected():
+    with pytest.raises(ValueError):
+        DownloadScheduler(max_workers=2, lanes={'a': {'reserved': 2}, 'b': {'reserved': 1}})
+
+
+def test_lane_limit_caps_running_jobs(scheduler):
+    gates = [Gate(f'bulk-{i}') for i in range(4)]
+    for gate in gates:
+        scheduler.submit(gate.name, gate, lane='bulk')
+
+    wait_until(lambda: running(scheduler, 'bulk') == 2)
+    settle(scheduler)
+    assert running(scheduler, 'bulk') == 2
+    assert scheduler.stats()['lanes']['bulk']['queued'] == 2
+    # Kuyruktaki işler sınıf içinde FIFO sırasıyla başlar
+    assert [g.started.is_set() for g in gates] == [True, True, False, False]
+
+    for gate in gates:
+        gate.release()
+    wait_until(lambda: scheduler.stats()['completed'] == 4)
+
+
+def test_bulk_cannot_take_reserved_slots(clock):
+    scheduler = DownloadScheduler(max_workers=4, lanes={
+        'interactive': {'reserved': 1}, 'single': {'reserved': 1}, 'bulk': {}
+    }, clock=clock)
+    bulk = [Gate(f'bulk-{i}') for i in range(4)]
+    for gate in bulk:
+        scheduler.submit(gate.name, gate, lane='bulk')
+
+    # 4 worker'dan 2'si ayrılmış; bulk sadece 2 ortak slotu kullanabilir
+    wait_until(lambda: running(scheduler, 'bulk') == 2)
+    settle(scheduler)
+    assert running(scheduler, 'bulk') == 2
+
+    search, single = Gate('search'), Gate('single')
+    scheduler.submit('search', search, lane='interactive')
+    scheduler.submit('single', single, lane='single')
+    assert search.started.wait(WAIT)
+    assert single.started.wait(WAIT)
+    assert running(scheduler) == 4
+
+    for gate in bulk + [search, single]:
+        gate.release()
+    wait_until(lambda: scheduler.stats()['completed'] == 6)
+
+
+def test_reserved_lane_beyond_reservation_needs_shared_slot(scheduler):
+    singles = [Gate(f'single-{i}') for i in range(4)]
+    for gate in singles:
+        scheduler.submit(gate.name, gate, lane='single')
+
+    # 1 ayrılmış + 2 ortak slot; interactive'in slotu boş kalır
+    wait_until(lambda: running(scheduler, 'single') == 3)
+    settle(scheduler)
+    assert running(scheduler, 'single') == 3
+
+    search = Gate('search')
+    scheduler.submit('search', search, lane='interactive')
+    assert search.started.wait(WAIT)
+
+    for gate in singles + [search]:
+        gate.release()
+    wait_until(lambda: scheduler.stats()['completed'] == 5)
+
+
+def test_freed_shared_slot_goes_to_higher_priority_lane(clock):
+    log = []
+    scheduler = DownloadScheduler(max_workers=1, lanes={'single': {}, 'bulk': {}}, clock=clock)
+    blocker = Gate('blocker', log)
+    scheduler.submit('blocker', blocker, lane='bulk')
+    assert blocker.started.wait(WAIT)
+
+    # bulk işi önce kuyruğa girse de single sınıfı önceliklidir
+    later = [Gate('bulk-1', log), Gate('single-1', log), Gate('single-2', log)]
+    scheduler.submit('bulk-1', later[0], lane='bulk')
+    scheduler.submit('single-1', later[1], lane='single')
+    scheduler.submit('single-2', later[2], lane='single')
+    assert scheduler.queue_position('single-1') == 1
+    assert scheduler.queue_position('single-2') == 2
+    assert scheduler.queue_position('bulk-1') == 3
+
+    for gate in later:
+        gate.release()
+    blocker.release()
+    wait_until(lambda: scheduler.stats()['completed'] == 4)
+    assert log == ['blocker', 'single-1', 'single-2', 'bulk-1']
+
+
+def test_remove_drops_queued_job(clock):
+    scheduler = DownloadScheduler(max_workers=1, clock=clock)
+    blocker, queued = Gate('blocker'), Gate('queued')
+    scheduler.submit('blocker', blocker)
+    assert blocker.started.wait(WAIT)
+    scheduler.submit('queued', queued)
+    assert scheduler.is_queued('queued')
+
+    assert scheduler.remove('queued') is True
+    assert scheduler.remove('queued') is False
+    assert not scheduler.is_queued('queued')
+    blocker.release()
+    wait_until(lambda: scheduler.stats()['completed'] == 1)
+    settle(scheduler)
+    assert not queued.started.is_set()
+
+
+def test_wait_times_use_scheduler_clock(clock):
+    scheduler = DownloadScheduler(max_workers=1, clock=clock)
+    blocker, queued = Gate('blocker'), Gate('queued')
+    scheduler.submit('blocker', blocker)
+    assert blocker.started.wait(WAIT)
+    scheduler.submit('queued', queued)
+    clock.advance(30)
+    assert scheduler.stats()['lanes']['default']['oldest_wait_seconds'] == 30
+
+    blocker.release()
+    assert queued.started.wait(WAIT)
+    queued.release()
+    wait_until(lambda: scheduler.stats()['completed'] == 2)
+    lane = scheduler.stats()['lanes']['default']
+    assert lane['p95_wait_seconds'] == 30
+    # EWMA: ilk örnek 0, ikincisi 30
+    assert lane['avg_wait_seconds'] == pytest.approx(0.2 * 30)
+
+
+def test_estimate_start_uses_average_duration(clock):
+    scheduler = DownloadScheduler(max_workers=1, clock=clock)
+    first = Gate('first')
+    scheduler.submit('first', first)
+    assert first.started.wait(WAIT)
+    clock.advance(20)
+    first.release()
+    wait_until(lambda: scheduler.stats()['completed'] == 1)
+
+    blocker, queued = Gate('blocker'), Gate('queued')
+    scheduler.submit('blocker', blocker)
+    assert blocker.started.wait(WAIT)
+    scheduler.submit('queued', queued)
+    # Çalışan iş 20 sn sürer (ortalama), kuyruktaki ondan sonra başlar
+    assert scheduler.estimate_start('queued') == pytest.approx(clock() + 20)
+    blocker.release()
+    queued.release()
+    wait_until(lambda: scheduler.stats()['completed'] == 3)
+
+
+def test_delayed_job_waits_for_its_time_without_holding_a_worker(clock):
+    scheduler = DownloadScheduler(max_workers=1, clock=clock)
+    retry = Gate('retry')
+    scheduler.submit_after(10, 'retry', retry)
+    assert scheduler.is_queued('retry')
+    assert scheduler.ready_at('retry') == clock() + 10
+    assert scheduler.stats()['delayed'] == 1
+
+    # Bekleme sırasında tek worker başka işleri çalıştırabilir
+    other = Gate('other')
+    other.release()
+    scheduler.submit('other', other)
+    wait_until(lambda: scheduler.stats()['completed'] == 1)
+    assert not retry.started.is_set()
+
+    clock.advance(9.5)
+    poke(scheduler)
+    settle(scheduler)
+    assert not retry.started.is_set()
+
+    clock.advance(0.5)
+    poke(scheduler)
+    assert retry.started.wait(WAIT)
+    assert scheduler.ready_at('retry') is None
+    assert scheduler.stats()['delayed'] == 0
+    retry.release()
+    wait_until(lambda: scheduler.stats()['completed'] == 2)
+
+
+def test_delayed_jobs_are_promoted_in_ready_order(clock):
+    log = []
+    scheduler = DownloadScheduler(max_workers=1, clock=clock)
+    late, early = Gate('late', log), Gate('early', log)
+    late.release()
+    early.release()
+    scheduler.submit_after(20, 'late', late)
+    scheduler.submit_after(5, 'early', early)
+
+    clock.advance(30)
+    poke(scheduler)
+    wait_until(lambda: scheduler.stats()['completed'] == 2)
+    assert log == ['early', 'late']
+
+
+def test_removed_delayed_job_never_runs(clock):
+    scheduler = DownloadScheduler(max_workers=1, clock=clock)
+    retry = Gate('retry')
+    scheduler.submit_after(5, 'retry', retry)
+    assert scheduler.remove('retry') is True
+    assert not scheduler.is_queued('retry')
+
+    clock.advance(10)
+    poke(scheduler)
+    settle(scheduler)
+    assert not retry.started.is_set()
+    assert scheduler.stats()['delayed'] == 0
+
+
+def test_delayed_job_joins_its_own_lane(clock):
+    scheduler = DownloadScheduler(max_workers=2, lanes={'single': {}, 'bulk': {'limit': 1}}, clock=clock)
+    blocker = Gate('blocker')
+    scheduler.submit('blocker', blocker, lane='bulk')
+    assert blocker.started.wait(WAIT)
+
+    retry = Gate('retry')
+    scheduler.submit_after(1, 'retry', retry, lane='bulk')
+    clock.advance(1)
+    poke(scheduler)
+    settle(scheduler)
+    # bulk sınırı dolu - zamanı gelen iş kendi sınıfında bekler
+    assert not retry.started.is_set()
+    assert scheduler.lane_of('retry') == 'bulk'
+
+    blocker.release()
+    assert retry.started.wait(WAIT)
+    retry.release()
+    wait_until(lambda: scheduler.stats()['completed'] == 2)
+
+
+def test_failed_jobs_are_counted_per_lane(clock):
+    scheduler = DownloadScheduler(max_workers=1, lanes={'single': {}}, clock=clock)
+    failing = Gate('failing', result=False)
+    failing.release()
+    scheduler.submit('failing', failing, lane='single')
+    wait_until(lambda: scheduler.stats()['failed'] == 1)
+    assert scheduler.stats()['lanes']['single']['failed'] == 1
+    assert scheduler.stats()['lanes']['single']['completed'] == 0
+
+
+def test_retry_started_before_previous_attempt_finishes(clock):
+    scheduler = DownloadScheduler(max_workers=2, lanes={'single': {}}, clock=clock)
+    second = Gate('job')
+    handed_over = Gate('handover')
+
+    def first_attempt():
+        # Tekrar deneme, önceki deneme worker'ı bırakmadan aynı ID ile başlar
+        scheduler.submit('job', second, lane='single')
+        second.started.wait(WAIT)
+        handed_over()
+        return False
+
+    scheduler.submit('job', first_attempt, lane='single')
+    assert second.started.wait(WAIT)
+    assert running(scheduler, 'single') == 2
+    handed_over.release()
+    wait_until(lambda: scheduler.stats()['failed'] == 1)
+
+    # Biten deneme yeni denemenin kaydını silmez
+    assert running(scheduler, 'single') == 1
+    assert scheduler.lane_of('job') == 'single'
+    second.release()
+    wait_until(lambda: running(scheduler, 'single') == 0)
+    assert scheduler.lane_of('job') is None
+
+
+def test_free_slots_follow_reserved_and_shared_capacity(clock):
+    scheduler = DownloadScheduler(max_workers=3, lanes={'single': {'reserved': 1}, 'bulk': {'limit': 2}}, clock=clock)
+    assert scheduler.free_slots('single') == 3
+
+    gates = [Gate(f'bulk-{i}') for i in range(2)]
+    for gate in gates:
+        scheduler.submit(gate.name, gate, lane='bulk')
+    wait_until(lambda: running(scheduler, 'bulk') == 2)
+    # Ortak slotlar dolu, yalnızca ayrılmış slot kalır
+    assert scheduler.free_slots('single') == 1
+    assert scheduler.free_slots('bulk') == 0
+
+    freed = []
+    scheduler.on_slot_free = freed.append
+    gates[0].release()
+    wait_until(lambda: freed == ['bulk'])
+    assert scheduler.free_slots('single') == 2
+    gates[1].release()
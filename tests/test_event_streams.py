@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+import api_server
+from job_registry import DownloadJob
+
+
+@pytest.fixture
+def client(monkeypatch, api_client):
+    monkeypatch.setattr(api_server, 'MAX_THREAD_EVENT_STREAMS', 2)
+    monkeypatch.setattr(api_server, 'thread_event_streams', threading.BoundedSemaphore(2))
+    # Kuyrukta bekleyen iş: akış kendiliğinden bitmez
+    api_server.job_registry.add(DownloadJob('events-job', 'https://example.com/v', 'mp4', 'best', '/tmp'))
+    return api_client
+
+
+def open_stream(client):
+    response = client.get('/api/events/events-job', buffered=False)
+    if response.status_code == 200:
+        assert next(response.response).startswith(b'retry:')
+    return response
+
+
+def test_streams_above_thread_cap_get_503(client):
+    first, second = open_stream(client), open_stream(client)
+    assert (first.status_code, second.status_code) == (200, 200)
+
+    rejected = open_stream(client)
+    assert rejected.status_code == 503
+    assert rejected.headers['Retry-After'] == '5'
+
+    # Kapanan bağlantı yerini yeni bir aboneye bırakır
+    first.close()
+    third = open_stream(client)
+    assert third.status_code == 200
+    second.close()
+    third.close()
+    assert api_server.thread_event_streams._value == 2
+
+
+def test_broker_rejection_releases_thread_slot(client, monkeypatch):
+    monkeypatch.setattr(api_server.progress_broker, 'subscribe', lambda ids: None)
+    assert open_stream(client).status_code == 503
+    assert api_server.thread_event_streams._value == 2
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+import api_server
+from job_registry import DownloadJob
+
+SIZE = 1000
+
+
+@pytest.fixture
+def artifact(api_client, tmp_path):
+    """Completed job whose file is served by /api/file/<id>"""
+    data = os.urandom(SIZE)
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(data)
+    job = DownloadJob('file-job', 'https://example.com/v', 'mp4', 'best', str(tmp_path))
+    job.status = 'completed'
+    job.output_files = [str(path)]
+    api_server.job_registry.add(job)
+    return api_client, data
+
+
+def get(client, **headers):
+    return client.get('/api/file/file-job', headers=headers)
+
+
+def test_full_response(artifact):
+    client, data = artifact
+    response = get(client)
+
+    assert response.status_code == 200
+    assert response.data == data
+    assert response.headers['Content-Length'] == str(SIZE)
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Content-Type'] == 'video/mp4'
+    assert 'Content-Range' not in response.headers
+    assert response.headers['ETag']
+
+
+def test_satisfiable_range(artifact):
+    client, data = artifact
+    response = get(client, Range='bytes=100-199')
+
+    assert response.status_code == 206
+    assert response.data == data[100:200]
+    assert response.headers['Content-Range'] == f'bytes 100-199/{SIZE}'
+    assert response.headers['Content-Length'] == '100'
+
+
+def test_open_ended_range(artifact):
+    client, data = artifact
+    response = get(client, Range='bytes=900-')
+
+    assert response.status_code == 206
+    assert response.data == data[900:]
+    assert response.headers['Content-Range'] == f'bytes 900-{SIZE - 1}/{SIZE}'
+
+
+def test_unsatisfiable_range(artifact):
+    client, _ = artifact
+    response = get(client, Range=f'bytes={SIZE}-')
+
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{SIZE}'
+    assert response.data == b''
+
+
+def test_if_range_mismatch_returns_the_whole_file(artifact):
+    client, data = artifact
+    etag = get(client).headers['ETag']
+
+    # Dosya değiştiyse (farklı ETag) kısmi yanıt yerine dosyanın tamamı gönderilir
+    response = get(client, Range='bytes=0-99', **{'If-Range': '"stale-etag"'})
+    assert response.status_code == 200
+    assert response.data == data
+    assert 'Content-Range' not in response.headers
+
+    response = get(client, Range='bytes=0-99', **{'If-Range': etag})
+    assert response.status_code == 206
+    assert response.data == data[:100]
+
+
+def test_matching_etag_is_not_modified(artifact):
+    client, _ = artifact
+    etag = get(client).headers['ETag']
+
+    response = get(client, **{'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
@@ -0,0 +1,72 @@
+from fragment_tuner import FragmentTuner
+
+
+def start(tuner, download_id, source='youtube'):
+    opts = {}
+    job = tuner.start(download_id, source, opts)
+    assert opts['concurrent_fragment_downloads'] == job.connections
+    return job
+
+
+def fragmented_file(tuner, job, filename):
+    """Report one fragmented file from start to finish"""
+    hook = tuner.hook(job)
+    hook({'status': 'downloading', 'filename': filename, 'fragment_index': 1, 'fragment_count': 10,
+          'downloaded_bytes': 100})
+    hook({'status': 'finished', 'filename': filename, 'downloaded_bytes': 1000})
+
+
+def in_use(tuner):
+    return tuner.stats()['connections_in_use']
+
+
+def test_jobs_share_the_budget_fairly():
+    tuner = FragmentTuner(connection_budget=8, max_per_job=4, initial=4)
+    jobs = [start(tuner, f'job-{index}') for index in range(2)]
+
+    assert [job.connections for job in jobs] == [4, 4]
+    assert in_use(tuner) == 8
+
+
+def test_minimum_connection_can_exceed_the_budget():
+    tuner = FragmentTuner(connection_budget=8, max_per_job=4, initial=4)
+    first = start(tuner, 'first')
+    start(tuner, 'second')
+    # Bütçe dolu olsa da yeni iş tek bağlantıyla başlar
+    third = start(tuner, 'third')
+
+    assert third.connections == 1
+    assert in_use(tuner) == 9
+
+    # Sonraki dosyada adil paya (8 // 3) inilir, aşım kapanır
+    fragmented_file(tuner, first, 'video.mp4')
+    assert first.connections == 2
+    assert in_use(tuner) == 7
+    fragmented_file(tuner, third, 'video.mp4')
+    assert third.connections == 2
+    assert in_use(tuner) <= tuner.connection_budget
+
+
+def test_freed_connections_go_to_the_next_file():
+    tuner = FragmentTuner(connection_budget=8, max_per_job=8, initial=8)
+    first = start(tuner, 'first')
+    second = start(tuner, 'second')
+    assert (first.connections, second.connections) == (8, 1)
+
+    tuner.finish(first)
+    fragmented_file(tuner, second, 'video.mp4')
+    assert second.connections == 8
+    assert in_use(tuner) == 8
+
+
+def test_single_connection_file_releases_its_grant():
+    tuner = FragmentTuner(connection_budget=8, max_per_job=8, initial=8)
+    plain, fragmented = start(tuner, 'plain'), start(tuner, 'fragmented')
+    assert (plain.connections, fragmented.connections) == (8, 1)
+
+    # Parçasız dosya tek bağlantı kullanır ve adil paydan hariç tutulur
+    tuner.hook(plain)({'status': 'downloading', 'filename': 'audio.m4a', 'downloaded_bytes': 10})
+    assert plain.connections == 1
+    fragmented_file(tuner, fragmented, 'video.mp4')
+    assert fragmented.connections == 7
+    assert in_use(tuner) == 8
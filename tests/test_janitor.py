@@ -0,0 +1,109 @@
+import os
+
+from janitor import DISK_BATCH_SIZE, Janitor
+from job_registry import DownloadJob, JobRegistry
+
+
+def completed_jobs(registry, count, tmp_path=None, size=0):
+    files = {}
+    for index in range(count):
+        job = DownloadJob(f'job-{index:03d}', 'url', 'mp4', 'best', str(tmp_path or ''))
+        registry.add(job)
+        registry.update_job(job, status='completed', end_time=1000.0 + index)
+        if tmp_path is not None:
+            path = tmp_path / f'{job.download_id}.mp4'
+            path.write_bytes(b'x' * size)
+            files[job.download_id] = [str(path)]
+    return files
+
+
+def janitor(registry, files, usage, **policy):
+    policy = dict({'ttl_seconds': {'completed': None, 'error': None, 'cancelled': None},
+                   'max_history': None}, **policy)
+    jan = Janitor(registry, '/', policy=policy, job_files=lambda job: files.get(job.download_id, []))
+    jan._disk_usage = usage
+    return jan
+
+
+def test_disk_watermark_deletes_oldest_until_low_watermark(tmp_path):
+    registry = JobRegistry()
+    files = completed_jobs(registry, 100, tmp_path, size=10)
+    # Her silinen grup kullanımı 0.05 düşürür
+    state = {'usage': 0.95}
+
+    def usage():
+        freed = sum(1 for paths in files.values() for path in paths if not os.path.exists(path))
+        return state['usage'] - 0.05 * (freed // DISK_BATCH_SIZE)
+
+    report = janitor(registry, files, usage).run()
+    assert report['by_reason'] == {'disk_watermark': 3 * DISK_BATCH_SIZE}
+    assert report['bytes_reclaimed'] == 3 * DISK_BATCH_SIZE * 10
+    assert 'disk_watermark_stopped' not in report
+    # En eski işler silinir
+    assert registry.get('job-000') is None
+    assert registry.get(f'job-{3 * DISK_BATCH_SIZE:03d}') is not None
+
+
+def test_disk_watermark_stops_when_a_batch_frees_nothing():
+    registry = JobRegistry()
+    # Dosyası olmayan işler (ör. paylaşılan indirmenin takipçileri)
+    completed_jobs(registry, 100)
+
+    report = janitor(registry, {}, lambda: 0.99).run()
+    assert report['records_removed'] == DISK_BATCH_SIZE
+    assert report['disk_watermark_stopped'] == 'nothing_freed'
+    assert registry.count('completed') == 100 - DISK_BATCH_SIZE
+
+
+def test_disk_watermark_is_capped_per_run(tmp_path):
+    registry = JobRegistry()
+    files = completed_jobs(registry, 100, tmp_path, size=1)
+
+    # Dosyalar silinse de disk başka sebeple dolu kalıyor
+    report = janitor(registry, files, lambda: 0.99, disk_max_batches=2).run()
+    assert report['records_removed'] == 2 * DISK_BATCH_SIZE
+    assert report['disk_watermark_stopped'] == 'max_batches'
+    assert registry.count('completed') == 100 - 2 * DISK_BATCH_SIZE
+
+
+def test_below_high_watermark_nothing_is_deleted():
+    registry = JobRegistry()
+    completed_jobs(registry, 10)
+    report = janitor(registry, {}, lambda: 0.85).run()
+    assert report['records_removed'] == 0
+
+
+def test_records_only_mode_deletes_one_batch(tmp_path):
+    registry = JobRegistry()
+    files = completed_jobs(registry, 50, tmp_path, size=1)
+    report = janitor(registry, files, lambda: 0.99, delete_files=False).run()
+    assert report['records_removed'] == DISK_BATCH_SIZE
+    assert report['disk_watermark_stopped'] == 'nothing_freed'
+
+
+def test_unsharded_jobs_have_no_directory_to_remove(monkeypatch, tmp_path):
+    import api_server
+
+    job = DownloadJob('job-dirs', 'url', 'mp4', 'best', str(tmp_path))
+    assert api_server.job_output_dirs(job) == [api_server.sharded_output_dir(str(tmp_path), 'job-dirs')]
+    # İş klasörü yoksa ortak indirme klasörü boş kalsa bile silinmez
+    monkeypatch.setattr(api_server, 'shard_output_dirs', False)
+    assert api_server.job_output_dirs(job) == []
+
+
+def test_ttl_expires_restored_jobs_out_of_start_order():
+    registry = JobRegistry()
+    now = 10000.0
+    jobs = []
+    # Kayıt başlangıç sırasıyla döner; uzun süren ilk iş en son biter
+    for index, end_time in enumerate((now - 10, now - 500, now - 400)):
+        job = DownloadJob(f'restored-{index}', 'url', 'mp4', 'best', '')
+        job.status = 'completed'
+        job.start_time = now - 1000 + index
+        job.end_time = end_time
+        jobs.append(job)
+    registry.restore(jobs)
+
+    jan = janitor(registry, {}, lambda: None, ttl_seconds={'completed': 100, 'error': None, 'cancelled': None})
+    assert [job.download_id for job in jan._expired(now)] == ['restored-1', 'restored-2']
+    assert [job.download_id for job in registry.list('completed')] == ['restored-1', 'restored-2', 'restored-0']
@@ -0,0 +1,49 @@
+import threading
+
+from job_registry import DownloadJob, JobRegistry
+
+
+class InterleavingLock:
+    """Job lock that runs another update right after the first release"""
+
+    def __init__(self, interleave):
+        self._lock = threading.Lock()
+        self.interleave = interleave
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+        interleave, self.interleave = self.interleave, None
+        if interleave is not None:
+            thread = threading.Thread(target=interleave)
+            thread.start()
+            # Düzeltilmiş kayıtta diğer güncelleme registry kilidinde bekler
+            thread.join(timeout=0.2)
+            self.thread = thread
+
+
+def indexed_statuses(registry, job):
+    return [status for status in registry.counts() if job in registry.list(status)]
+
+
+def test_concurrent_status_updates_keep_one_index_entry():
+    registry = JobRegistry()
+    job = registry.add(DownloadJob('job', 'url', 'mp4', 'best', ''))
+    job._lock = InterleavingLock(lambda: registry.update_job(job, status='downloading'))
+
+    registry.update_job(job, status='starting')
+    job._lock.thread.join()
+
+    assert job.status == 'downloading'
+    assert indexed_statuses(registry, job) == ['downloading']
+
+
+def test_update_after_remove_does_not_reindex():
+    registry = JobRegistry()
+    job = registry.add(DownloadJob('gone', 'url', 'mp4', 'best', ''))
+    registry.remove('gone')
+
+    registry.update_job(job, status='completed')
+    assert registry.counts() == {}
@@ -0,0 +1,56 @@
+import sqlite3
+
+from job_registry import DownloadJob
+from job_store import JobStore
+
+
+def make_job(download_id='job-1'):
+    job = DownloadJob(download_id, 'https://example.com/v', 'mp4', 'best', '/tmp')
+    job.status = 'downloading'
+    job.speed = 2.5 * 1024 * 1024
+    return job
+
+
+def test_speed_is_stored_as_number_and_formatted_on_output(store):
+    store.mark_dirty(make_job())
+    store.flush()
+
+    (kind, value), = store._conn.execute('SELECT typeof(speed), speed FROM jobs').fetchall()
+    assert (kind, value) == ('real', 2.5 * 1024 * 1024)
+
+    # Başka bir worker'ın veya yeniden başlatmanın gördüğü iş hızını korur
+    restored = DownloadJob.from_dict(store.get('job-1'))
+    assert restored.speed == 2.5 * 1024 * 1024
+    assert restored.to_dict()['speed'] == '2.5 MB/s'
+
+
+def test_retry_state_survives_a_restart(store):
+    job = make_job()
+    job.status = 'retrying'
+    job.attempts = 2
+    job.retry_at = 1234.5
+    job.error_class = 'rate_limited'
+    store.mark_dirty(job)
+    store.flush()
+
+    restored = DownloadJob.from_dict(store.get('job-1'))
+    assert (restored.status, restored.attempts, restored.retry_at, restored.error_class) == (
+        'retrying', 2, 1234.5, 'rate_limited')
+
+
+def test_legacy_text_speed_column(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE jobs (download_id TEXT PRIMARY KEY, speed TEXT, updated_at REAL)')
+    conn.execute("INSERT INTO jobs VALUES ('old', '1.0 MB/s', 0)")
+    conn.commit()
+    conn.close()
+
+    store = JobStore(path, flush_interval=60)
+    try:
+        store.mark_dirty(make_job('new'))
+        store.flush()
+        assert store.get('old')['speed'] == 0.0
+        assert store.get('new')['speed'] == 2.5 * 1024 * 1024
+    finally:
+        store.close()
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import re
+import threading
+
+import pytest
+
+import range_download
+from cancellation import DownloadCancelled
+from range_download import BLOCK_SIZE, RangeFD, RangeYoutubeDL
+
+CONNECTIONS = 4
+OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'noprogress': True,
+    'concurrent_fragment_downloads': CONNECTIONS,
+    'range_download': {'min_size': 1024 * 1024, 'chunk_size': BLOCK_SIZE, 'retries': 3, 'timeout': 5},
+}
+
+
+@pytest.fixture(autouse=True)
+def quick_retries(monkeypatch):
+    monkeypatch.setattr(range_download, 'RETRY_DELAY', 0.01)
+
+
+@pytest.fixture
+def fallbacks(monkeypatch):
+    """Files handed to HttpFD instead of parallel ranges"""
+    calls = []
+    original = RangeFD._fallback
+
+    def fallback(self, filename, info_dict):
+        calls.append(filename)
+        return original(self, filename, info_dict)
+
+    monkeypatch.setattr(RangeFD, '_fallback', fallback)
+    return calls
+
+
+def download(server, directory, **opts):
+    options = {**OPTS, 'outtmpl': os.path.join(directory, 'video.%(ext)s'), **opts}
+    with RangeYoutubeDL(options) as ydl:
+        ydl.download([server.url])
+    with open(os.path.join(directory, 'video.mp4'), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def ranges(requests):
+    """(start, end) of the range requests other than the probe"""
+    spans = []
+    for _, header in requests:
+        match = re.fullmatch(r'bytes=(\d+)-(\d+)', header or '')
+        if match and header != 'bytes=0-0':
+            spans.append((int(match.group(1)), int(match.group(2))))
+    return sorted(spans)
+
+
+def test_parallel_ranges_reassemble_the_file(range_server, tmp_path, fallbacks):
+    digest = download(range_server, str(tmp_path))
+
+    assert digest == hashlib.sha256(range_server.data).hexdigest()
+    assert os.listdir(tmp_path) == ['video.mp4']
+    assert not fallbacks
+    requests = range_server.take_requests()
+    # Boyut tek byte'lık bir aralık isteğiyle öğrenilir
+    assert [header for _, header in requests].count('bytes=0-0') == 1
+    spans = ranges(requests)
+    size = len(range_server.data)
+    assert len(spans) == size // BLOCK_SIZE
+    assert spans[0][0] == 0 and spans[-1][1] == size - 1
+    assert all(end + 1 == next_start for (_, end), (next_start, _) in zip(spans, spans[1:]))
+
+
+def test_preallocated_file_is_filled_with_pwrite(range_server, tmp_path, monkeypatch):
+    allocated = []
+    writes = []
+    real_fallocate, real_pwrite = os.posix_fallocate, os.pwrite
+
+    def fallocate(fd, offset, length):
+        allocated.append((offset, length))
+        return real_fallocate(fd, offset, length)
+
+    def pwrite(fd, data, offset):
+        writes.append((offset, len(data), threading.current_thread().name))
+        return real_pwrite(fd, data, offset)
+
+    monkeypatch.setattr(os, 'posix_fallocate', fallocate)
+    monkeypatch.setattr(os, 'pwrite', pwrite)
+    download(range_server, str(tmp_path))
+
+    size = len(range_server.data)
+    assert allocated == [(0, size)]
+    # Bloklar kendi konumlarına, üst üste binmeden ve boşluk bırakmadan yazılır
+    covered = 0
+    for offset, length, _ in sorted(writes):
+        assert offset == covered
+        assert length <= BLOCK_SIZE
+        covered += length
+    assert covered == size
+    workers = {name for _, _, name in writes}
+    assert len(workers) == CONNECTIONS and all(name.startswith('range-') for name in workers)
+
+
+def test_dropped_connection_retries_only_the_rest_of_the_range(range_server, tmp_path):
+    range_server.drops_left = 2
+    digest = download(range_server, str(tmp_path))
+
+    assert digest == hashlib.sha256(range_server.data).hexdigest()
+    assert os.listdir(tmp_path) == ['video.mp4']
+    spans = ranges(range_server.take_requests())
+    starts = {start for start, _ in spans if start % BLOCK_SIZE == 0}
+    resumed = [(start, end) for start, end in spans if start % BLOCK_SIZE]
+    # Kesilen iki aralık kaldığı byte'tan, aynı bitişle tekrar istenir
+    assert len(starts) == len(range_server.data) // BLOCK_SIZE
+    assert len(resumed) == 2
+    assert all((end + 1) % BLOCK_SIZE == 0 for _, end in resumed)
+
+
+def test_server_ignoring_range_falls_back_to_single_connection(range_server, tmp_path, fallbacks):
+    range_server.ignore_range = True
+    digest = download(range_server, str(tmp_path))
+
+    assert digest == hashlib.sha256(range_server.data).hexdigest()
+    assert len(fallbacks) == 1
+    assert not ranges(range_server.take_requests())
+
+
+def test_missing_content_range_falls_back_to_single_connection(range_server, tmp_path, fallbacks):
+    range_server.omit_content_range = True
+    digest = download(range_server, str(tmp_path))
+
+    assert digest == hashlib.sha256(range_server.data).hexdigest()
+    assert len(fallbacks) == 1
+    assert not ranges(range_server.take_requests())
+
+
+def test_cancel_from_hook_in_a_range_worker_stops_the_download(range_server, tmp_path):
+    seen = []
+
+    def cancel_midway(d):
+        if d['status'] == 'downloading':
+            seen.append(threading.current_thread().name)
+            if d['downloaded_bytes'] >= len(range_server.data) // 2:
+                raise DownloadCancelled()
+
+    with pytest.raises(DownloadCancelled):
+        download(range_server, str(tmp_path), progress_hooks=[cancel_midway])
+
+    assert seen and all(name.startswith('range-') for name in seen)
+    # Boşluklu ön ayrılmış dosya bırakılmaz
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+from yt_dlp.utils import DownloadError
+
+import api_server
+from conftest import start_download, wait_until
+from retry_policy import RetryMetrics, RetryPolicy
+
+RETRY_DELAY = 0.5
+
+
+class ScriptedYDL:
+    """Each download attempt raises the next scripted error; succeeds when they run out"""
+
+    errors = []
+    attempts = 0
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def download(self, urls):
+        ScriptedYDL.attempts += 1
+        if ScriptedYDL.errors:
+            raise DownloadError(ScriptedYDL.errors.pop(0))
+
+
+@pytest.fixture
+def client(monkeypatch, api_client):
+    ScriptedYDL.errors = []
+    ScriptedYDL.attempts = 0
+    monkeypatch.setattr(api_server.yt_dlp, 'YoutubeDL', ScriptedYDL)
+    monkeypatch.setattr(api_server, 'retry_policy', RetryPolicy(max_attempts=2, base_delay=RETRY_DELAY, jitter=0))
+    monkeypatch.setattr(api_server, 'retry_metrics', RetryMetrics())
+    return api_client
+
+
+def test_transient_error_is_requeued_after_backoff(client, tmp_path):
+    ScriptedYDL.errors = ['ERROR: HTTP Error 503: Service Unavailable']
+    before = time.time()
+    job = start_download(client, tmp_path)
+
+    wait_until(lambda: job.status == 'retrying')
+    assert job.error_class == 'server_error'
+    assert before + RETRY_DELAY <= job.retry_at <= time.time() + RETRY_DELAY
+    # Bekleyen deneme worker tutmaz, zamanlayıcıda gecikmeli olarak durur
+    assert api_server.download_scheduler.ready_at(job.download_id) == pytest.approx(job.retry_at, abs=0.1)
+    status = client.get(f'/api/status/{job.download_id}').get_json()
+    assert status['status'] == 'retrying'
+    assert 'retry_in' in status
+
+    wait_until(lambda: job.status == 'completed')
+    assert job.attempts == 2
+    assert job.retry_at is None
+    assert api_server.retry_metrics.stats()['classes']['server_error']['recovered'] == 1
+
+
+def test_permanent_error_fails_without_retry(client, tmp_path):
+    ScriptedYDL.errors = ['ERROR: [youtube] ddddddddddd: Private video. Sign in if you have been granted access to this video']
+    job = start_download(client, tmp_path)
+
+    wait_until(lambda: job.status == 'error')
+    assert (job.attempts, ScriptedYDL.attempts) == (1, 1)
+    assert job.error_class == 'private'
+    assert job.retry_at is None
+    assert api_server.download_scheduler.ready_at(job.download_id) is None
+    assert api_server.retry_metrics.stats()['classes']['private']['permanent'] == 1
+
+
+def test_transient_error_gives_up_after_max_attempts(client, tmp_path):
+    ScriptedYDL.errors = ['ERROR: HTTP Error 429: Too Many Requests'] * 2
+    job = start_download(client, tmp_path)
+
+    wait_until(lambda: job.status == 'error')
+    assert (job.attempts, ScriptedYDL.attempts) == (2, 2)
+    assert job.error_class == 'rate_limited'
+    counters = api_server.retry_metrics.stats()['classes']['rate_limited']
+    assert (counters['retried'], counters['exhausted']) == (1, 1)
@@ -0,0 +1,63 @@
+import pytest
+from yt_dlp.utils import DownloadError, GeoRestrictedError
+
+from retry_policy import RetryMetrics, RetryPolicy, classify_error
+
+
+@pytest.mark.parametrize('message, expected', [
+    ('ERROR: [youtube] abc: Private video. Sign in if you have been granted access to this video', ('private', False)),
+    ('ERROR: Video unavailable. This video has been removed by the uploader', ('removed', False)),
+    ('ERROR: Sign in to confirm your age', ('age_restricted', False)),
+    ('ERROR: Requested format is not available', ('format_unavailable', False)),
+    ('ERROR: HTTP Error 404: Not Found', ('removed', False)),
+    ('ERROR: HTTP Error 400: Bad Request', ('client_error', False)),
+    ('ERROR: HTTP Error 429: Too Many Requests', ('rate_limited', True)),
+    ('ERROR: HTTP Error 503: Service Unavailable', ('server_error', True)),
+    ('ERROR: HTTP Error 507: Insufficient Storage', ('server_error', True)),
+    ('ERROR: HTTP Error 403: Forbidden', ('expired_url', True)),
+    ('ERROR: <urlopen error [Errno 111] Connection refused>', ('network', True)),
+    ('ERROR: The read operation timed out', ('network', True)),
+    ('something odd happened', ('unknown', True)),
+])
+def test_classify_error_messages(message, expected):
+    assert classify_error(DownloadError(message)) == expected
+
+
+def test_classify_error_types():
+    assert classify_error(GeoRestrictedError('blocked')) == ('geo_blocked', False)
+
+
+def test_should_retry_only_transient_errors_within_attempts():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry(True, 1)
+    assert policy.should_retry(True, 2)
+    assert not policy.should_retry(True, 3)
+    assert not policy.should_retry(False, 1)
+
+
+def test_backoff_doubles_up_to_max_delay():
+    policy = RetryPolicy(base_delay=2, max_delay=10, jitter=0)
+    assert [policy.delay(attempts) for attempts in range(1, 6)] == [2, 4, 8, 10, 10]
+
+
+def test_jitter_only_shortens_the_delay(monkeypatch):
+    policy = RetryPolicy(base_delay=4, jitter=0.5)
+    monkeypatch.setattr('retry_policy.random.random', lambda: 1.0)
+    assert policy.delay(1) == 2
+    monkeypatch.setattr('retry_policy.random.random', lambda: 0.0)
+    assert policy.delay(1) == 4
+
+
+def test_metrics_split_retried_exhausted_and_permanent():
+    metrics = RetryMetrics()
+    metrics.record_retry('server_error')
+    metrics.record_recovered('server_error')
+    metrics.record_retry('network')
+    metrics.record_failure('network', True)
+    metrics.record_failure('private', False)
+
+    stats = metrics.stats()
+    assert stats['classes']['server_error'] == {'errors': 1, 'retried': 1, 'recovered': 1, 'exhausted': 0, 'permanent': 0}
+    assert stats['classes']['network']['exhausted'] == 1
+    assert stats['classes']['private']['permanent'] == 1
+    assert stats['totals']['errors'] == 4
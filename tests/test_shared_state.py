@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from job_registry import DownloadJob
+from job_store import JobStore
+from shared_state import WorkerCoordinator, worker_download_limit
+
+
+@pytest.mark.parametrize('total, workers', [(10, 4), (5, 5), (7, 2), (16, 4)])
+def test_slots_split_the_limit_without_oversubscribing(total, workers):
+    shares = [worker_download_limit(total, workers, slot) for slot in range(workers)]
+    assert sum(shares) == total
+    assert max(shares) - min(shares) <= 1
+
+
+def test_unknown_slot_leaves_remainder_unused():
+    assert worker_download_limit(10, 4) == 2
+    assert worker_download_limit(10, 4) * 4 <= 10
+
+
+def test_fewer_downloads_than_workers_still_runs_one_each():
+    assert [worker_download_limit(3, 4, slot) for slot in range(4)] == [1, 1, 1, 1]
+
+
+def coordinator(store, stale_after=45, **kwargs):
+    return WorkerCoordinator(store, 'host:1', on_action=None, on_adopt=None, interval=1.0,
+                             stale_after=stale_after, **kwargs)
+
+
+def queued_job(download_id, start_time, owner=None, status='queued'):
+    job = DownloadJob(download_id, 'https://example.com/v', 'mp4', 'best', '/tmp')
+    job.start_time = start_time
+    job.owner = owner
+    job.status = status
+    return job
+
+
+def test_stale_threshold_outlasts_busy_timeout(store):
+    # Kilit bekleyen canlı bir worker ölü sayılmamalı
+    assert coordinator(store, 15).stale_after > store.busy_timeout + 1.0
+    assert coordinator(store, 120).stale_after == 120
+
+
+def test_shared_queue_is_claimed_oldest_first(store):
+    for index in range(3):
+        store.publish_queued(queued_job(f'job-{index}', 100 + index, owner='host:1'))
+    # Yayınlanan iş hiçbir worker'a ait değildir
+    assert store.get('job-0')['owner'] is None
+    assert [store.queue_position(f'job-{index}') for index in range(3)] == [1, 2, 3]
+
+    claimed = store.claim_queued('host:2', 2)
+    assert [row['download_id'] for row in claimed] == ['job-0', 'job-1']
+    assert all(row['owner'] == 'host:2' for row in claimed)
+    assert store.queue_position('job-0') is None
+    assert store.queue_position('job-2') == 1
+    assert store.shared_queue_length() == 1
+
+
+def test_concurrent_workers_never_claim_the_same_job(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    stores = [JobStore(path, flush_interval=60) for _ in range(4)]
+    try:
+        for index in range(40):
+            stores[0].publish_queued(queued_job(f'job-{index:02d}', 100 + index))
+        claimed = {}
+
+        def worker(store, owner):
+            rows = []
+            while True:
+                batch = store.claim_queued(owner, 3)
+                if not batch:
+                    break
+                rows.extend(row['download_id'] for row in batch)
+            claimed[owner] = rows
+
+        threads = [threading.Thread(target=worker, args=(store, f'host:{i}')) for i, store in enumerate(stores)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        every = [download_id for rows in claimed.values() for download_id in rows]
+        assert sorted(every) == [f'job-{index:02d}' for index in range(40)]
+    finally:
+        for store in stores:
+            store.close()
+
+
+def test_orphan_takeover_leaves_the_shared_queue_alone(store):
+    store.publish_queued(queued_job('shared', 100))
+    store.mark_dirty(queued_job('dead-queued', 101, owner='dead:1'))
+    store.mark_dirty(queued_job('dead-running', 102, owner='dead:1', status='downloading'))
+    store.flush()
+
+    adopted = store.claim_orphans('host:1', stale_after=45)
+    assert [row['download_id'] for row in adopted] == ['dead-running']
+    # Ölen worker'ın başlamamış işi tek bir worker'a değil ortak kuyruğa döner
+    assert store.get('dead-queued')['owner'] is None
+    assert store.get('shared')['owner'] is None
+    assert store.shared_queue_length() == 2
+
+
+def test_coordinator_claims_only_its_free_slots(store):
+    claimed = []
+    worker = coordinator(store, capacity=lambda: 2, on_claim=claimed.extend)
+    for index in range(3):
+        store.publish_queued(queued_job(f'job-{index}', 100 + index))
+
+    assert worker.claim_queued() == 2
+    assert [row['download_id'] for row in claimed] == ['job-0', 'job-1']
+    assert store.shared_queue_length() == 1
+    assert worker.stats()['claimed_jobs'] == 2
+
+
+def test_claiming_a_given_job(store):
+    store.publish_queued(queued_job('first', 100))
+    store.publish_queued(queued_job('second', 101))
+    assert [row['download_id'] for row in store.claim_queued('host:1', 1, download_id='second')] == ['second']
+    assert store.claim_queued('host:2', 1, download_id='second') == []
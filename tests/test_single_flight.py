@@ -0,0 +1,36 @@
+from job_registry import DownloadJob
+from single_flight import DownloadCoalescer
+
+
+def finished(coalescer, download_id, key):
+    job = DownloadJob(download_id, 'url', 'mp4', 'best', '')
+    assert coalescer.attach(key, job)[0] == 'leader'
+    coalescer.finish(key, job, True)
+    return job
+
+
+def test_forget_artifact_drops_only_the_leaders_keys():
+    coalescer = DownloadCoalescer()
+    finished(coalescer, 'a', 'key-1')
+    finished(coalescer, 'b', 'key-2')
+
+    coalescer.forget_artifact('a')
+    assert coalescer.stats()['artifacts'] == 1
+    assert coalescer.attach('key-2', DownloadJob('c', 'url', 'mp4', 'best', ''))[0] == 'artifact'
+    coalescer.forget_artifact('missing')
+    assert coalescer.stats()['artifacts'] == 1
+
+
+def test_replaced_artifact_is_not_forgotten_with_the_old_leader():
+    coalescer = DownloadCoalescer()
+    finished(coalescer, 'old', 'key')
+    # Dosyası kaybolan artifact yerine yeni lider indirir
+    replacement = DownloadJob('new', 'url', 'mp4', 'best', '')
+    assert coalescer.attach('key', replacement, artifact_valid=lambda job: False)[0] == 'leader'
+    coalescer.finish('key', replacement, True)
+
+    coalescer.forget_artifact('old')
+    assert coalescer.stats()['artifacts'] == 1
+    coalescer.forget_artifact('new')
+    assert coalescer.stats()['artifacts'] == 0
+    assert coalescer._artifact_keys == {}
@@ -0,0 +1,31 @@
+import api_server
+
+
+def test_slim_video_info_skips_missing_fields():
+    info = {'id': 'dQw4w9WgXcQ', 'title': 'Video', 'duration': None, 'extra': 'x',
+            'formats': [{'format_id': '18', 'ext': 'mp4', 'height': None}]}
+    slim = api_server.slim_video_info(info)
+
+    assert slim == {'id': 'dQw4w9WgXcQ', 'title': 'Video', 'duration': None,
+                    'formats': [{'format_id': '18', 'ext': 'mp4'}]}
+    # Eksik alanlarda çağıranın varsayılanı kullanılır
+    assert slim.get('uploader', 'Bilinmiyor') == 'Bilinmiyor'
+
+
+def test_cached_video_info_keeps_defaults(monkeypatch):
+    calls = []
+
+    def fetch(video_url):
+        calls.append(video_url)
+        return {'id': 'abcdefghijk', 'title': 'Cached', 'formats': []}
+
+    monkeypatch.setattr(api_server, 'fetch_video_info', fetch)
+    api_server.video_info_cache.delete('abcdefghijk')
+    url = 'https://www.youtube.com/watch?v=abcdefghijk'
+
+    first = api_server.get_video_info(url)
+    second = api_server.get_video_info(url)
+    assert calls == [url]
+    assert second == first
+    assert 'view_count' not in second
+    assert second.get('view_count', 0) == 0
@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+import ydl_pool
+from ydl_pool import YDLPool
+
+
+class FakeYDL:
+    instances = []
+
+    def __init__(self, params):
+        self.params = params
+        self.closed = False
+        FakeYDL.instances.append(self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_ydl(monkeypatch):
+    FakeYDL.instances = []
+    monkeypatch.setattr(ydl_pool.yt_dlp, 'YoutubeDL', FakeYDL)
+
+
+def test_short_lived_threads_reuse_instances():
+    pool = YDLPool({'info': {'quiet': True}}, max_idle=4)
+
+    def request():
+        with pool.acquire('info'):
+            pass
+
+    # Her istek için yeni thread açan sunucu gibi
+    for _ in range(50):
+        thread = threading.Thread(target=request)
+        thread.start()
+        thread.join()
+
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['reused'] == 49
+    assert stats['idle_instances'] == 1
+    assert stats['in_use'] == 0
+
+
+def test_pool_keeps_at_most_max_idle_and_closes_the_rest():
+    pool = YDLPool({'info': {}}, max_idle=3)
+    barrier = threading.Barrier(10)
+
+    def request():
+        with pool.acquire('info'):
+            barrier.wait(5)
+
+    threads = [threading.Thread(target=request) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = pool.stats()
+    assert stats['created'] == 10
+    assert stats['idle_instances'] == 3
+    assert stats['evicted'] == 7
+    assert sum(ydl.closed for ydl in FakeYDL.instances) == 7
+
+
+def test_instance_is_not_shared_while_checked_out():
+    pool = YDLPool({'info': {}})
+    with pool.acquire('info') as first:
+        with pool.acquire('info') as second:
+            assert first is not second
+            assert pool.stats()['in_use'] == 2
+    with pool.acquire('info') as again:
+        assert again in (first, second)
+
+
+def test_failed_call_discards_instance():
+    pool = YDLPool({'info': {}})
+    with pytest.raises(RuntimeError):
+        with pool.acquire('info') as ydl:
+            raise RuntimeError('extractor hatası')
+    assert ydl.closed
+    assert pool.stats()['idle_instances'] == 0
+    with pool.acquire('info') as fresh:
+        assert fresh is not ydl
+
+
+def test_worn_out_instance_is_replaced():
+    pool = YDLPool({'info': {}}, max_uses=2)
+    for _ in range(2):
+        with pool.acquire('info') as ydl:
+            pass
+    assert ydl.closed
+    assert pool.stats()['discarded'] == 1
+    with pool.acquire('info') as fresh:
+        assert fresh is not ydl
+
+
+def test_profiles_get_their_own_options():
+    pool = YDLPool({'search': {'extract_flat': True}, 'info': {'listformats': True}})
+    with pool.acquire('search') as search, pool.acquire('info') as info:
+        assert search.params == {'extract_flat': True}
+        assert info.params == {'listformats': True}
+
+
+def test_warm_and_close_all():
+    pool = YDLPool({'info': {}}, max_idle=2)
+    for _ in range(3):
+        pool.warm('info')
+    assert pool.stats()['idle_instances'] == 2
+    pool.close_all()
+    assert pool.stats()['idle_instances'] == 0
+    assert all(ydl.closed for ydl in FakeYDL.instances)
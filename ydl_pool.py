@@ -0,0 +1,114 @@
+"""
+YoutubeDL Instance Pool
+Bilgi çıkarma (search / video info) için önceden kurulmuş YoutubeDL nesneleri.
+Her çağrıda cookies.txt yeniden okunmaz, extractor'lar yeniden yüklenmez ve
+HTTP bağlantıları (keep-alive) çağrılar arasında korunur.
+Nesneler profil başına sınırlı bir havuzdan ödünç alınıp geri verilir; istek
+başına yeni thread açan sunucularda da nesne sayısı havuz boyutunu aşmaz.
+Havuza sığmayan veya ömrünü dolduran nesneler kapatılır.
+"""
+
+import copy
+import queue
+import threading
+from contextlib import contextmanager
+
+import yt_dlp
+
+
+class YDLPool:
+    """Bounded per-profile pools of YoutubeDL instances, checked out one caller at a time"""
+
+    def __init__(self, profiles, max_uses=500, max_idle=8):
+        self.profiles = {name: copy.deepcopy(opts) for name, opts in profiles.items()}
+        self.max_uses = max_uses
+        self.max_idle = max(1, int(max_idle))
+        # Profil başına boştaki nesneler: (YoutubeDL, kullanım sayısı); son bırakılan ilk alınır
+        self._idle = {name: queue.LifoQueue(maxsize=self.max_idle) for name in self.profiles}
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.evicted = 0
+
+    def _build(self, profile):
+        ydl = yt_dlp.YoutubeDL(copy.deepcopy(self.profiles[profile]))
+        with self._lock:
+            self.created += 1
+        return ydl
+
+    @staticmethod
+    def _close(ydl):
+        try:
+            ydl.close()
+        except Exception:
+            pass
+
+    def _release(self, profile, ydl, uses):
+        """Put an instance back; closes it if it is worn out or the pool is full"""
+        if uses < self.max_uses:
+            try:
+                self._idle[profile].put_nowait((ydl, uses))
+                return
+            except queue.Full:
+                with self._lock:
+                    self.evicted += 1
+        else:
+            with self._lock:
+                self.discarded += 1
+        self._close(ydl)
+
+    def warm(self, profile):
+        """Build an idle instance ahead of the first request if the pool has room"""
+        if not self._idle[profile].full():
+            self._release(profile, self._build(profile), 0)
+
+    @contextmanager
+    def acquire(self, profile):
+        """Borrow an instance for `profile`; it goes back to the pool when the block ends"""
+        try:
+            ydl, uses = self._idle[profile].get_nowait()
+            with self._lock:
+                self.reused += 1
+        except queue.Empty:
+            ydl, uses = self._build(profile), 0
+
+        with self._lock:
+            self.in_use += 1
+        try:
+            yield ydl
+        except Exception:
+            # Hata sonrası nesnenin durumu belirsiz - havuza geri konmaz
+            with self._lock:
+                self.discarded += 1
+            self._close(ydl)
+            raise
+        else:
+            self._release(profile, ydl, uses + 1)
+        finally:
+            with self._lock:
+                self.in_use -= 1
+
+    def close_all(self):
+        for idle in self._idle.values():
+            while True:
+                try:
+                    ydl, _ = idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._close(ydl)
+
+    def stats(self):
+        idle = sum(pool.qsize() for pool in self._idle.values())
+        with self._lock:
+            return {
+                'idle_instances': idle,
+                'in_use': self.in_use,
+                'max_idle': self.max_idle,
+                'created': self.created,
+                'reused': self.reused,
+                'discarded': self.discarded,
+                'evicted': self.evicted,
+                'max_uses': self.max_uses
+            }